@@ -113,31 +113,15 @@ class HardBC(ADF):
         )
 
         # r equivalence
-        omega_E_u = ADF.r_equivalence(
-            [omega_0, omega_2, omega_3, omega_4, omega_5, omega_6, omega_7, omega_8],
-            self.m,
-        )
-        omega_E_v = ADF.r_equivalence(
-            [omega_0, omega_2, omega_3, omega_4, omega_5, omega_6, omega_7, omega_8],
-            self.m,
+        omegas = torch.stack(
+            [omega_0, omega_2, omega_3, omega_4, omega_5, omega_6, omega_7, omega_8]
         )
+        omega_E_u = ADF.r_equivalence(omegas, self.m)
+        omega_E_v = omega_E_u
         omega_E_p = omega_1
 
         # u BC
-        bases = [
-            omega_0 ** self.mu,
-            omega_2 ** self.mu,
-            omega_3 ** self.mu,
-            omega_4 ** self.mu,
-            omega_5 ** self.mu,
-            omega_6 ** self.mu,
-            omega_7 ** self.mu,
-            omega_8 ** self.mu,
-        ]
-        w = [
-            ADF.transfinite_interpolation(bases, idx, self.eps)
-            for idx in range(len(bases))
-        ]
+        w = ADF.transfinite_interpolation_weights(omegas ** self.mu, self.eps)
         dirichlet_bc = [self.inlet_vel - (3 * (y ** 2) / 2), 0, 0, 0, 0, 0, 0, 0]
         g = sum([w[i] * dirichlet_bc[i] for i in range(len(w))])
         outvar["u"] = g + omega_E_u * invar["u_star"]
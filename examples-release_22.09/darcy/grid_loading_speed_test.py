@@ -0,0 +1,83 @@
+import tempfile
+import time
+from pathlib import Path
+
+import h5py
+import numpy as np
+import torch
+from torch.utils.data import BatchSampler, RandomSampler
+
+from modulus.dataset import HDF5GridDataset, NpyGridDataset
+from modulus.dataset.dataset import ChunkSampler
+from modulus.dataset.discrete import hdf5_to_npy
+
+
+def make_synthetic_file(filename, nr_examples, resolution, chunk_size):
+    # darcy like file of coefficient and solution grids
+    with h5py.File(filename, "w") as f:
+        for key in ["coeff", "sol"]:
+            f.create_dataset(
+                key,
+                data=np.random.rand(nr_examples, 1, resolution, resolution).astype(
+                    np.float32
+                ),
+                chunks=(chunk_size, 1, resolution, resolution),
+            )
+
+
+def loading_speed_check(dataset, sampler, batch_size, nr_batches):
+    dataset.worker_init_fn(0)
+    batches = iter(BatchSampler(sampler, batch_size, drop_last=True))
+    tic = time.time()
+    for _ in range(nr_batches):
+        dataset[next(batches)]
+    return nr_batches * batch_size / (time.time() - tic)
+
+
+def per_example_speed_check(dataset, batch_size, nr_batches):
+    # reads of single examples as done without batched reads
+    dataset.worker_init_fn(0)
+    batches = iter(BatchSampler(RandomSampler(dataset), batch_size, drop_last=True))
+    tic = time.time()
+    for _ in range(nr_batches):
+        for i in next(batches):
+            dataset[i]
+    return nr_batches * batch_size / (time.time() - tic)
+
+
+if __name__ == "__main__":
+    nr_examples = 4000
+    resolution = 64
+    chunk_size = 16
+    batch_size = 64
+    nr_batches = 50
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename = Path(tmp_dir) / "synthetic.hdf5"
+        make_synthetic_file(filename, nr_examples, resolution, chunk_size)
+        tic = time.time()
+        hdf5_to_npy(filename, Path(tmp_dir) / "npy")
+        print("Conversion to npy (seconds): {:.3e}".format(time.time() - tic))
+
+        hdf5 = HDF5GridDataset(filename, ["coeff"], ["sol"], chunk_cache_mb=16)
+        npy = NpyGridDataset(Path(tmp_dir) / "npy", ["coeff"], ["sol"], chunk_size=16)
+        checks = {
+            "HDF5 per example reads": lambda: per_example_speed_check(
+                hdf5, batch_size, nr_batches
+            ),
+            "HDF5 random batches": lambda: loading_speed_check(
+                hdf5, RandomSampler(hdf5), batch_size, nr_batches
+            ),
+            "HDF5 chunk shuffled batches": lambda: loading_speed_check(
+                hdf5, ChunkSampler(hdf5, hdf5.chunk_size), batch_size, nr_batches
+            ),
+            "npy random batches": lambda: loading_speed_check(
+                npy, RandomSampler(npy), batch_size, nr_batches
+            ),
+            "npy chunk shuffled batches": lambda: loading_speed_check(
+                npy, ChunkSampler(npy, npy.chunk_size), batch_size, nr_batches
+            ),
+        }
+        for name, check in checks.items():
+            print("{} (examples per second): {:.3e}".format(name, check()))
+        del hdf5.f, npy.f
@@ -0,0 +1,36 @@
+import time
+
+import numpy as np
+
+from modulus.dataset.continuous import DictPointwiseDataset
+from modulus.domain.constraint import Constraint
+
+
+def batch_gather_speed_check(nr_points, batch_size, nr_keys, nr_batches=100):
+    # per batch gather of a fixed dataset stored as dictionaries or packed columns
+    invar = {
+        "x" + str(i): np.random.rand(nr_points, 1).astype(np.float32)
+        for i in range(nr_keys)
+    }
+    outvar = {"u" + str(i): v for i, v in enumerate(invar.values())}
+    for packed in [False, True]:
+        dataset = DictPointwiseDataset(invar, outvar, packed=packed)
+        tic = time.time()
+        for _ in range(nr_batches):
+            idx = np.random.randint(0, nr_points, batch_size)
+            for var in dataset[idx]:
+                Constraint._set_device(var)
+        gather_time = time.time() - tic
+        print(
+            "Batch gather {} keys {} (seconds per batch): {:.3e}".format(
+                nr_keys, "packed" if packed else "dictionary", gather_time / nr_batches
+            )
+        )
+
+
+if __name__ == "__main__":
+    nr_points = 1000000
+    batch_size = 4000
+
+    for nr_keys in [2, 8, 32]:
+        batch_gather_speed_check(nr_points, batch_size, nr_keys)
@@ -1,9 +1,21 @@
 import numpy as np
+import torch
+from modulus.constants import tf_dt
 from modulus.geometry.tessellation import Tessellation
 from modulus.geometry.primitives_3d import Box, Sphere, Cylinder, VectorizedBoxes
+from modulus.geometry.discrete_geometry import DiscreteGeometry
+from modulus.geometry.instanced_geometry import InstancedGeometry
+from modulus.geometry.torch_geometry import TorchGeometry
+from modulus.geometry.parameterization import Parameterization, Parameter
+from modulus.geometry.quasirandom import QuasiRandomEngine
 from modulus.utils.io.vtk import var_to_polyvtk
+from chaospy.distributions.sampler.sequences.primes import create_primes
+from chaospy.distributions.sampler.sequences.van_der_corput import (
+    create_van_der_corput_samples as create_samples,
+)
 from stl import mesh as np_mesh
 import time
+import tracemalloc
 
 
 def speed_check(geo, nr_points):
@@ -27,6 +39,125 @@ def speed_check(geo, nr_points):
     )
 
 
+def sdf_speed_check(mesh, nr_points, nr_queries=10):
+    # repeated queries on the mesh sdf that is built once
+    geo = Tessellation(mesh)
+    invar = geo.bounds.sample(nr_points)
+    tic = time.time()
+    for _ in range(nr_queries):
+        geo.sdf(invar, {})
+    cached_time = time.time() - tic
+
+    # repeated queries rebuilding the mesh sdf every time
+    tic = time.time()
+    for _ in range(nr_queries):
+        Tessellation(mesh).sdf(invar, {})
+    rebuilt_time = time.time() - tic
+    print(
+        "SDF query cached (seconds per million point): {:.3e}".format(
+            1000000 * cached_time / (nr_queries * nr_points)
+        )
+    )
+    print(
+        "SDF query rebuilt (seconds per million point): {:.3e}".format(
+            1000000 * rebuilt_time / (nr_queries * nr_points)
+        )
+    )
+
+
+def quasirandom_speed_check(nr_points, nr_batches=10, dims=3):
+    # halton batches from chaospy, restarting at the first point every batch
+    primes = create_primes(1000)
+    tic = time.time()
+    for _ in range(nr_batches):
+        for i in range(dims):
+            create_samples(list(range(nr_points)), number_base=primes[i])
+    chaospy_time = time.time() - tic
+
+    # scrambled halton batches continuing the sequence
+    engine = QuasiRandomEngine()
+    tic = time.time()
+    for _ in range(nr_batches):
+        for i in range(dims):
+            engine.sample(str(i), nr_points)
+    engine_time = time.time() - tic
+    print(
+        "Quasirandom chaospy (seconds per million point): {:.3e}".format(
+            1000000 * chaospy_time / (nr_batches * nr_points)
+        )
+    )
+    print(
+        "Quasirandom engine (seconds per million point): {:.3e}".format(
+            1000000 * engine_time / (nr_batches * nr_points)
+        )
+    )
+
+
+def to_tensors(var, device=None):
+    # training tensors as made by datasets
+    return {
+        key: torch.as_tensor(value, dtype=tf_dt, device=device)
+        for key, value in var.items()
+    }
+
+
+def continuous_loading_speed_check(geo, batch_size, nr_batches=10):
+    # batches of continuous constraints sampled with numpy and copied to device
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+    def _synchronize():
+        if device.type == "cuda":
+            torch.cuda.synchronize()
+
+    tic = time.time()
+    for _ in range(nr_batches):
+        to_tensors(geo.sample_boundary(batch_size), device=device)
+        to_tensors(geo.sample_interior(batch_size), device=device)
+    _synchronize()
+    numpy_time = time.time() - tic
+
+    # batches sampled with torch on device
+    torch_geo = TorchGeometry(geo, device=device)
+    tic = time.time()
+    for _ in range(nr_batches):
+        torch_geo.sample_boundary(batch_size)
+        torch_geo.sample_interior(batch_size)
+    _synchronize()
+    torch_time = time.time() - tic
+    print(
+        "Continuous loading numpy (seconds per batch): {:.3e}".format(
+            numpy_time / nr_batches
+        )
+    )
+    print(
+        "Continuous loading torch on {} (seconds per batch): {:.3e}".format(
+            device.type, torch_time / nr_batches
+        )
+    )
+
+
+def dtype_memory_check(geo, nr_points):
+    # fixed dataset sampled in dtype and converted to training tensors
+    for dtype in [np.float64, np.float32]:
+        tracemalloc.start()
+        tic = time.time()
+        s = geo.sample_interior(nr_points, compute_sdf_derivatives=True, dtype=dtype)
+        sample_time = time.time() - tic
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        tic = time.time()
+        to_tensors(s)
+        convert_time = time.time() - tic
+        print(
+            "Sample {} (seconds per million point): {:.3e}, peak memory (MB per million point): {:.1f}, tensor conversion (seconds per million point): {:.3e}".format(
+                np.dtype(dtype).name,
+                1000000 * sample_time / nr_points,
+                peak_memory / nr_points,
+                1000000 * convert_time / nr_points,
+            )
+        )
+
+
 if __name__ == "__main__":
     # number of points to sample for speed test
     nr_points = 1000000
@@ -37,6 +168,19 @@ if __name__ == "__main__":
     print("Tesselated Speed Test")
     print("Number of triangles: {:d}".format(mesh.vectors.shape[0]))
     speed_check(geo, nr_points)
+    tic = time.time()
+    geo.curves[0].sample(nr_points)
+    triangle_sample_time = time.time() - tic
+    print(
+        "Triangle sample (seconds per million point): {:.3e}".format(
+            1000000 * triangle_sample_time / nr_points
+        )
+    )
+    sdf_speed_check(mesh, 100000)
+
+    # quasirandom sequence speed test
+    print("Quasirandom Speed Test")
+    quasirandom_speed_check(100000)
 
     # primitives speed test
     box = Box(point_1=(-1, -1, -1), point_2=(1, 1, 1))
@@ -49,6 +193,47 @@ if __name__ == "__main__":
     geo = box_minus_sphere - all_cylinders
     print("CSG Speed Test")
     speed_check(geo, nr_points)
+    print("CSG Cached SDF Speed Test")
+    speed_check(geo.cache_sdf(resolution=128), nr_points)
+    print("CSG Continuous Loading Speed Test")
+    continuous_loading_speed_check(geo, 4000)
+    print("CSG Sampling Data Type Test")
+    dtype_memory_check(geo, nr_points)
+
+    # thin shell with low acceptance rate of interior samples
+    geo = Sphere(center=(0, 0, 0), radius=1.0) - Sphere(center=(0, 0, 0), radius=0.97)
+    print("Thin Shell Speed Test")
+    speed_check(geo, nr_points)
+
+    # discrete geometry speed test
+    for nr_variants in [10, 100, 500]:
+        radius = np.linspace(0.5, 1.0, nr_variants)[:, None]
+        geo = DiscreteGeometry(
+            [Sphere(center=(0, 0, 0), radius=float(r)) for r in radius],
+            Parameterization({Parameter("radius"): radius}),
+        )
+        print("Discrete Geometry Speed Test, Number of Variants " + str(nr_variants))
+        speed_check(geo, nr_points)
+
+    # pin array speed test, tilted pins placed by transforms
+    for nr_pins in [10, 100, 400]:
+        pin = Cylinder(center=(0, 0, 0), radius=0.02, height=0.2)
+        transforms = np.tile(np.eye(4), (nr_pins, 1, 1))
+        angle = np.linspace(0, np.pi / 4, nr_pins)
+        transforms[:, 1, 1] = transforms[:, 2, 2] = np.cos(angle)
+        transforms[:, 2, 1] = np.sin(angle)
+        transforms[:, 1, 2] = -np.sin(angle)
+        transforms[:, 0, 3] = (np.arange(nr_pins) % 20) * 0.05
+        transforms[:, 1, 3] = (np.arange(nr_pins) // 20) * 0.2
+        geo = InstancedGeometry(pin, transforms)
+        print("Instanced Pin Array Speed Test, Number of Pins " + str(nr_pins))
+        speed_check(geo, nr_points)
+        if nr_pins <= 100:
+            geo = pin.rotate(float(angle[0]), axis="x").translate(transforms[0, :3, 3])
+            for a, t in zip(angle[1:], transforms[1:, :3, 3]):
+                geo = geo + pin.rotate(float(a), axis="x").translate(t)
+            print("CSG Pin Array Speed Test, Number of Pins " + str(nr_pins))
+            speed_check(geo, nr_points)
 
     # make boxes for many body check
     nr_boxes = [10, 100, 500]
@@ -72,3 +257,5 @@ if __name__ == "__main__":
 
         print("CSG Many Box Speed Test, Number of Boxes " + str(nr_b))
         speed_check(geo, nr_points)
+        print("CSG Many Box Compiled Speed Test, Number of Boxes " + str(nr_b))
+        speed_check(geo.compile(), nr_points)
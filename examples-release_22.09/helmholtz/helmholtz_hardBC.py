@@ -18,6 +18,7 @@ from modulus.node import Node
 from modulus.geometry.adf import ADF
 from modulus.eq.pdes.wave_equation import HelmholtzEquation
 
+
 class HardBC(ADF):
     def __init__(self):
         super().__init__()
@@ -42,39 +43,19 @@ class HardBC(ADF):
 
         outvar = {}
         x, y = invar["x"], invar["y"]
-        omega_0 = ADF.line_segment_adf(
-            (x, y),
-            (-self.domain_width / 2, -self.domain_height / 2),
-            (self.domain_width / 2, -self.domain_height / 2),
-        )
-        omega_1 = ADF.line_segment_adf(
-            (x, y),
-            (self.domain_width / 2, -self.domain_height / 2),
-            (self.domain_width / 2, self.domain_height / 2),
-        )
-        omega_2 = ADF.line_segment_adf(
-            (x, y),
-            (self.domain_width / 2, self.domain_height / 2),
-            (-self.domain_width / 2, self.domain_height / 2),
+        corners = np.array(
+            [
+                (-self.domain_width / 2, -self.domain_height / 2),
+                (self.domain_width / 2, -self.domain_height / 2),
+                (self.domain_width / 2, self.domain_height / 2),
+                (-self.domain_width / 2, self.domain_height / 2),
+            ]
         )
-        omega_3 = ADF.line_segment_adf(
-            (x, y),
-            (-self.domain_width / 2, self.domain_height / 2),
-            (-self.domain_width / 2, -self.domain_height / 2),
-        )
-        omega_E_u = ADF.r_equivalence([omega_0, omega_1, omega_2, omega_3], self.m)
-
-        bases = [
-            omega_0 ** self.mu,
-            omega_1 ** self.mu,
-            omega_2 ** self.mu,
-            omega_3 ** self.mu,
-        ]
-        w = [
-            ADF.transfinite_interpolation(bases, idx, self.eps)
-            for idx in range(len(self.g))
-        ]
-        g = w[0] * self.g[0] + w[1] * self.g[1] + w[2] * self.g[2] + w[3] * self.g[3]
+        omegas = ADF.line_segments_adf((x, y), corners, np.roll(corners, -1, axis=0))
+        omega_E_u = ADF.r_equivalence(omegas, self.m)
+
+        w = ADF.transfinite_interpolation_weights(omegas ** self.mu, self.eps)
+        g = sum(w[i] * self.g[i] for i in range(len(self.g)))
         outvar["u"] = g + omega_E_u * invar["u_star"]
         return outvar
 
@@ -8,4 +8,4 @@ from .continuous import (
     DictVariationalDataset,
     DictInferencePointwiseDataset,
 )
-from .discrete import DictGridDataset, HDF5GridDataset
+from .discrete import DictGridDataset, HDF5GridDataset, NpyGridDataset
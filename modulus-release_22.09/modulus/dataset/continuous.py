@@ -4,9 +4,11 @@
 from typing import Dict, List, Callable
 
 import numpy as np
+import torch
 
 from modulus.utils.io.vtk import var_to_polyvtk
-from .dataset import Dataset, IterableDataset, _DictDatasetMixin
+from modulus.distributed import DistributedManager
+from .dataset import Dataset, IterableDataset, _DictDatasetMixin, PackedColumns
 
 
 class _DictPointwiseDatasetMixin(_DictDatasetMixin):
@@ -31,14 +33,17 @@ class DictPointwiseDataset(_DictPointwiseDatasetMixin, Dataset):
         invar: Dict[str, np.array],
         outvar: Dict[str, np.array],
         lambda_weighting: Dict[str, np.array] = None,
+        packed: bool = None,
     ):
-        super().__init__(invar=invar, outvar=outvar, lambda_weighting=lambda_weighting)
+        super().__init__(
+            invar=invar,
+            outvar=outvar,
+            lambda_weighting=lambda_weighting,
+            packed=packed,
+        )
 
     def __getitem__(self, idx):
-        invar = _DictDatasetMixin._idx_var(self.invar, idx)
-        outvar = _DictDatasetMixin._idx_var(self.outvar, idx)
-        lambda_weighting = _DictDatasetMixin._idx_var(self.lambda_weighting, idx)
-        return (invar, outvar, lambda_weighting)
+        return self._idx_vars(idx)
 
     def __len__(self):
         return self.length
@@ -92,11 +97,11 @@ class ContinuousPointwiseIterableDataset(IterableDataset):
 
         self.invar_fn = invar_fn
         self.outvar_fn = outvar_fn
-        self.lambda_weighting_fn = lambda_weighting_fn
         if lambda_weighting_fn is None:
             lambda_weighting_fn = lambda _, outvar: {
                 key: np.ones_like(x) for key, x in outvar.items()
             }
+        self.lambda_weighting_fn = lambda_weighting_fn
 
         def iterable_function():
             while True:
@@ -144,8 +149,14 @@ class DictImportanceSampledPointwiseIterableDataset(
         lambda_weighting: Dict[str, np.array] = None,
         shuffle: bool = True,
         resample_freq: int = 1000,
+        packed: bool = None,
     ):
-        super().__init__(invar=invar, outvar=outvar, lambda_weighting=lambda_weighting)
+        super().__init__(
+            invar=invar,
+            outvar=outvar,
+            lambda_weighting=lambda_weighting,
+            packed=packed,
+        )
 
         self.batch_size = min(batch_size, self.length)
         self.shuffle = shuffle
@@ -186,18 +197,18 @@ class DictImportanceSampledPointwiseIterableDataset(
                 idx = idx.astype(np.int64)
 
                 # gather invar, outvar, and lambda weighting
-                invar = _DictDatasetMixin._idx_var(self.invar, idx)
-                outvar = _DictDatasetMixin._idx_var(self.outvar, idx)
-                lambda_weighting = _DictDatasetMixin._idx_var(
-                    self.lambda_weighting, idx
-                )
+                batch = self._idx_vars(idx)
 
                 # set area value from importance sampling
-                invar["area"] = 1.0 / (prob[idx] * batch_size)
+                area = 1.0 / (prob[idx] * batch_size)
+                if self.packed is not None:
+                    batch.column(0, "area")[:] = torch.as_tensor(area)
+                else:
+                    batch[0]["area"] = area
 
                 # return and count up
                 counter += 1
-                yield (invar, outvar, lambda_weighting)
+                yield batch
 
         self.iterable_function = iterable_function
 
@@ -217,6 +228,7 @@ class ListIntegralDataset(_DictDatasetMixin, Dataset):
         list_invar: List[Dict[str, np.array]],
         list_outvar: List[Dict[str, np.array]],
         list_lambda_weighting: List[Dict[str, np.array]] = None,
+        packed: bool = None,
     ):
         if list_lambda_weighting is None:
             list_lambda_weighting = []
@@ -229,13 +241,39 @@ class ListIntegralDataset(_DictDatasetMixin, Dataset):
         outvar = _stack_list_numpy_dict(list_outvar)
         lambda_weighting = _stack_list_numpy_dict(list_lambda_weighting)
 
-        super().__init__(invar=invar, outvar=outvar, lambda_weighting=lambda_weighting)
+        super().__init__(
+            invar=invar,
+            outvar=outvar,
+            lambda_weighting=lambda_weighting,
+            packed=packed,
+        )
+
+    @classmethod
+    def from_stacked(
+        cls,
+        invar: Dict[str, np.array],
+        outvar: Dict[str, np.array],
+        lambda_weighting: Dict[str, np.array] = None,
+        packed: bool = None,
+    ):
+        """
+        Creates dataset from arrays already stacked along the first axis,
+        `[nr_integrals, integral_batch_size, 1]` for invar and
+        `[nr_integrals, 1, 1]` for outvar and lambda weighting, without
+        building a dictionary for every integral.
+        """
+
+        dataset = cls.__new__(cls)
+        super(cls, dataset).__init__(
+            invar=invar,
+            outvar=outvar,
+            lambda_weighting=lambda_weighting,
+            packed=packed,
+        )
+        return dataset
 
     def __getitem__(self, idx):
-        invar = _DictDatasetMixin._idx_var(self.invar, idx)
-        outvar = _DictDatasetMixin._idx_var(self.outvar, idx)
-        lambda_weighting = _DictDatasetMixin._idx_var(self.lambda_weighting, idx)
-        return (invar, outvar, lambda_weighting)
+        return self._idx_vars(idx)
 
     def __len__(self):
         return self.length
@@ -252,55 +290,68 @@ class ContinuousIntegralIterableDataset(IterableDataset):
     """
     An infinitely iterable dataset for a continuous set of integral training examples.
     This will resample training examples (create new ones) every iteration.
+    If `sample_fn` is given it returns the stacked invar, outvar and lambda
+    weighting of `batch_size` integrals in one call and is used instead of
+    sampling every integral with `invar_fn` and `outvar_fn`.
     """
 
     def __init__(
         self,
-        invar_fn: Callable,
-        outvar_fn: Callable,
-        batch_size: int,
+        invar_fn: Callable = None,
+        outvar_fn: Callable = None,
+        batch_size: int = 1,
         lambda_weighting_fn: Callable = None,
         param_ranges_fn: Callable = None,
+        sample_fn: Callable = None,
     ):
 
         self.invar_fn = invar_fn
         self.outvar_fn = outvar_fn
-        self.lambda_weighting_fn = lambda_weighting_fn
         if lambda_weighting_fn is None:
             lambda_weighting_fn = lambda _, outvar: {
                 key: np.ones_like(x) for key, x in outvar.items()
             }
+        self.lambda_weighting_fn = lambda_weighting_fn
         if param_ranges_fn is None:
             param_ranges_fn = lambda: {}  # Potentially unsafe?
         self.param_ranges_fn = param_ranges_fn
 
         self.batch_size = batch_size
 
-        # TODO: re-write iterable function so that for loop not needed - to improve performance
+        def _sample_fn(batch_size):
+            list_invar = []
+            list_outvar = []
+            list_lambda_weighting = []
+            for _ in range(batch_size):
+                param_range = self.param_ranges_fn()
+                list_invar.append(self.invar_fn(param_range))
+                if (
+                    not param_range
+                ):  # TODO this can be removed after a np_lambdify rewrite
+                    param_range = {"_": next(iter(list_invar[-1].values()))[0:1]}
+
+                list_outvar.append(self.outvar_fn(param_range))
+                list_lambda_weighting.append(
+                    self.lambda_weighting_fn(param_range, list_outvar[-1])
+                )
+            return (
+                _stack_list_numpy_dict(list_invar),
+                _stack_list_numpy_dict(list_outvar),
+                _stack_list_numpy_dict(list_lambda_weighting),
+            )
+
+        if sample_fn is None:
+            sample_fn = _sample_fn
+        self.sample_fn = sample_fn
 
         def iterable_function():
             while True:
-                list_invar = []
-                list_outvar = []
-                list_lambda_weighting = []
-                for _ in range(self.batch_size):
-                    param_range = self.param_ranges_fn()
-                    list_invar.append(self.invar_fn(param_range))
-                    if (
-                        not param_range
-                    ):  # TODO this can be removed after a np_lambdify rewrite
-                        param_range = {"_": next(iter(list_invar[-1].values()))[0:1]}
-
-                    list_outvar.append(self.outvar_fn(param_range))
-                    list_lambda_weighting.append(
-                        self.lambda_weighting_fn(param_range, list_outvar[-1])
-                    )
-                invar = Dataset._to_tensor_dict(_stack_list_numpy_dict(list_invar))
-                outvar = Dataset._to_tensor_dict(_stack_list_numpy_dict(list_outvar))
-                lambda_weighting = Dataset._to_tensor_dict(
-                    _stack_list_numpy_dict(list_lambda_weighting)
+                invar, outvar, lambda_weighting = self.sample_fn(self.batch_size)
+                yield (
+                    Dataset._to_tensor_dict(invar),
+                    Dataset._to_tensor_dict(outvar),
+                    Dataset._to_tensor_dict(lambda_weighting),
                 )
-                yield (invar, outvar, lambda_weighting)
 
         self.iterable_function = iterable_function
 
@@ -309,15 +360,12 @@ class ContinuousIntegralIterableDataset(IterableDataset):
 
     @property
     def invar_keys(self):
-        param_range = self.param_ranges_fn()
-        invar = self.invar_fn(param_range)
+        invar, _, _ = self.sample_fn(1)
         return list(invar.keys())
 
     @property
     def outvar_keys(self):
-        param_range = self.param_ranges_fn()
-        invar = self.invar_fn(param_range)
-        outvar = self.outvar_fn(invar)
+        _, outvar, _ = self.sample_fn(1)
         return list(outvar.keys())
 
     def save_dataset(self, filename):
@@ -336,13 +384,25 @@ class DictVariationalDataset(Dataset):
         self,
         invar: Dict[str, np.array],
         outvar_names: List[str],  # Just names of output vars
+        packed: bool = None,
     ):
 
-        self.invar = Dataset._to_tensor_dict(invar)
+        # pack columns into one tensor if configured
+        if packed is None:
+            packed = DistributedManager().packed_datasets
+        if packed:
+            self.packed = PackedColumns.pack(invar)
+            self.invar = self.packed.unpack(0)
+        else:
+            self.packed = None
+            self.invar = Dataset._to_tensor_dict(invar)
         self.outvar_names = outvar_names
         self.length = len(next(iter(invar.values())))
 
     def __getitem__(self, idx):
+        if self.packed is not None:
+            (invar,) = self.packed.gather(idx)
+            return invar
         invar = _DictDatasetMixin._idx_var(self.invar, idx)
         return invar
 
@@ -59,6 +59,9 @@ class Dataset(_BaseDataset, torch.utils.data.Dataset):
 
     auto_collation = False
 
+    # number of consecutive examples stored together, shuffled as one block
+    chunk_size = 1
+
     def __getitem__(self, idx):
         """Must return a single example tuple e.g. (invar, outvar, lambda_weighting)
         if Dataset.auto_collation is False, or a batched example tuple if
@@ -70,6 +73,36 @@ class Dataset(_BaseDataset, torch.utils.data.Dataset):
         raise NotImplementedError("subclass must implement this")
 
 
+class ChunkSampler(torch.utils.data.Sampler):
+    """
+    Random sampler that shuffles the order of blocks of `chunk_size`
+    consecutive examples and the examples within each block. Batches then
+    cover few blocks of the underlying storage, e.g. HDF5 chunks, so they
+    can be read with few contiguous reads.
+
+    Parameters
+    ----------
+    data_source : Dataset
+        Dataset to sample from.
+    chunk_size : int
+        Number of consecutive examples in a block.
+    """
+
+    def __init__(self, data_source: Dataset, chunk_size: int):
+        self.length = len(data_source)
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        nr_chunks = -(-self.length // self.chunk_size)
+        for chunk in torch.randperm(nr_chunks).tolist():
+            start = chunk * self.chunk_size
+            stop = min(start + self.chunk_size, self.length)
+            yield from (start + torch.randperm(stop - start)).tolist()
+
+    def __len__(self):
+        return self.length
+
+
 class IterableDataset(_BaseDataset, torch.utils.data.IterableDataset):
     "For defining iterable-style datasets, can be subclassed by user"
 
@@ -79,6 +112,118 @@ class IterableDataset(_BaseDataset, torch.utils.data.IterableDataset):
         raise NotImplementedError("subclass must implement this")
 
 
+class PackedColumns:
+    """
+    Dictionaries of tensors packed into the columns of one contiguous
+    `[N, K]` tensor with an index of column names. Batches are gathered,
+    pinned and copied to the device as a single tensor and only split
+    into a view per key when they are passed to the model. Iterating
+    gives one `PackedVars` per packed dictionary so batches unpack like
+    `invar, outvar, lambda_weighting = batch`.
+
+    Parameters
+    ----------
+    data : torch.Tensor
+        Packed columns, `[N, K]`.
+    columns : List[Tuple[int, str, int, int, Tuple[int]]]
+        Dictionary index, key, first and last column and shape of every
+        value without the first dimension.
+    nr_vars : int
+        Number of packed dictionaries.
+    """
+
+    def __init__(self, data, columns, nr_vars):
+        self.data = data
+        self.columns = columns
+        self.nr_vars = nr_vars
+        self._moved = {}
+
+    @classmethod
+    def pack(cls, *var_dicts):
+        "Packs dictionaries of tensors or arrays with equal first dimension"
+
+        columns = []
+        packed = []
+        start = 0
+        for i, var in enumerate(var_dicts):
+            for key, value in var.items():
+                value = torch.as_tensor(value, dtype=tf_dt)
+                packed.append(value.reshape(value.shape[0], -1))
+                end = start + packed[-1].shape[1]
+                columns.append((i, key, start, end, tuple(value.shape[1:])))
+                start = end
+        return cls(torch.cat(packed, dim=1), columns, len(var_dicts))
+
+    def gather(self, idx):
+        "Returns examples `idx` gathered with a single index"
+
+        return PackedColumns(self.data[idx], self.columns, self.nr_vars)
+
+    def column(self, i, key):
+        "Returns view of value `key` of dictionary `i`"
+
+        for j, k, start, end, shape in self.columns:
+            if (j, k) == (i, key):
+                return self.data[:, start:end].reshape(self.data.shape[:1] + shape)
+        raise KeyError(key)
+
+    def unpack(self, i, device=None):
+        "Returns dictionary `i` as views of the columns on `device`"
+
+        data = self.to(device).data
+        return {
+            key: data[:, start:end].reshape(data.shape[:1] + shape)
+            for j, key, start, end, shape in self.columns
+            if j == i
+        }
+
+    def keys(self, i):
+        return [key for j, key, _, _, _ in self.columns if j == i]
+
+    def to(self, device=None):
+        # moved once for all dictionaries of the batch
+        if device is None or self.data.device == torch.device(device):
+            return self
+        if device not in self._moved:
+            self._moved[device] = PackedColumns(
+                self.data.to(device), self.columns, self.nr_vars
+            )
+        return self._moved[device]
+
+    def pin_memory(self):
+        if "pinned" not in self._moved:
+            self._moved["pinned"] = PackedColumns(
+                self.data.pin_memory(), self.columns, self.nr_vars
+            )
+        return self._moved["pinned"]
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    def __iter__(self):
+        return iter([PackedVars(self, i) for i in range(self.nr_vars)])
+
+
+class PackedVars:
+    """
+    One dictionary of a `PackedColumns` batch. `Constraint._set_device`
+    splits it into a dictionary of views once the batch is on the device.
+    """
+
+    def __init__(self, packed, index):
+        self.packed = packed
+        self.index = index
+
+    def to_dict(self, device=None):
+        return self.packed.unpack(self.index, device)
+
+    def keys(self):
+        return self.packed.keys(self.index)
+
+    def pin_memory(self):
+        return PackedVars(self.packed.pin_memory(), self.index)
+
+
 class _DictDatasetMixin:
     "Special mixin class for dealing with dictionary-based datasets"
 
@@ -87,20 +232,42 @@ class _DictDatasetMixin:
         invar: Dict[str, np.array],
         outvar: Dict[str, np.array],
         lambda_weighting: Dict[str, np.array] = None,
+        packed: bool = None,
     ):
 
         # get default lambda weighting
         if lambda_weighting is None:
             lambda_weighting = {key: np.ones_like(x) for key, x in outvar.items()}
 
-        # convert dataset arrays to tensors
-        self.invar = Dataset._to_tensor_dict(invar)
-        self.outvar = Dataset._to_tensor_dict(outvar)
-        self.lambda_weighting = Dataset._to_tensor_dict(lambda_weighting)
+        # pack columns into one tensor if configured, the dictionaries
+        # then hold views of its columns
+        if packed is None:
+            packed = DistributedManager().packed_datasets
+        if packed:
+            self.packed = PackedColumns.pack(invar, outvar, lambda_weighting)
+            self.invar, self.outvar, self.lambda_weighting = [
+                self.packed.unpack(i) for i in range(3)
+            ]
+        else:
+            # convert dataset arrays to tensors
+            self.packed = None
+            self.invar = Dataset._to_tensor_dict(invar)
+            self.outvar = Dataset._to_tensor_dict(outvar)
+            self.lambda_weighting = Dataset._to_tensor_dict(lambda_weighting)
 
         # get length
         self.length = len(next(iter(self.invar.values())))
 
+    def _idx_vars(self, idx):
+        # gather invar, outvar and lambda weighting, packed in a single index
+        if self.packed is not None:
+            return self.packed.gather(idx)
+        return (
+            _DictDatasetMixin._idx_var(self.invar, idx),
+            _DictDatasetMixin._idx_var(self.outvar, idx),
+            _DictDatasetMixin._idx_var(self.lambda_weighting, idx),
+        )
+
     @property
     def invar_keys(self):
         return list(self.invar.keys())
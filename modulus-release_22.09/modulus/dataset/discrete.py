@@ -44,7 +44,13 @@ class DictGridDataset(_DictGridDatasetMixin, Dataset):
         outvar: Dict[str, np.array],
         lambda_weighting: Dict[str, np.array] = None,
     ):
-        super().__init__(invar=invar, outvar=outvar, lambda_weighting=lambda_weighting)
+        # grids are not packed into columns
+        super().__init__(
+            invar=invar,
+            outvar=outvar,
+            lambda_weighting=lambda_weighting,
+            packed=False,
+        )
 
     def __getitem__(self, idx):
         invar = _DictDatasetMixin._idx_var(self.invar, idx)
@@ -57,7 +63,32 @@ class DictGridDataset(_DictGridDatasetMixin, Dataset):
 
 
 class HDF5GridDataset(Dataset):
-    """lazy-loading HDF5 map-style grid dataset"""
+    """lazy-loading HDF5 map-style grid dataset
+
+    Batches are read with one contiguous or hyperslab selection per key in
+    sorted index order. When shuffling, blocks of `chunk_size` examples are
+    shuffled instead of single examples so batches cover few chunks of the
+    file.
+
+    Parameters
+    ----------
+    filename : Union[str, Path]
+        Path to HDF5 file.
+    invar_keys : List[str]
+        Keys of input variables in file.
+    outvar_keys : List[str]
+        Keys of target variables in file.
+    n_examples : int, optional
+        Number of examples to use, by default all examples in file.
+    chunk_size : int, optional
+        Number of examples shuffled as one block, by default the chunk size
+        of the file along the example dimension, or 1 if not chunked.
+    chunk_cache_mb : float, optional
+        Size of the HDF5 chunk cache of every key in MB, by default the
+        HDF5 default of 1 MB.
+    """
+
+    auto_collation = True
 
     def __init__(
         self,
@@ -65,11 +96,14 @@ class HDF5GridDataset(Dataset):
         invar_keys: List[str],
         outvar_keys: List[str],
         n_examples: int = None,
+        chunk_size: int = None,
+        chunk_cache_mb: float = None,
     ):
 
         self._invar_keys = invar_keys
         self._outvar_keys = outvar_keys
         self.path = Path(filename)
+        self.chunk_cache_mb = chunk_cache_mb
 
         # check path
         assert self.path.is_file(), f"Could not find file {self.path}"
@@ -88,6 +122,12 @@ class HDF5GridDataset(Dataset):
 
             length = len(f[k])
 
+            # shuffle whole chunks of the file layout
+            if chunk_size is None:
+                chunks = f[k].chunks
+                chunk_size = chunks[0] if chunks is not None else 1
+        self.chunk_size = chunk_size
+
         if n_examples is not None:
             assert (
                 n_examples <= length
@@ -98,10 +138,10 @@ class HDF5GridDataset(Dataset):
 
     def __getitem__(self, idx):
         invar = Dataset._to_tensor_dict(
-            {k: self.f[k][idx, ...] for k in self.invar_keys}
+            {k: _read_batch(self.f[k], idx) for k in self.invar_keys}
         )
         outvar = Dataset._to_tensor_dict(
-            {k: self.f[k][idx, ...] for k in self.outvar_keys}
+            {k: _read_batch(self.f[k], idx) for k in self.outvar_keys}
         )
         lambda_weighting = Dataset._to_tensor_dict(
             {k: np.ones_like(v) for k, v in outvar.items()}
@@ -117,7 +157,90 @@ class HDF5GridDataset(Dataset):
         # note each torch DataLoader worker process should open file individually when reading
         # do not share open file descriptors across separate workers!
         # note files are closed when worker process is destroyed so no need to explicitly close
-        self.f = h5py.File(self.path, "r")
+        kwargs = {}
+        if self.chunk_cache_mb is not None:
+            kwargs["rdcc_nbytes"] = int(self.chunk_cache_mb * 1024**2)
+        self.f = h5py.File(self.path, "r", **kwargs)
+
+    @property
+    def invar_keys(self):
+        return list(self._invar_keys)
+
+    @property
+    def outvar_keys(self):
+        return list(self._outvar_keys)
+
+
+class NpyGridDataset(Dataset):
+    """lazy-loading map-style grid dataset of one memory-mapped `.npy` file
+    per key, see `hdf5_to_npy` for converting HDF5 files
+
+    Parameters
+    ----------
+    directory : Union[str, Path]
+        Directory containing a `<key>.npy` file for every key.
+    invar_keys : List[str]
+        Keys of input variables.
+    outvar_keys : List[str]
+        Keys of target variables.
+    n_examples : int, optional
+        Number of examples to use, by default all examples in files.
+    chunk_size : int, optional
+        Number of consecutive examples shuffled as one block, by default 1
+    """
+
+    auto_collation = True
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        invar_keys: List[str],
+        outvar_keys: List[str],
+        n_examples: int = None,
+        chunk_size: int = 1,
+    ):
+
+        self._invar_keys = invar_keys
+        self._outvar_keys = outvar_keys
+        self.path = Path(directory)
+        self.chunk_size = chunk_size
+
+        # check files/ get length
+        for k in invar_keys + outvar_keys:
+            if not (self.path / (k + ".npy")).is_file():
+                raise KeyError(f"Variable {k} not found in {self.path}")
+        length = len(np.load(self.path / (k + ".npy"), mmap_mode="r"))
+
+        if n_examples is not None:
+            assert (
+                n_examples <= length
+            ), "error, n_examples greater than length of file data"
+            length = min(n_examples, length)
+
+        self.length = length
+
+    def __getitem__(self, idx):
+        invar = Dataset._to_tensor_dict(
+            {k: _read_batch(self.f[k], idx) for k in self.invar_keys}
+        )
+        outvar = Dataset._to_tensor_dict(
+            {k: _read_batch(self.f[k], idx) for k in self.outvar_keys}
+        )
+        lambda_weighting = Dataset._to_tensor_dict(
+            {k: np.ones_like(v) for k, v in outvar.items()}
+        )
+        return invar, outvar, lambda_weighting
+
+    def __len__(self):
+        return self.length
+
+    def worker_init_fn(self, iworker):
+        super().worker_init_fn(iworker)
+        # memory map files on worker thread
+        self.f = {
+            k: np.load(self.path / (k + ".npy"), mmap_mode="r")
+            for k in self.invar_keys + self.outvar_keys
+        }
 
     @property
     def invar_keys(self):
@@ -126,3 +249,62 @@ class HDF5GridDataset(Dataset):
     @property
     def outvar_keys(self):
         return list(self._outvar_keys)
+
+
+def hdf5_to_npy(
+    filename: Union[str, Path],
+    directory: Union[str, Path],
+    keys: List[str] = None,
+    max_chunk_mb: float = 256,
+):
+    """Convert datasets of a HDF5 file to one `.npy` file per key that can
+    be memory-mapped by `NpyGridDataset`
+
+    Parameters
+    ----------
+    filename : Union[str, Path]
+        Path to HDF5 file.
+    directory : Union[str, Path]
+        Output directory, created if it does not exist.
+    keys : List[str], optional
+        Keys to convert, by default all datasets in file.
+    max_chunk_mb : float, optional
+        Maximum size of the blocks copied at once in MB, by default 256
+    """
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    with h5py.File(filename, "r") as f:
+        if keys is None:
+            keys = [k for k in f.keys() if isinstance(f[k], h5py.Dataset)]
+        for k in keys:
+            data = f[k]
+            out = np.lib.format.open_memmap(
+                directory / (k + ".npy"), mode="w+", dtype=data.dtype, shape=data.shape
+            )
+            # copy blocks of whole examples
+            example_bytes = data.dtype.itemsize * int(np.prod(data.shape[1:]))
+            step = max(1, int(max_chunk_mb * 1024**2) // max(example_bytes, 1))
+            for start in range(0, data.shape[0], step):
+                out[start : start + step] = data[start : start + step]
+            out.flush()
+            del out
+
+
+def _read_batch(data, idx):
+    # read a batch of examples in sorted index order, one slice if dense
+    # and one slice per run of consecutive examples otherwise
+    # (memory-mapped arrays are gathered directly)
+    idx = np.asarray(idx)
+    if idx.ndim == 0:
+        return data[int(idx)]
+    unique, inverse = np.unique(idx, return_inverse=True)
+    start, stop = int(unique[0]), int(unique[-1]) + 1
+    if stop - start <= 2 * len(unique):
+        batch = data[start:stop][unique - start]
+    elif isinstance(data, np.ndarray):
+        batch = data[unique]
+    else:
+        runs = np.split(unique, np.flatnonzero(np.diff(unique) > 1) + 1)
+        batch = np.concatenate([data[int(r[0]) : int(r[-1]) + 1] for r in runs])
+    return batch[inverse]
@@ -37,6 +37,14 @@ class DistributedManager(object):
             obj._find_unused_parameters = False
         if not hasattr(obj, "_cuda_graphs"):
             obj._cuda_graphs = False
+        if not hasattr(obj, "_device_datasets"):
+            obj._device_datasets = False
+        if not hasattr(obj, "_packed_datasets"):
+            obj._packed_datasets = False
+        if not hasattr(obj, "_prefetch_depth"):
+            obj._prefetch_depth = 0
+        if not hasattr(obj, "_load_workers"):
+            obj._load_workers = 0
 
         return obj
 
@@ -147,6 +155,38 @@ class DistributedManager(object):
 
         self._cuda_graphs = graphs
 
+    @property
+    def device_datasets(self):
+        return self._device_datasets
+
+    @device_datasets.setter
+    def device_datasets(self, device_datasets: bool):
+        self._device_datasets = device_datasets
+
+    @property
+    def packed_datasets(self):
+        return self._packed_datasets
+
+    @packed_datasets.setter
+    def packed_datasets(self, packed_datasets: bool):
+        self._packed_datasets = packed_datasets
+
+    @property
+    def prefetch_depth(self):
+        return self._prefetch_depth
+
+    @prefetch_depth.setter
+    def prefetch_depth(self, prefetch_depth: int):
+        self._prefetch_depth = prefetch_depth
+
+    @property
+    def load_workers(self):
+        return self._load_workers
+
+    @load_workers.setter
+    def load_workers(self, load_workers: int):
+        self._load_workers = load_workers
+
     @staticmethod
     def get_available_backend():
         if torch.cuda.is_available() and torch.distributed.is_nccl_available():
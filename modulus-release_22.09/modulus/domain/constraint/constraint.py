@@ -1,5 +1,8 @@
 from typing import Union, List
 
+import time
+import queue
+import threading
 import torch
 import logging
 from torch.utils.data import DataLoader, BatchSampler, SequentialSampler, RandomSampler
@@ -11,6 +14,12 @@ from modulus.node import Node
 from modulus.constants import tf_dt
 from modulus.distributed.manager import DistributedManager
 from modulus.dataset import Dataset, IterableDataset
+from modulus.dataset.dataset import (
+    _DictDatasetMixin,
+    ChunkSampler,
+    PackedColumns,
+    PackedVars,
+)
 from modulus.loss import Loss
 from modulus.graph import Graph
 from modulus.key import Key
@@ -108,9 +117,13 @@ class Constraint:
     @staticmethod
     def _set_device(tensor_dict, device=None, requires_grad=False):
 
-        # convert np to torch if needed
+        # packed batches are copied at once and split into views of keys
+        if isinstance(tensor_dict, PackedVars):
+            tensor_dict = tensor_dict.to_dict(device)
+
+        # convert np to torch if needed, copies from pinned memory are asynchronous
         tensor_dict = {
-            key: torch.as_tensor(value, dtype=tf_dt, device=device)
+            key: torch.as_tensor(value, dtype=tf_dt).to(device, non_blocking=True)
             for key, value in tensor_dict.items()
         }
 
@@ -141,6 +154,38 @@ class Constraint:
 
         manager = DistributedManager()
 
+        # fixed dictionary datasets are held and batched on the device
+        if (
+            manager.device_datasets
+            and infinite
+            and num_workers == 0
+            and isinstance(dataset, Dataset)
+            and isinstance(dataset, _DictDatasetMixin)
+            and dataset.auto_collation
+        ):
+            return DeviceDataLoader(
+                dataset,
+                batch_size,
+                shuffle,
+                drop_last,
+                device=manager.device,
+                distributed=distributed,
+            )
+
+        # continuous datasets are sampled ahead in a background thread
+        if (
+            manager.prefetch_depth > 0
+            and infinite
+            and num_workers == 0
+            and isinstance(dataset, IterableDataset)
+        ):
+            dataset.worker_init_fn(0)
+            return PrefetchDataLoader(
+                dataset,
+                manager.prefetch_depth,
+                pin_memory=manager.device.type == "cuda",
+            )
+
         # use persistent workers
         # this is important for small datasets - torch would otherwise spend a lot of CPU overhead spawning workers each epoch
         persistent_workers = True if num_workers > 0 else False
@@ -164,7 +209,9 @@ class Constraint:
 
             # otherwise use standard sampler
             else:
-                if shuffle:
+                if shuffle and dataset.chunk_size > 1:
+                    sampler = ChunkSampler(dataset, dataset.chunk_size)
+                elif shuffle:
                     sampler = RandomSampler(dataset)
                 else:
                     sampler = SequentialSampler(dataset)
@@ -238,3 +285,168 @@ class InfiniteDataLoader:
             for batch in dataloader:
                 yield batch
             self.epoch += 1
+
+
+class DeviceDataLoader:
+    """
+    An infinite dataloader for map-style dictionary datasets that fit in
+    device memory. All columns are packed into one tensor and uploaded once,
+    every epoch is shuffled with `torch.randperm` on the device and every
+    batch is a single indexed gather of the packed tensor, so no workers or
+    host to device copies are needed per step. In distributed runs every
+    rank only uploads its own shard of the dataset.
+
+    Parameters
+    ----------
+    dataset : Dataset
+        Map-style dataset with `invar`, `outvar` and `lambda_weighting`
+        dictionaries of tensors.
+    batch_size : int
+        Batch size.
+    shuffle : bool
+        Randomly shuffle examples in dataset every epoch.
+    drop_last : bool
+        Drop last batch if dataset not fully divisible by batch size.
+    device : torch.device
+        Device dataset is held on.
+    distributed : bool
+        Shard dataset across ranks of distributed runs unless False.
+    """
+
+    def __init__(
+        self,
+        dataset: Dataset,
+        batch_size: int,
+        shuffle: bool,
+        drop_last: bool,
+        device=None,
+        distributed: bool = None,
+    ):
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.epoch = 0
+
+        # shard of this rank, equal sizes as with the distributed sampler
+        manager = DistributedManager()
+        length = len(dataset)
+        index = torch.arange(length)
+        if distributed is not False and manager.distributed:
+            size = manager.group_size("data_parallel")
+            rank = manager.group_rank("data_parallel")
+            if shuffle:  # same permutation on every rank
+                index = torch.randperm(
+                    length, generator=torch.Generator().manual_seed(0)
+                )
+            if drop_last:
+                index = index[: length - length % size]
+            else:
+                index = torch.cat([index, index[: (-length) % size]])
+            index = index[rank::size]
+        assert (
+            not drop_last or index.shape[0] >= batch_size
+        ), "error, dataset has fewer examples than batch_size"
+
+        # pack columns into one tensor on the device
+        packed = getattr(dataset, "packed", None)
+        if packed is None:
+            packed = PackedColumns.pack(
+                dataset.invar, dataset.outvar, dataset.lambda_weighting
+            )
+        self.packed = packed.gather(index).to(device)
+
+    def __iter__(self):
+        length = len(self.packed)
+        device = self.packed.data.device
+        while True:
+            if self.shuffle:
+                order = torch.randperm(length, device=device)
+            else:
+                order = torch.arange(length, device=device)
+            stop = length - length % self.batch_size if self.drop_last else length
+            for start in range(0, stop, self.batch_size):
+                batch = self.packed.gather(order[start : start + self.batch_size])
+                yield tuple(batch.unpack(i) for i in range(batch.nr_vars))
+            self.epoch += 1
+
+
+class PrefetchDataLoader:
+    """
+    An infinite dataloader for iterable datasets that samples batches ahead
+    in a background thread, so sampling the next batch overlaps with training
+    on the current one. The thread shares the memory of the training process,
+    so batches are handed over without copies and geometry or sympy closures
+    are never pickled as they are for dataloader workers. Batches are pinned
+    when the training device is a GPU.
+
+    The number of batches the consumer had to wait for is counted; a high
+    starvation means sampling, not training, bounds the step time.
+
+    Parameters
+    ----------
+    dataset : IterableDataset
+        Infinitely iterable dataset.
+    depth : int
+        Maximum number of batches sampled ahead.
+    pin_memory : bool
+        Pin batches in page-locked memory.
+    """
+
+    def __init__(self, dataset: IterableDataset, depth: int, pin_memory: bool = False):
+        self.dataset = dataset
+        self.depth = depth
+        self.pin_memory = pin_memory
+        self.nr_batches = 0
+        self.nr_starved = 0
+        self.wait_time = 0.0
+        self._queue = None
+
+    def _produce(self):
+        try:
+            for batch in self.dataset:
+                if self.pin_memory:
+                    batch = PrefetchDataLoader._pin(batch)
+                self._queue.put((batch, None))
+        except Exception as e:
+            self._queue.put((None, e))
+
+    @staticmethod
+    def _pin(batch):
+        if isinstance(batch, dict):
+            return {key: value.pin_memory() for key, value in batch.items()}
+        elif isinstance(batch, (tuple, list)):
+            return type(batch)(PrefetchDataLoader._pin(var) for var in batch)
+        return batch.pin_memory()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        # start sampling at the first batch, after the constraint is built
+        if self._queue is None:
+            self._queue = queue.Queue(maxsize=self.depth)
+            thread = threading.Thread(target=self._produce, daemon=True)
+            thread.start()
+        self.nr_batches += 1
+        if self._queue.empty():
+            self.nr_starved += 1
+            tic = time.perf_counter()
+            batch, error = self._queue.get()
+            self.wait_time += time.perf_counter() - tic
+        else:
+            batch, error = self._queue.get()
+        if error is not None:
+            raise error
+        return batch
+
+    def stats(self):
+        "Return and reset starvation and wait time per batch since last call"
+        nr_batches = max(self.nr_batches, 1)
+        stats = {
+            "queue_starvation": self.nr_starved / nr_batches,
+            "queue_wait_time": self.wait_time / nr_batches,
+        }
+        self.nr_batches = 0
+        self.nr_starved = 0
+        self.wait_time = 0.0
+        return stats
@@ -10,18 +10,25 @@ import logging
 import torch
 
 from .constraint import Constraint
-from .utils import _compute_outvar, _compute_lambda_weighting
+from .utils import (
+    _compute_outvar,
+    _compute_lambda_weighting,
+    _sample_points,
+    _sample_integrals,
+)
 from modulus.utils.io.vtk import var_to_polyvtk
 from modulus.graph import Graph
 from modulus.key import Key
 from modulus.node import Node
 from modulus.loss import Loss, PointwiseLossNorm, IntegralLossNorm
 from modulus.distributed import DistributedManager
+from modulus.manager import SamplingManager
 from modulus.utils.sympy import np_lambdify
 
 from modulus.geometry import Geometry
 from modulus.geometry.helper import _sympy_criteria_to_criteria
 from modulus.geometry.parameterization import Parameterization, Bounds
+from modulus.geometry.quasirandom import QuasiRandomEngine
 
 from modulus.dataset import (
     DictPointwiseDataset,
@@ -238,7 +245,8 @@ class PointwiseBoundaryConstraint(PointwiseConstraint):
         If `fixed_dataset=True` then the total number of points generated
         to apply constraint on is `total_nr_points=batch_per_epoch*batch_size`.
     quasirandom : bool = False
-        If true then sample the points using the Halton sequence.
+        If true then sample the points using the scrambled Halton sequence.
+        Continuously sampled batches continue the sequence.
     num_workers : int
         Number of worker used in fetching data.
     loss : Loss
@@ -273,11 +281,18 @@ class PointwiseBoundaryConstraint(PointwiseConstraint):
         # if fixed dataset then sample points and fix for all of training
         if fixed_dataset:
             # sample boundary
-            invar = geometry.sample_boundary(
+            dtype = SamplingManager().dtype
+            invar = _sample_points(
+                lambda n: geometry.sample_boundary(
+                    n,
+                    criteria=criteria,
+                    parameterization=parameterization,
+                    quasirandom=quasirandom,
+                    dtype=dtype,
+                ),
                 batch_size * batch_per_epoch,
-                criteria=criteria,
-                parameterization=parameterization,
                 quasirandom=quasirandom,
+                cache_key=("boundary", geometry, criteria, parameterization, dtype.str),
             )
 
             # compute outvar
@@ -308,6 +323,10 @@ class PointwiseBoundaryConstraint(PointwiseConstraint):
 
         # else sample points every batch
         else:
+            # continue quasirandom sequence across batches
+            if quasirandom:
+                quasirandom = QuasiRandomEngine()
+
             # invar function
             invar_fn = lambda: geometry.sample_boundary(
                 batch_size,
@@ -386,11 +405,17 @@ class PointwiseInteriorConstraint(PointwiseConstraint):
         points. Areas with higher importance are sampled more frequently
         according to Monte Carlo importance sampling,
         https://en.wikipedia.org/wiki/Monte_Carlo_integration.
+    density : Union[Callable, None] = None
+        Function of the sdf giving the relative density of sampled points,
+        see `Geometry.sample_interior`. The `area` of points is the inverse
+        of their density so one constraint can resolve walls without extra
+        constraints on bands of the sdf.
     batch_per_epoch : int = 1000
         If `fixed_dataset=True` then the total number of points generated
         to apply constraint on is `total_nr_points=batch_per_epoch*batch_size`.
     quasirandom : bool = False
-        If true then sample the points using the Halton sequence.
+        If true then sample the points using the scrambled Halton sequence.
+        Continuously sampled batches continue the sequence.
     num_workers : int
         Number of worker used in fetching data.
     loss : Loss
@@ -412,6 +437,7 @@ class PointwiseInteriorConstraint(PointwiseConstraint):
         fixed_dataset: bool = True,
         compute_sdf_derivatives: bool = False,
         importance_measure: Union[Callable, None] = None,
+        density: Union[Callable, None] = None,
         batch_per_epoch: int = 1000,
         quasirandom: bool = False,
         num_workers: int = 0,
@@ -427,13 +453,30 @@ class PointwiseInteriorConstraint(PointwiseConstraint):
         # if fixed dataset then sample points and fix for all of training
         if fixed_dataset:
             # sample interior
-            invar = geometry.sample_interior(
+            dtype = SamplingManager().dtype
+            invar = _sample_points(
+                lambda n: geometry.sample_interior(
+                    n,
+                    bounds=bounds,
+                    criteria=criteria,
+                    parameterization=parameterization,
+                    quasirandom=quasirandom,
+                    compute_sdf_derivatives=compute_sdf_derivatives,
+                    dtype=dtype,
+                    density=density,
+                ),
                 batch_size * batch_per_epoch,
-                bounds=bounds,
-                criteria=criteria,
-                parameterization=parameterization,
                 quasirandom=quasirandom,
-                compute_sdf_derivatives=compute_sdf_derivatives,
+                cache_key=(
+                    "interior",
+                    geometry,
+                    bounds,
+                    criteria,
+                    parameterization,
+                    compute_sdf_derivatives,
+                    density,
+                    dtype.str,
+                ),
             )
 
             # compute outvar
@@ -464,6 +507,10 @@ class PointwiseInteriorConstraint(PointwiseConstraint):
 
         # else sample points every batch
         else:
+            # continue quasirandom sequence across batches
+            if quasirandom:
+                quasirandom = QuasiRandomEngine()
+
             # invar function
             invar_fn = lambda: geometry.sample_interior(
                 batch_size,
@@ -472,6 +519,7 @@ class PointwiseInteriorConstraint(PointwiseConstraint):
                 parameterization=parameterization,
                 quasirandom=quasirandom,
                 compute_sdf_derivatives=compute_sdf_derivatives,
+                density=density,
             )
 
             # outvar function
@@ -642,7 +690,8 @@ class IntegralBoundaryConstraint(IntegralConstraint):
         If `fixed_dataset=True` then the total number of integrals generated
         to apply constraint on is `total_nr_integrals=batch_per_epoch*batch_size`.
     quasirandom : bool = False
-        If true then sample the points using the Halton sequence.
+        If true then sample the points using the scrambled Halton sequence.
+        Continuously sampled batches continue the sequence.
     num_workers : int
         Number of worker used in fetching data.
     loss : Loss
@@ -675,88 +724,103 @@ class IntegralBoundaryConstraint(IntegralConstraint):
         elif isinstance(parameterization, dict):
             parameterization = Parameterization(parameterization)
 
+        # outvar and lambda weighting of integrals from their parameter values
+        def _stack_integrals(invar, params, nr_integrals):
+            if not params:  # TODO this can be removed after a np_lambdify rewrite
+                params = {"_": next(iter(invar.values()))[::integral_batch_size]}
+            outvar_star = _compute_outvar(params, outvar)
+            lambda_weighting_star = _compute_lambda_weighting(
+                params, outvar_star, lambda_weighting
+            )
+            return (
+                {
+                    key: value.reshape(nr_integrals, integral_batch_size, -1)
+                    for key, value in invar.items()
+                },
+                {
+                    key: np.reshape(value, (nr_integrals, 1, -1))
+                    for key, value in outvar_star.items()
+                },
+                {
+                    key: np.reshape(value, (nr_integrals, 1, -1))
+                    for key, value in lambda_weighting_star.items()
+                },
+            )
+
         # Fixed number of integral examples
         if fixed_dataset:
             # sample geometry to generate integral batchs
-            list_invar = []
-            list_outvar = []
-            list_lambda_weighting = []
-            for i in range(batch_size * batch_per_epoch):
-                # sample parameter ranges
-                if parameterization:
-                    specific_param_ranges = parameterization.sample(1)
-                else:
-                    specific_param_ranges = {}
-
-                # sample boundary
-                invar = geometry.sample_boundary(
+            dtype = SamplingManager().dtype
+
+            def sample_integrals(nr_integrals):
+                # points of all integrals are sampled in one batch
+                invar, params = geometry.sample_integral_boundary(
+                    nr_integrals,
                     integral_batch_size,
                     criteria=criteria,
-                    parameterization=Parameterization(
-                        {
-                            sp.Symbol(key): float(value)
-                            for key, value in specific_param_ranges.items()
-                        }
-                    ),
+                    parameterization=parameterization,
                     quasirandom=quasirandom,
+                    dtype=dtype,
                 )
 
-                # compute outvar
-                if (
-                    not specific_param_ranges
-                ):  # TODO this can be removed after a np_lambdify rewrite
-                    specific_param_ranges = {"_": next(iter(invar.values()))[0:1]}
-                outvar_star = _compute_outvar(specific_param_ranges, outvar)
-
-                # set lambda weighting
-                lambda_weighting_star = _compute_lambda_weighting(
-                    specific_param_ranges, outvar, lambda_weighting
-                )
-
-                # store samples
-                list_invar.append(invar)
-                list_outvar.append(outvar_star)
-                list_lambda_weighting.append(lambda_weighting_star)
+                # integrals are stored as concatenated columns
+                return {
+                    **{"invar/" + key: value for key, value in invar.items()},
+                    **{"params/" + key: value for key, value in params.items()},
+                }
+
+            nr_integrals = batch_size * batch_per_epoch
+            samples = _sample_integrals(
+                sample_integrals,
+                nr_integrals,
+                cache_key=None
+                if quasirandom
+                else (
+                    "integral_boundary",
+                    geometry,
+                    criteria,
+                    parameterization,
+                    integral_batch_size,
+                    dtype.str,
+                ),
+            )
 
             # make dataset of integral planes
-            dataset = ListIntegralDataset(
-                list_invar=list_invar,
-                list_outvar=list_outvar,
-                list_lambda_weighting=list_lambda_weighting,
+            dataset = ListIntegralDataset.from_stacked(
+                *_stack_integrals(
+                    {
+                        key[len("invar/") :]: value
+                        for key, value in samples.items()
+                        if key.startswith("invar/")
+                    },
+                    {
+                        key[len("params/") :]: value
+                        for key, value in samples.items()
+                        if key.startswith("params/")
+                    },
+                    nr_integrals,
+                )
             )
         # Continuous sampling
         else:
-            # sample parameter ranges
-            if parameterization:
-                param_ranges_fn = lambda: parameterization.sample(1)
-            else:
-                param_ranges_fn = lambda: {}
-
-            # invar function
-            invar_fn = lambda param_range: geometry.sample_boundary(
-                integral_batch_size,
-                criteria=criteria,
-                parameterization=Parameterization(
-                    {sp.Symbol(key): float(value) for key, value in param_range.items()}
-                ),
-                quasirandom=quasirandom,
-            )
-
-            # outvar function
-            outvar_fn = lambda param_range: _compute_outvar(param_range, outvar)
-
-            # lambda weighting function
-            lambda_weighting_fn = lambda param_range, outvar: _compute_lambda_weighting(
-                param_range, outvar, lambda_weighting
-            )
+            # continue quasirandom sequence across batches
+            if quasirandom:
+                quasirandom = QuasiRandomEngine()
+
+            # sample batch of integrals in one call
+            def sample_fn(batch_size):
+                invar, params = geometry.sample_integral_boundary(
+                    batch_size,
+                    integral_batch_size,
+                    criteria=criteria,
+                    parameterization=parameterization,
+                    quasirandom=quasirandom,
+                )
+                return _stack_integrals(invar, params, batch_size)
 
             # make dataset of integral planes
             dataset = ContinuousIntegralIterableDataset(
-                invar_fn=invar_fn,
-                outvar_fn=outvar_fn,
-                batch_size=batch_size,
-                lambda_weighting_fn=lambda_weighting_fn,
-                param_ranges_fn=param_ranges_fn,
+                batch_size=batch_size, sample_fn=sample_fn
             )
 
         self.batch_size = batch_size
@@ -1,12 +1,29 @@
+import types
 import numpy as np
+import torch
 
-from modulus.utils.sympy import np_lambdify
+from modulus.utils.sympy import np_lambdify, torch_lambdify
+from modulus.manager import SamplingManager
+from modulus.geometry.parallel import parallel_sample
+from modulus.geometry.point_cache import PointCache, fingerprint
+
+
+def _lambdify(f, invar):
+    # tensors sampled on other devices than the cpu are evaluated with torch
+    value = next(iter(invar.values()))
+    if (
+        isinstance(value, torch.Tensor)
+        and value.device.type != "cpu"
+        and not isinstance(f, types.FunctionType)
+    ):
+        return torch_lambdify(f, invar, separable=True)
+    return np_lambdify(f, invar)
 
 
 def _compute_outvar(invar, outvar_sympy):
     outvar = {}
     for key in outvar_sympy.keys():
-        outvar[key] = np_lambdify(outvar_sympy[key], {**invar})(**invar)
+        outvar[key] = _lambdify(outvar_sympy[key], {**invar})(**invar)
     return outvar
 
 
@@ -14,10 +31,64 @@ def _compute_lambda_weighting(invar, outvar, lambda_weighting_sympy):
     lambda_weighting = {}
     if lambda_weighting_sympy is None:
         for key in outvar.keys():
-            lambda_weighting[key] = np.ones_like(next(iter(invar.values())))
+            value = next(iter(invar.values()))
+            if isinstance(value, torch.Tensor):
+                lambda_weighting[key] = torch.ones_like(value)
+            else:
+                lambda_weighting[key] = np.ones_like(value)
     else:
         for key in outvar.keys():
-            lambda_weighting[key] = np_lambdify(
+            lambda_weighting[key] = _lambdify(
                 lambda_weighting_sympy[key], {**invar, **outvar}
             )(**invar, **outvar)
     return lambda_weighting
+
+
+def _sample_points(sample, nr_points, quasirandom=False, cache_key=None):
+    # split sampling over processes if configured, quasirandom sequences
+    # can not be split so they are sampled in one pass
+    manager = SamplingManager()
+    if quasirandom or (manager.num_workers == 1 and manager.seed is None):
+        return sample(nr_points)
+    seed_sequences = manager.spawn(manager.num_workers)
+    return _cached_points(
+        lambda: parallel_sample(sample, nr_points, manager.num_workers, seed_sequences),
+        cache_key,
+        nr_points,
+        seed_sequences,
+    )
+
+
+def _sample_integrals(sample, nr_integrals, cache_key=None):
+    # integrals are sampled in turn from one seeded stream if configured
+    manager = SamplingManager()
+    if manager.seed is None:
+        return sample(nr_integrals)
+    seed_sequence = manager.spawn(1)[0]
+
+    def _sample():
+        state = np.random.get_state()
+        np.random.seed(seed_sequence.generate_state(4))
+        try:
+            return sample(nr_integrals)
+        finally:
+            np.random.set_state(state)
+
+    return _cached_points(_sample, cache_key, nr_integrals, [seed_sequence])
+
+
+def _cached_points(sample, cache_key, nr_points, seed_sequences):
+    # points of seeded streams are loaded from the point cache if configured,
+    # the key holds the stream of every worker so it follows the call order
+    manager = SamplingManager()
+    if cache_key is None or manager.seed is None or manager.cache_dir is None:
+        return sample()
+    try:
+        key = fingerprint(
+            cache_key,
+            nr_points,
+            [(s.entropy, s.spawn_key) for s in seed_sequences],
+        )
+    except TypeError:  # criteria functions can not be hashed
+        return sample()
+    return PointCache(manager.cache_dir, manager.cache_max_size).get(key, sample)
@@ -5,7 +5,10 @@ import torch.nn as nn
 from torch.utils.tensorboard import SummaryWriter
 import itertools
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 
+from modulus.distributed.manager import DistributedManager
 from modulus.domain.validator import Validator
 from modulus.domain.inferencer import Inferencer
 from modulus.domain.monitor import Monitor
@@ -36,6 +39,11 @@ class Domain:
         self.monitors = {}
         self.ntk = None
 
+        # host time spent loading batches of every constraint
+        self.load_times = {}
+        self._nr_loads = 0
+        self._load_executor = None
+
     def rec_constraints(self, base_dir: str):
         constraint_data_dir = base_dir + "/constraints/"
         # exist_ok=True to handle race conditions
@@ -117,11 +125,45 @@ class Domain:
         )
 
     def load_data(self, static: bool = False):
+        # fetch and copy batches of all constraints concurrently in threads
+        load_workers = DistributedManager().load_workers
+        if load_workers > 0 and len(self.constraints) > 1:
+            if self._load_executor is None:
+                self._load_executor = ThreadPoolExecutor(
+                    max_workers=load_workers, thread_name_prefix="load_data"
+                )
+            futures = [
+                self._load_executor.submit(self._load_constraint, key, static)
+                for key in self.constraints.keys()
+            ]
+            for future in futures:
+                future.result()
+        else:
+            for key in self.constraints.keys():
+                self._load_constraint(key, static)
+        self._nr_loads += 1
+
+    def _load_constraint(self, key: str, static: bool):
+        tic = time.perf_counter()
+        if static:
+            self.constraints[key].load_data_static()
+        else:
+            self.constraints[key].load_data()
+        self.load_times[key] = self.load_times.get(key, 0.0) + (
+            time.perf_counter() - tic
+        )
+
+    def loading_stats(self):
+        # load time per batch and queue starvation of prefetched constraints
+        stats = {}
+        nr_loads = max(self._nr_loads, 1)
         for key, constraint in self.constraints.items():
-            if static:
-                constraint.load_data_static()
-            else:
-                constraint.load_data()
+            stats[key] = {"load_time": self.load_times.get(key, 0.0) / nr_loads}
+            if hasattr(constraint.dataloader, "stats"):
+                stats[key].update(constraint.dataloader.stats())
+        self.load_times = {}
+        self._nr_loads = 0
+        return stats
 
     def compute_losses(self, step: int):
         losses = {}
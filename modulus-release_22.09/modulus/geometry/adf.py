@@ -1,6 +1,6 @@
 import torch
 import numpy as np
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Union
 
 
 class ADF(torch.nn.Module):
@@ -24,14 +24,17 @@ class ADF(torch.nn.Module):
         raise RuntimeError("No forward method was defined for ADF or its child class")
 
     @staticmethod
-    def r_equivalence(omegas: List[torch.Tensor], m: float = 2.0) -> torch.Tensor:
+    def r_equivalence(
+        omegas: Union[List[torch.Tensor], torch.Tensor], m: float = 2.0
+    ) -> torch.Tensor:
         """
         Computes the R-equivalence of a collection of approximate distance functions
 
         Parameters
         ----------
-        omegas : List[torch.Tensor]
-          List of ADFs used to compute the R-equivalence.
+        omegas : Union[List[torch.Tensor], torch.Tensor]
+          List of ADFs used to compute the R-equivalence or ADFs stacked
+          along the first dimension.
         m: float
           Normalization order
 
@@ -42,10 +45,8 @@ class ADF(torch.nn.Module):
 
         """
 
-        omega_E = torch.zeros_like(omegas[0])
-        for omega in omegas:
-            omega_E += 1.0 / omega**m
-        omega_E = 1.0 / omega_E ** (1.0 / m)
+        omegas = ADF._stack(omegas)
+        omega_E = 1.0 / torch.sum(1.0 / omegas**m, dim=0) ** (1.0 / m)
         return omega_E
 
     @staticmethod
@@ -70,13 +71,53 @@ class ADF(torch.nn.Module):
           Interpolation basis corresponding to the input index
         """
 
-        bases_reduced = [bases[i] for i in range(len(bases)) if i != indx]
-        numerator = torch.prod(torch.stack(bases_reduced), dim=0)
-        denominator = 0.0
-        for j in range(len(bases)):
-            denom_term = [bases[i] for i in range(len(bases)) if i != j]
-            denominator += torch.prod(torch.stack(denom_term), dim=0)
-        w = torch.div(numerator, denominator + eps)
+        return ADF.transfinite_interpolation_weights(bases, eps)[indx]
+
+    @staticmethod
+    def transfinite_interpolation_weights(
+        bases: Union[List[torch.Tensor], torch.Tensor],
+        eps: float = 1e-8,
+        log_domain: bool = False,
+    ) -> torch.Tensor:
+        """
+        Computes all transfinite interpolation bases at once. The product
+        of all bases except one is the product of the bases before and
+        after it, so every weight is found from prefix and suffix products
+        in linear time in the number of bases.
+
+        Parameters
+        ----------
+        bases: Union[List[torch.Tensor], torch.Tensor]
+          List of ADFs used for the transfinite interpolation or ADFs
+          stacked along the first dimension.
+        eps: float
+          Small value to avoid division by zero
+        log_domain: bool
+          If true the products are computed as sums of logarithms and
+          scaled by the largest product, which avoids underflow and
+          overflow for many bases. Bases should then be nonzero where
+          gradients are needed.
+
+        Returns
+        -------
+        w : torch.Tensor
+          Interpolation bases stacked along the first dimension
+        """
+
+        bases = ADF._stack(bases)
+        if log_domain:
+            log_numerators = ADF._exclusive_products(
+                torch.log(torch.abs(bases)), torch.cumsum, 0.0
+            )
+            signs = ADF._exclusive_products(torch.sign(bases), torch.cumprod, 1.0)
+            scale = torch.max(log_numerators, dim=0).values
+            scale = torch.where(torch.isfinite(scale), scale, torch.zeros_like(scale))
+            numerators = signs * torch.exp(log_numerators - scale)
+            denominator = torch.sum(numerators, dim=0) + eps * torch.exp(-scale)
+        else:
+            numerators = ADF._exclusive_products(bases, torch.cumprod, 1.0)
+            denominator = torch.sum(numerators, dim=0) + eps
+        w = torch.div(numerators, denominator)
         return w
 
     @staticmethod
@@ -165,6 +206,97 @@ class ADF(torch.nn.Module):
         ) / (2 * radius)
         return omega
 
+    @staticmethod
+    def infinite_lines_adf(
+        points: Tuple[torch.Tensor], points_1: np.ndarray, points_2: np.ndarray
+    ) -> torch.Tensor:
+        """
+        Same as `infinite_line_adf` for many lines at once
+
+        Parameters
+        ----------
+        points: Tuple[torch.Tensor]
+          ADF will be computed on these points
+        points_1: np.ndarray
+          One of the two points that form every infinite line, `[n, 2]`
+        points_2: np.ndarray
+          One of the two points that form every infinite line, `[n, 2]`
+
+        Returns
+        -------
+        omega : torch.Tensor
+          pointwise approximate distances stacked along the first dimension
+        """
+
+        (x_1, y_1), (x_2, y_2) = ADF._broadcast_points(points, points_1, points_2)
+        L = torch.sqrt((x_2 - x_1) ** 2 + (y_2 - y_1) ** 2)
+        omega = ((points[0] - x_1) * (y_2 - y_1) - (points[1] - y_1) * (x_2 - x_1)) / L
+        return omega
+
+    @staticmethod
+    def line_segments_adf(
+        points: Tuple[torch.Tensor], points_1: np.ndarray, points_2: np.ndarray
+    ) -> torch.Tensor:
+        """
+        Same as `line_segment_adf` for many line segments at once, such as
+        the edges of a polygon
+
+        Parameters
+        ----------
+        points: Tuple[torch.Tensor]
+          ADF will be computed on these points
+        points_1: np.ndarray
+          Points on one end of the line segments, `[n, 2]`
+        points_2: np.ndarray
+          Points on the other end of the line segments, `[n, 2]`
+
+        Returns
+        -------
+        omega : torch.Tensor
+          pointwise approximate distances stacked along the first dimension
+        """
+
+        (x_1, y_1), (x_2, y_2) = ADF._broadcast_points(points, points_1, points_2)
+        L = torch.sqrt((x_2 - x_1) ** 2 + (y_2 - y_1) ** 2)
+        f = ((points[0] - x_1) * (y_2 - y_1) - (points[1] - y_1) * (x_2 - x_1)) / L
+        t = (
+            (L / 2) ** 2
+            - ((points[0] - (x_1 + x_2) / 2) ** 2 + (points[1] - (y_1 + y_2) / 2) ** 2)
+        ) / L
+        phi = torch.sqrt(t**2 + f**4)
+        omega = torch.sqrt(f**2 + ((phi - t) / 2) ** 2)
+        return omega
+
+    @staticmethod
+    def circles_adf(
+        points: Tuple[torch.Tensor], radii: np.ndarray, centers: np.ndarray
+    ) -> torch.Tensor:
+        """
+        Same as `circle_adf` for many circles at once
+
+        Parameters
+        ----------
+        points: Tuple[torch.Tensor]
+          ADF will be computed on these points
+        radii: np.ndarray
+          Radii of the circles, `[n]`
+        centers: np.ndarray
+          Centers of the circles, `[n, 2]`
+
+        Returns
+        -------
+        omega : torch.Tensor
+          pointwise approximate distances stacked along the first dimension
+        """
+
+        (radius,), (x_c, y_c) = ADF._broadcast_points(
+            points, np.reshape(radii, (-1, 1)), centers
+        )
+        omega = (radius**2 - ((points[0] - x_c) ** 2 + (points[1] - y_c) ** 2)) / (
+            2 * radius
+        )
+        return omega
+
     @staticmethod
     def trimmed_circle_adf(
         points: Tuple[torch.Tensor],
@@ -244,3 +376,35 @@ class ADF(torch.nn.Module):
 
         center = ((point_1[0] + point_2[0]) / 2, (point_1[1] + point_2[1]) / 2)
         return center
+
+    @staticmethod
+    def _stack(omegas: Union[List[torch.Tensor], torch.Tensor]) -> torch.Tensor:
+        # lists of ADFs are stacked along a new first dimension
+        if isinstance(omegas, torch.Tensor):
+            return omegas
+        return torch.stack(list(omegas))
+
+    @staticmethod
+    def _exclusive_products(values, cumulative, identity):
+        # cumulative(values) of all entries before and after every entry
+        identity = torch.full_like(values[:1], identity)
+        prefix = cumulative(torch.cat([identity, values[:-1]]), dim=0)
+        suffix = torch.flip(
+            cumulative(torch.flip(torch.cat([values[1:], identity]), [0]), dim=0),
+            [0],
+        )
+        if cumulative is torch.cumsum:
+            return prefix + suffix
+        return prefix * suffix
+
+    @staticmethod
+    def _broadcast_points(points, *arrays):
+        # columns of [n, k] arrays shaped to broadcast against the points
+        shape = (-1,) + (1,) * points[0].dim()
+        broadcast = []
+        for a in arrays:
+            a = torch.as_tensor(
+                np.asarray(a), dtype=points[0].dtype, device=points[0].device
+            )
+            broadcast.append([a[:, i].reshape(shape) for i in range(a.shape[1])])
+        return broadcast
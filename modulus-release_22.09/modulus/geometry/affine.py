@@ -0,0 +1,293 @@
+"""
+Defines affine transforms used to translate, rotate and scale geometries
+and curves
+"""
+
+import itertools
+import numpy as np
+import sympy
+import torch
+
+from .helper import _sympy_func_to_func, _sympy_func_to_torch_func
+
+
+class AffineTransform:
+    """
+    Affine transform stored as homogeneous matrix. Consecutive transforms are
+    composed into a single matrix so transformed geometries and curves only
+    apply one transform to their points.
+
+    Parameters
+    ----------
+    matrix : sympy.Matrix
+        Homogeneous matrix of shape `[dims + 1, dims + 1]` mapping points
+        to transformed points. Entries can be sympy expressions if
+        parameterized.
+    inverse_matrix : sympy.Matrix
+        Inverse of `matrix`.
+    scale : Union[float, sympy.Basic]
+        Uniform scale factor of transform. Used to scale SDF values and
+        curve areas.
+    """
+
+    def __init__(self, matrix, inverse_matrix, scale=1.0):
+        self.matrix = sympy.ImmutableMatrix(matrix)
+        self.inverse_matrix = sympy.ImmutableMatrix(inverse_matrix)
+        self.scale = scale
+        self.dims = self.matrix.shape[0] - 1
+
+        # compile matrices once for all transformed points
+        self._matrix = _compile_matrix(self.matrix)
+        self._inverse_matrix = _compile_matrix(self.inverse_matrix)
+        self._scale = _compile_entry(sympy.sympify(scale))
+
+        # matrices compiled to torch on first use
+        self._torch = None
+
+    @classmethod
+    def translation(cls, xyz, dims):
+        matrix = sympy.eye(dims + 1)
+        inverse_matrix = sympy.eye(dims + 1)
+        for i, x in enumerate(xyz[:dims]):
+            matrix[i, dims] = x
+            inverse_matrix[i, dims] = -x
+        return cls(matrix, inverse_matrix)
+
+    @classmethod
+    def rotation(cls, angle, axis, dims):
+        i, j = [k for k, key in enumerate(["x", "y", "z"][:dims]) if key != axis]
+        matrix = sympy.eye(dims + 1)
+        matrix[i, i] = sympy.cos(angle)
+        matrix[i, j] = -sympy.sin(angle)
+        matrix[j, i] = sympy.sin(angle)
+        matrix[j, j] = sympy.cos(angle)
+        return cls(matrix, matrix.T)
+
+    @classmethod
+    def scaling(cls, x, dims):
+        matrix = sympy.eye(dims + 1)
+        inverse_matrix = sympy.eye(dims + 1)
+        for i in range(dims):
+            matrix[i, i] = x
+            inverse_matrix[i, i] = 1 / sympy.sympify(x)
+        return cls(matrix, inverse_matrix, x)
+
+    def compose(self, other):
+        """
+        Returns transform applying `other` first and then this transform.
+        """
+
+        return AffineTransform(
+            self.matrix * other.matrix,
+            other.inverse_matrix * self.inverse_matrix,
+            _simplify_number(sympy.sympify(self.scale) * other.scale),
+        )
+
+    def transform_points(self, invar, params, dims, inverse=False):
+        """
+        Transforms points in `invar` returning dictionary of transformed
+        coordinates.
+        """
+
+        matrix = self._inverse_matrix if inverse else self._matrix
+        return _apply(matrix, invar, params, dims, offset=True)
+
+    def transform_normals(self, invar, params, dims):
+        """
+        Transforms normals in `invar` with the inverse transpose of the
+        transform. For rotations and uniform scaling this is the rotation
+        part of the transform so normals keep unit length.
+        """
+
+        normals = {key: invar["normal_" + key] for key in dims}
+        rotation = _rotation(self._matrix, self._scale, params)
+        return {
+            "normal_" + key: value
+            for key, value in _apply(
+                rotation, normals, params, dims, offset=False
+            ).items()
+        }
+
+    def compute_scale(self, params):
+        return _eval_entry(self._scale, params)
+
+    def transform_points_torch(self, invar, params, dims, inverse=False):
+        """
+        Same as `transform_points` for tensors.
+        """
+
+        matrix, inverse_matrix, _ = self._compile_torch()
+        matrix = inverse_matrix if inverse else matrix
+        return _apply_torch(matrix, invar, params, dims, offset=True)
+
+    def transform_normals_torch(self, invar, params, dims):
+        """
+        Same as `transform_normals` for tensors.
+        """
+
+        matrix, _, scale = self._compile_torch()
+        normals = {key: invar["normal_" + key] for key in dims}
+        rotation = _rotation(matrix, scale, params)
+        return {
+            "normal_" + key: value
+            for key, value in _apply_torch(
+                rotation, normals, params, dims, offset=False
+            ).items()
+        }
+
+    def compute_scale_torch(self, params):
+        return _eval_entry(self._compile_torch()[2], params)
+
+    def _compile_torch(self):
+        if self._torch is None:
+            self._torch = (
+                _compile_matrix(self.matrix, _sympy_func_to_torch_func),
+                _compile_matrix(self.inverse_matrix, _sympy_func_to_torch_func),
+                _compile_entry(sympy.sympify(self.scale), _sympy_func_to_torch_func),
+            )
+        return self._torch
+
+
+def decompose_similarity(transforms):
+    """
+    Splits homogeneous matrices of rotations, reflections, uniform scaling
+    and translations into their linear part, translation and scale factor.
+
+    Parameters
+    ----------
+    transforms : np.ndarray
+        Homogeneous matrices of shape `[nr_transforms, dims + 1, dims + 1]`.
+
+    Returns
+    -------
+    linear : np.ndarray
+        Linear parts of shape `[nr_transforms, dims, dims]`.
+    translation : np.ndarray
+        Translations of shape `[nr_transforms, dims]`.
+    scale : np.ndarray
+        Scale factors of shape `[nr_transforms]`.
+    """
+
+    transforms = np.asarray(transforms, dtype=float)
+    dims = transforms.shape[1] - 1
+    linear = transforms[:, :dims, :dims]
+    translation = transforms[:, :dims, dims]
+    scale = np.abs(np.linalg.det(linear)) ** (1.0 / dims)
+    gram = np.matmul(linear, np.transpose(linear, (0, 2, 1)))
+    if np.any(scale == 0) or not np.allclose(
+        gram, scale[:, None, None] ** 2 * np.eye(dims)
+    ):
+        raise ValueError(
+            "Only rotations, reflections, uniform scaling and translations are supported"
+        )
+    return linear, translation, scale
+
+
+def _simplify_number(x):
+    # sympy numbers are converted to floats
+    if isinstance(x, sympy.Basic) and x.is_number:
+        return float(x)
+    return x
+
+
+def _compile_entry(entry, compile_func=_sympy_func_to_func):
+    if entry.is_number:
+        return float(entry)
+    return compile_func(entry)
+
+
+def _compile_matrix(matrix, compile_func=_sympy_func_to_func):
+    # numeric matrices become arrays and parameterized entries functions
+    if not matrix.free_symbols:
+        return np.array(matrix.tolist(), dtype=float)
+    return [
+        [_compile_entry(entry, compile_func) for entry in row]
+        for row in matrix.tolist()
+    ]
+
+
+def _eval_entry(entry, params):
+    if isinstance(entry, float):
+        return entry
+    return entry(params)
+
+
+def _divide_entry(entry, scale):
+    if isinstance(entry, float) and isinstance(scale, float):
+        return entry / scale
+    return lambda params: _eval_entry(entry, params) / scale
+
+
+def _rotation(matrix, scale, params):
+    # rotation part of compiled matrix
+    if isinstance(matrix, np.ndarray) and isinstance(scale, float):
+        return matrix / scale
+    scale = _eval_entry(scale, params)
+    return [[_divide_entry(entry, scale) for entry in row] for row in matrix]
+
+
+def _apply(matrix, invar, params, dims, offset=True):
+    nr_dims = len(dims)
+
+    # numeric transforms are a single matrix product on stacked points
+    if isinstance(matrix, np.ndarray):
+        points = np.concatenate([invar[key] for key in dims], axis=1)
+        matrix = matrix.astype(np.result_type(points, np.float32), copy=False)
+        transformed_points = np.matmul(points, matrix[:nr_dims, :nr_dims].T)
+        if offset:
+            transformed_points += matrix[:nr_dims, nr_dims]
+        return {key: transformed_points[:, i : i + 1] for i, key in enumerate(dims)}
+    return _apply_entries(matrix, invar, params, dims, offset, np.zeros_like)
+
+
+def _apply_torch(matrix, invar, params, dims, offset=True):
+    nr_dims = len(dims)
+
+    # numeric transforms are a single matrix product on stacked points
+    if isinstance(matrix, np.ndarray):
+        points = torch.cat([invar[key] for key in dims], dim=1)
+        matrix = torch.as_tensor(matrix, dtype=points.dtype, device=points.device)
+        transformed_points = torch.matmul(points, matrix[:nr_dims, :nr_dims].T)
+        if offset:
+            transformed_points = transformed_points + matrix[:nr_dims, nr_dims]
+        return {key: transformed_points[:, i : i + 1] for i, key in enumerate(dims)}
+    return _apply_entries(matrix, invar, params, dims, offset, torch.zeros_like)
+
+
+def _apply_entries(matrix, invar, params, dims, offset, zeros_like):
+    # parameterized transforms evaluate each nonzero entry
+    nr_dims = len(dims)
+    transformed_invar = {}
+    for i, key in enumerate(dims):
+        terms = [
+            _eval_entry(matrix[i][j], params) * invar[dims[j]]
+            for j in range(nr_dims)
+            if not (isinstance(matrix[i][j], float) and matrix[i][j] == 0)
+        ]
+        if offset:
+            terms.append(_eval_entry(matrix[i][nr_dims], params))
+        value = terms[0]
+        for term in terms[1:]:
+            value = value + term
+        transformed_invar[key] = value + zeros_like(invar[key])
+    return transformed_invar
+
+
+def lattice_transforms(spacing, repeat_lower, repeat_higher):
+    """
+    Returns homogeneous matrices of translations by `spacing` times every
+    integer offset between `repeat_lower` and `repeat_higher`.
+    """
+
+    offsets = np.array(
+        list(
+            itertools.product(
+                *[range(rl, rh + 1) for rl, rh in zip(repeat_lower, repeat_higher)]
+            )
+        ),
+        dtype=float,
+    )
+    dims = offsets.shape[1]
+    transforms = np.tile(np.eye(dims + 1), (offsets.shape[0], 1, 1))
+    transforms[:, :dims, dims] = spacing * offsets
+    return transforms
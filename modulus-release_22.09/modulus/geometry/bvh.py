@@ -0,0 +1,377 @@
+"""
+Bounding volume hierarchy used by CSG operations to only evaluate the SDF
+of operands whose bounds are close to the points, and CSG operations of
+curves used to check boundary points only against nearby operands
+"""
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from modulus.constants import diff_str
+
+
+# fewer operands are cheaper to evaluate directly
+MIN_BVH_OPERANDS = 32
+
+
+def numeric_bounds(geometry):
+    """
+    Returns lower and upper bound arrays of a geometry or None if its bounds
+    are parameterized or do not bound its SDF.
+    """
+
+    if not geometry.bounded_sdf:
+        return None
+    bound_ranges = {
+        str(key): value for key, value in geometry.bounds.bound_ranges.items()
+    }
+    lower, upper = [], []
+    for d in geometry.dims:
+        l, u = bound_ranges[d]
+        if not (isinstance(l, (float, int)) and isinstance(u, (float, int))):
+            return None
+        lower.append(l)
+        upper.append(u)
+    return np.array(lower, dtype=float), np.array(upper, dtype=float)
+
+
+def csg_operands(geometry, op):
+    """
+    Returns operands of nested CSG operations of the same type, a union of
+    unions gives all operands of the union.
+    """
+
+    if geometry._csg is None or geometry._csg[0] != op:
+        return [geometry]
+    return [g for child in geometry._csg[1] for g in csg_operands(child, op)]
+
+
+def subtract_operands(geometry):
+    """
+    Returns base geometry and subtracted operands of nested subtractions,
+    `(a - b) - (c + d)` gives `a` and `[b, c, d]`.
+    """
+
+    if geometry._csg is None or geometry._csg[0] != "subtract":
+        return geometry, []
+    base, operands = subtract_operands(geometry._csg[1][0])
+    return base, operands + csg_operands(geometry._csg[1][1], "union")
+
+
+def build_bvh(lower, upper):
+    """
+    Builds bounding volume hierarchy over boxes by splitting at the median
+    box center along the axis with largest spread.
+
+    Parameters
+    ----------
+    lower : np.ndarray
+        Lower bounds of boxes with shape `[nr_boxes, dims]`.
+    upper : np.ndarray
+        Upper bounds of boxes with shape `[nr_boxes, dims]`.
+
+    Returns
+    -------
+    node : tuple
+        Root node `(lower, upper, children)` where children is a list of two
+        nodes or the index of the box for leaf nodes.
+    """
+
+    def _build(index):
+        node_lower = np.min(lower[index], axis=0)
+        node_upper = np.max(upper[index], axis=0)
+        if index.shape[0] == 1:
+            return (node_lower, node_upper, int(index[0]))
+        centers = (lower[index] + upper[index]) / 2.0
+        axis = np.argmax(np.ptp(centers, axis=0))
+        index = index[np.argsort(centers[:, axis], kind="stable")]
+        half = index.shape[0] // 2
+        return (node_lower, node_upper, [_build(index[:half]), _build(index[half:])])
+
+    return _build(np.arange(lower.shape[0]))
+
+
+def build_seed_grid(lower, upper):
+    """
+    Builds uniform grid over boxes storing the box with closest center to
+    each cell center. Used to cheaply find a close box for points.
+
+    Parameters
+    ----------
+    lower : np.ndarray
+        Lower bounds of boxes with shape `[nr_boxes, dims]`.
+    upper : np.ndarray
+        Upper bounds of boxes with shape `[nr_boxes, dims]`.
+
+    Returns
+    -------
+    grid : tuple
+        Grid lower bound, cell size and array of box indices for each cell.
+    """
+
+    nr_boxes, dims = lower.shape
+    resolution = int(min(np.ceil(2 * nr_boxes ** (1.0 / dims)), 64))
+    grid_lower = np.min(lower, axis=0)
+    extent = np.max(upper, axis=0) - grid_lower
+    cell_size = np.where(extent > 0, extent / resolution, 1.0)
+    cells = np.indices((resolution,) * dims).reshape(dims, -1).T
+    _, cell_box = cKDTree((lower + upper) / 2.0).query(
+        grid_lower + (cells + 0.5) * cell_size
+    )
+    return grid_lower, cell_size, cell_box.reshape((resolution,) * dims)
+
+
+def _grid_lookup(points, grid):
+    # box stored in grid cell of each point, points outside use closest cell
+    grid_lower, cell_size, cell_box = grid
+    cells = [
+        np.clip(np.floor((p - l) / h).astype(int), 0, cell_box.shape[0] - 1)
+        for p, l, h in zip(points, grid_lower, cell_size)
+    ]
+    return cell_box[tuple(cells)]
+
+
+def _squared_box_distance(points, lower, upper):
+    # squared distance from points, list of coordinate arrays, to box
+    squared_distance = 0.0
+    for p, l, u in zip(points, lower, upper):
+        outside = np.maximum(np.maximum(l - p, p - u), 0)
+        squared_distance = squared_distance + outside * outside
+    return squared_distance
+
+
+def _index(values, index, nr_points):
+    # index arrays with a value per point and pass others unchanged
+    return {
+        key: value[index]
+        if isinstance(value, np.ndarray)
+        and value.ndim > 0
+        and value.shape[0] == nr_points
+        else value
+        for key, value in values.items()
+    }
+
+
+def max_sdf(sdfs, bounds, dims, negate_first=False):
+    """
+    Makes SDF function computing the maximum of SDFs. SDFs with bounds are
+    stored in a bounding volume hierarchy and only evaluated at points where
+    minus the distance to their bounds, an upper bound of the SDF, is not
+    below the current maximum. The result is the same as evaluating all SDFs
+    as long as the bounded SDFs are at most minus the distance to their
+    bounds outside of them.
+
+    Parameters
+    ----------
+    sdfs : List[Callable]
+        SDF functions of operands.
+    bounds : List[Union[None, Tuple[np.ndarray, np.ndarray]]]
+        Lower and upper bounds of each SDF, None if the SDF is evaluated at
+        all points.
+    dims : List[str]
+        Spatial dimensions of SDFs.
+    negate_first : bool
+        If true the first SDF is negated before taking the maximum, used to
+        compute subtractions as `-max(-sdf_1, sdf_2, ...)`.
+    """
+
+    culled = [i for i, b in enumerate(bounds) if b is not None]
+    always = [i for i, b in enumerate(bounds) if b is None]
+    bvh = []  # built on first call
+
+    def sdf(invar, params, compute_sdf_derivatives=False):
+        if culled and not bvh:
+            lower = np.stack([bounds[i][0] for i in culled])
+            upper = np.stack([bounds[i][1] for i in culled])
+            bvh.extend([build_bvh(lower, upper), build_seed_grid(lower, upper)])
+        keys = ["sdf"] + (
+            ["sdf" + diff_str + d for d in dims] if compute_sdf_derivatives else []
+        )
+        points = [invar[d][:, 0] for d in dims]
+        nr_points = points[0].shape[0]
+
+        # current maximum starts at the SDFs evaluated everywhere
+        computed_sdf = {
+            key: np.full(
+                (nr_points, 1), -np.inf if key == "sdf" else 0.0, points[0].dtype
+            )
+            for key in keys
+        }
+
+        def _update(i, index, index_invar, index_params):
+            operand_sdf = sdfs[i](index_invar, index_params, compute_sdf_derivatives)
+            sign = -1.0 if negate_first and i == 0 else 1.0
+            update = (sign * operand_sdf["sdf"] >= computed_sdf["sdf"][index])[:, 0]
+            for key in keys:
+                value = np.broadcast_to(operand_sdf[key], (index.shape[0], 1))
+                computed_sdf[key][index[update]] = sign * value[update]
+
+        all_index = np.arange(nr_points)
+        for i in always:
+            _update(i, all_index, invar, params)
+
+        def _evaluate(leaf, index):
+            if index.shape[0] == 0:
+                return
+            _update(
+                culled[leaf],
+                index,
+                _index(invar, index, nr_points),
+                _index(params, index, nr_points),
+            )
+
+        def _visit(node, index, node_points):
+            # skip points where upper bound of sdf is below current maximum
+            squared_distance = _squared_box_distance(node_points, node[0], node[1])
+            # points inside node are never skipped
+            reach = np.minimum(computed_sdf["sdf"][index, 0], 0)
+            keep = squared_distance <= reach**2
+            index, node_points = index[keep], [p[keep] for p in node_points]
+            if index.shape[0] == 0:
+                return
+            children = node[2]
+            if isinstance(children, int):
+                _evaluate(children, index[seed_leaf[index] != children])
+            else:
+                _visit(children[0], index, node_points)
+                _visit(children[1], index, node_points)
+
+        if culled:
+            # start from a close operand so most others are skipped
+            seed_leaf = _grid_lookup(points, bvh[1])
+            order = np.argsort(seed_leaf, kind="stable")
+            for index in np.split(order, np.flatnonzero(np.diff(seed_leaf[order])) + 1):
+                _evaluate(seed_leaf[index[0]], index)
+            _visit(bvh[0], all_index, points)
+
+        if negate_first:
+            for key in keys:
+                np.negative(computed_sdf[key], out=computed_sdf[key])
+        return computed_sdf
+
+    return sdf
+
+
+def curve_csg(geometry):
+    """
+    Returns for every curve of a geometry the CSG operations applied after
+    the geometry that made the curve, outermost first. The last operation is
+    `("leaf", geometry)` with the geometry whose SDF is evaluated on the
+    curve. Nested unions and subtractions are flattened so every operand of
+    them is a sibling of the curve.
+    """
+
+    op = None if geometry._csg is None else geometry._csg[0]
+    children = [] if op is None else geometry._csg[1]
+    steps = []
+    if op == "affine":
+        steps = [[("affine", geometry._csg[2][0])] + s for s in curve_csg(children[0])]
+    elif op == "invert":
+        steps = [[("invert", None)] + s for s in curve_csg(children[0])]
+    elif op in ("union", "intersect"):
+        if op == "union":
+            operands = csg_operands(geometry, "union")
+        else:
+            operands = children
+        siblings = _siblings(operands)
+        for i, g in enumerate(operands):
+            steps += [[(op, (siblings, i))] + s for s in curve_csg(g)]
+    elif op == "subtract":
+        base, operands = subtract_operands(geometry)
+        siblings = _siblings(operands)
+        base_sibling = _siblings([base])
+        steps = [[("subtract", (siblings, -1))] + s for s in curve_csg(base)]
+        for i, g in enumerate(operands):
+            steps += [
+                [("subtracted", (siblings, i, base_sibling))] + s for s in curve_csg(g)
+            ]
+
+    # curves not made by the operands are checked with the whole geometry
+    if len(steps) != len(geometry.curves):
+        steps = [[("leaf", geometry)] for _ in geometry.curves]
+    return steps
+
+
+def curve_csg_sdf(steps, invar, params, dims):
+    """
+    Evaluates SDF of a geometry at points close to a curve using the CSG
+    operations of the curve from `curve_csg`. Siblings of the curve are only
+    evaluated at points inside their bounds and taken as minus infinity
+    elsewhere, which keeps the sign of the SDF but not its value.
+    """
+
+    op, args = steps[0]
+    if op == "leaf":
+        return args.sdf(invar, params, compute_sdf_derivatives=False)["sdf"]
+    if op == "affine":
+        transformed_invar = {
+            **invar,
+            **args.transform_points(invar, params, dims, inverse=True),
+        }
+        value = curve_csg_sdf(steps[1:], transformed_invar, params, dims)
+        return value * args.compute_scale(params)
+    value = curve_csg_sdf(steps[1:], invar, params, dims)
+    if op == "invert":
+        return -value
+    if op == "union":
+        for sibling_value in _sibling_sdfs(*args, invar, params, dims):
+            value = np.maximum(value, sibling_value)
+    elif op == "intersect":
+        for sibling_value in _sibling_sdfs(*args, invar, params, dims, False):
+            value = np.minimum(value, sibling_value)
+    elif op == "subtract":
+        for sibling_value in _sibling_sdfs(*args, invar, params, dims):
+            value = np.minimum(value, -sibling_value)
+    elif op == "subtracted":
+        siblings, index, base_sibling = args
+        for sibling_value in _sibling_sdfs(siblings, index, invar, params, dims):
+            value = np.maximum(value, sibling_value)
+        for base_value in _sibling_sdfs(base_sibling, -1, invar, params, dims, False):
+            value = np.minimum(base_value, -value)
+    return value
+
+
+def _siblings(operands):
+    # operands with bounds, infinite bounds if SDF is not bounded
+    lower, upper = [], []
+    for g in operands:
+        bounds = numeric_bounds(g)
+        if bounds is None:
+            bounds = (np.full(len(g.dims), -np.inf), np.full(len(g.dims), np.inf))
+        lower.append(bounds[0])
+        upper.append(bounds[1])
+    return operands, np.stack(lower), np.stack(upper)
+
+
+def _sibling_sdfs(siblings, index, invar, params, dims, skip_far=True):
+    # sdf of operands other than index, minus infinity outside of bounds,
+    # operands far from all points are skipped if skip_far
+    operands, lower, upper = siblings
+    points = [invar[d][:, 0] for d in dims]
+    nr_points = points[0].shape[0]
+    near = np.full(len(operands), nr_points > 0)
+    if nr_points > 0:
+        for i, p in enumerate(points):
+            near &= (lower[:, i] <= np.max(p)) & (upper[:, i] >= np.min(p))
+    candidates = np.flatnonzero(near) if skip_far else range(len(operands))
+    for j in candidates:
+        if j == index:
+            continue
+        value = np.full((nr_points, 1), -np.inf)
+        if not near[j]:
+            yield value
+            continue
+        inside = np.ones(nr_points, dtype=bool)
+        for i, p in enumerate(points):
+            inside &= (p >= lower[j, i]) & (p <= upper[j, i])
+        inside = np.flatnonzero(inside)
+        if 2 * inside.shape[0] > nr_points:
+            # cheaper to evaluate all points than to index most of them
+            value[:] = operands[j].sdf(invar, params, False)["sdf"]
+        elif inside.shape[0] > 0:
+            value[inside] = operands[j].sdf(
+                _index(invar, inside, nr_points),
+                _index(params, inside, nr_points),
+                False,
+            )["sdf"]
+        yield value
@@ -6,85 +6,93 @@ import types
 import numpy as np
 import sympy
 import symengine
-from chaospy.distributions.sampler.sequences.primes import create_primes
-from chaospy.distributions.sampler.sequences.van_der_corput import (
-    create_van_der_corput_samples as create_samples,
-)
+import torch
 
 from modulus.utils.sympy import np_lambdify
 from .parameterization import Parameterization, Parameter
-from .helper import _sympy_func_to_func
+from .helper import (
+    _sympy_func_to_func,
+    _sympy_func_to_torch_func,
+    _rejection_sample,
+    _cast_floats,
+)
+from .affine import AffineTransform, decompose_similarity
 
 
 class Curve:
     """A Curve object that keeps track of the surface/perimeter of a geometry.
     The curve object also contains normals and area/length of curve.
+
+    Parameters
+    ----------
+    sample : Callable
+        Function sampling points, normals and area on the curve.
+    dims : int
+        Number of spatial dimensions of the curve.
+    parameterization : Parameterization
+        Parameterization of the curve.
+    area : Union[float, None]
+        Exact area of the curve if known. Used instead of estimating the area
+        by sampling.
+    torch_sample : Union[Callable, None]
+        Function sampling the same as `sample` with float64 tensors on a
+        given device. None if the curve can only be sampled with numpy.
     """
 
-    def __init__(self, sample, dims, parameterization=Parameterization()):
+    def __init__(
+        self,
+        sample,
+        dims,
+        parameterization=Parameterization(),
+        area=None,
+        torch_sample=None,
+    ):
         # store attributes
         self._sample = sample
+        self._torch_sample = torch_sample
         self._dims = dims
         self.parameterization = parameterization
+        self.area = area
+
+        # untransformed samples and transform if made by affine transforms
+        self._affine = None
 
     def sample(
-        self, nr_points, criteria=None, parameterization=None, quasirandom=False
+        self,
+        nr_points,
+        criteria=None,
+        parameterization=None,
+        quasirandom=False,
+        dtype=np.float64,
     ):
         # use internal parameterization if not given
         if parameterization is None:
             parameterization = self.parameterization
 
-        # continually sample points throwing out points that don't satisfy criteria
-        invar = {
-            key: np.empty((0, 1))
-            for key in self.dims + ["normal_" + x for x in self.dims] + ["area"]
-        }
-        params = {key: np.empty((0, 1)) for key in parameterization.parameters}
-        total_sampled = 0
-        total_tried = 0
-        nr_try = 0
-        while True:
-            # sample curve
+        # sample candidates and keep points satisfying criteria
+        def _sample(nr_candidates):
             local_invar, local_params = self._sample(
-                nr_points, parameterization, quasirandom
+                nr_candidates, parameterization, quasirandom
             )
+            local_invar = _cast_floats(local_invar, dtype)
+            local_params = _cast_floats(local_params, dtype)
 
-            # compute given criteria and remove points
-            if criteria is not None:
-                computed_criteria = criteria(local_invar, local_params)
-                local_invar = {
-                    key: value[computed_criteria[:, 0], :]
-                    for key, value in local_invar.items()
-                }
-                local_params = {
-                    key: value[computed_criteria[:, 0], :]
-                    for key, value in local_params.items()
-                }
-
-            # store invar
-            for key in local_invar.keys():
-                invar[key] = np.concatenate([invar[key], local_invar[key]], axis=0)
-
-            # store params
-            for key in local_params.keys():
-                params[key] = np.concatenate([params[key], local_params[key]], axis=0)
-
-            # keep track of sampling
-            total_sampled = next(iter(invar.values())).shape[0]
-            total_tried += nr_points
-            nr_try += 1
-
-            # break when finished sampling
-            if total_sampled >= nr_points:
-                for key, value in invar.items():
-                    invar[key] = value[:nr_points]
-                for key, value in params.items():
-                    params[key] = value[:nr_points]
-                break
+            # area of points as if nr_points were sampled
+            local_invar["area"] = local_invar["area"] * (nr_candidates / nr_points)
 
-            # check if couldn't sample
-            if nr_try > 1000 and total_sampled < 1:
-                raise Exception("Unable to sample curve")
+            # compute given criteria
+            if criteria is not None:
+                computed_criteria = criteria(local_invar, local_params)[:, 0]
+            else:
+                computed_criteria = np.ones(nr_candidates, dtype=bool)
+            return [local_invar, local_params], computed_criteria
+
+        (invar, params), _, _ = _rejection_sample(
+            _sample,
+            nr_points,
+            max_nr_try=1000,
+            error_message="Unable to sample curve",
+        )
 
         return invar, params
 
@@ -145,41 +153,10 @@ class Curve:
           scale factor.
         """
 
-        def _sample(internal_sample, dims, x):
-            if isinstance(x, (float, int)):
-                pass
-            elif isinstance(x, sympy.Basic):
-                x = _sympy_func_to_func(x)
-            else:
-                raise TypeError("Scaling by type " + str(type(x)) + "is not supported")
-
-            def sample(
-                nr_points, parameterization=Parameterization(), quasirandom=False
-            ):
-                # sample points
-                invar, params = internal_sample(
-                    nr_points, parameterization, quasirandom
-                )
-
-                # compute scale if needed
-                if isinstance(x, (float, int)):
-                    computed_scale = x
-                else:
-                    computed_scale = s(params)
-
-                # scale invar
-                for d in dims:
-                    invar[d] *= x
-                invar["area"] *= x ** (len(dims) - 1)
-
-                return invar, params
-
-            return sample
-
-        return Curve(
-            _sample(self._sample, self.dims, x),
-            len(self.dims),
-            self.parameterization.union(parameterization),
+        if not isinstance(x, (float, int, sympy.Basic)):
+            raise TypeError("Scaling by type " + str(type(x)) + "is not supported")
+        return self._transform(
+            AffineTransform.scaling(x, len(self.dims)), parameterization
         )
 
     def translate(self, xyz, parameterization=Parameterization()):
@@ -192,45 +169,13 @@ class Curve:
           translate curve by these values.
         """
 
-        def _sample(internal_sample, dims, xyz):
-            compiled_xyz = []
-            for i, x in enumerate(xyz):
-                if isinstance(x, (float, int)):
-                    compiled_xyz.append(x)
-                elif isinstance(x, sympy.Basic):
-                    compiled_xyz.append(_sympy_func_to_func(x))
-                else:
-                    raise TypeError(
-                        "Translate by type " + str(type(x)) + "is not supported"
-                    )
-
-            def sample(
-                nr_points, parameterization=Parameterization(), quasirandom=False
-            ):
-                # sample points
-                invar, params = internal_sample(
-                    nr_points, parameterization, quasirandom
+        for x in xyz:
+            if not isinstance(x, (float, int, sympy.Basic)):
+                raise TypeError(
+                    "Translate by type " + str(type(x)) + "is not supported"
                 )
-
-                # compute translation if needed
-                computed_translation = []
-                for x in compiled_xyz:
-                    if isinstance(x, (float, int)):
-                        computed_translation.append(x)
-                    else:
-                        computed_translation.append(x(params))
-
-                # translate invar
-                for d, x in zip(dims, computed_translation):
-                    invar[d] += x
-                return invar, params
-
-            return sample
-
-        return Curve(
-            _sample(self._sample, self.dims, xyz),
-            len(self.dims),
-            self.parameterization.union(parameterization),
+        return self._transform(
+            AffineTransform.translation(xyz, len(self.dims)), parameterization
         )
 
     def rotate(self, angle, axis, parameterization=Parameterization()):
@@ -243,16 +188,26 @@ class Curve:
           scale factor.
         """
 
-        def _sample(internal_sample, dims, angle, axis):
-            if isinstance(angle, (float, int)):
-                pass
-            elif isinstance(angle, sympy.Basic):
-                angle = _sympy_func_to_func(angle)
-            else:
-                raise TypeError(
-                    "Scaling by type " + str(type(angle)) + "is not supported"
-                )
+        if not isinstance(angle, (float, int, sympy.Basic)):
+            raise TypeError("Scaling by type " + str(type(angle)) + "is not supported")
+        return self._transform(
+            AffineTransform.rotation(angle, axis, len(self.dims)), parameterization
+        )
 
+    def _transform(self, transform, parameterization):
+        # exact area is kept if the scale is not parameterized, the area of
+        # this curve already includes the scale of its own transform
+        area = None
+        if self.area is not None and isinstance(transform.scale, (float, int)):
+            area = self.area * transform.scale ** (len(self.dims) - 1)
+
+        # compose with transform of this curve so only one is applied
+        internal_sample, internal_torch_sample = self._sample, self._torch_sample
+        if self._affine is not None:
+            internal_sample, internal_torch_sample, internal_transform = self._affine
+            transform = transform.compose(internal_transform)
+
+        def _sample(internal_sample, dims, transform):
             def sample(
                 nr_points, parameterization=Parameterization(), quasirandom=False
             ):
@@ -261,41 +216,46 @@ class Curve:
                     nr_points, parameterization, quasirandom
                 )
 
-                # compute translation if needed
-                if isinstance(angle, (float, int)):
-                    computed_angle = angle
-                else:
-                    computed_angle = angle(params)
-
-                # angle invar
-                rotated_invar = {**invar}
-                rotated_dims = [key for key in self.dims if key != axis]
-                rotated_invar[rotated_dims[0]] = (
-                    np.cos(computed_angle) * invar[rotated_dims[0]]
-                    - np.sin(computed_angle) * invar[rotated_dims[1]]
-                )
-                rotated_invar["normal_" + rotated_dims[0]] = (
-                    np.cos(computed_angle) * invar["normal_" + rotated_dims[0]]
-                    - np.sin(computed_angle) * invar["normal_" + rotated_dims[1]]
+                # transform points, normals and area
+                invar.update(transform.transform_points(invar, params, dims))
+                invar.update(transform.transform_normals(invar, params, dims))
+                invar["area"] = invar["area"] * transform.compute_scale(params) ** (
+                    len(dims) - 1
                 )
-                rotated_invar[rotated_dims[1]] = (
-                    np.sin(computed_angle) * invar[rotated_dims[0]]
-                    + np.cos(computed_angle) * invar[rotated_dims[1]]
-                )
-                rotated_invar["normal_" + rotated_dims[1]] = (
-                    np.sin(computed_angle) * invar["normal_" + rotated_dims[0]]
-                    + np.cos(computed_angle) * invar["normal_" + rotated_dims[1]]
+                return invar, params
+
+            return sample
+
+        def _torch_sample(internal_torch_sample, dims, transform):
+            def torch_sample(
+                nr_points, parameterization=Parameterization(), device=None
+            ):
+                # sample points
+                invar, params = internal_torch_sample(
+                    nr_points, parameterization, device
                 )
 
-                return rotated_invar, params
+                # transform points, normals and area
+                invar.update(transform.transform_points_torch(invar, params, dims))
+                invar.update(transform.transform_normals_torch(invar, params, dims))
+                invar["area"] = invar["area"] * transform.compute_scale_torch(
+                    params
+                ) ** (len(dims) - 1)
+                return invar, params
 
-            return sample
+            return torch_sample
 
-        return Curve(
-            _sample(self._sample, self.dims, angle, axis),
+        new_curve = Curve(
+            _sample(internal_sample, self.dims, transform),
             len(self.dims),
             self.parameterization.union(parameterization),
+            area=area,
+            torch_sample=None
+            if internal_torch_sample is None
+            else _torch_sample(internal_torch_sample, self.dims, transform),
         )
+        new_curve._affine = (internal_sample, internal_torch_sample, transform)
+        return new_curve
 
     def invert_normal(self):
         def _sample(internal_sample, dims):
@@ -309,8 +269,25 @@ class Curve:
 
             return sample
 
+        def _torch_sample(internal_torch_sample, dims):
+            def torch_sample(
+                nr_points, parameterization=Parameterization(), device=None
+            ):
+                s, p = internal_torch_sample(nr_points, parameterization, device)
+                for d in dims:
+                    s["normal_" + d] = -s["normal_" + d]
+                return s, p
+
+            return torch_sample
+
         return Curve(
-            _sample(self._sample, self.dims), len(self.dims), self.parameterization
+            _sample(self._sample, self.dims),
+            len(self.dims),
+            self.parameterization,
+            area=self.area,
+            torch_sample=None
+            if self._torch_sample is None
+            else _torch_sample(self._torch_sample, self.dims),
         )
 
 
@@ -333,7 +310,8 @@ class SympyCurve(Curve):
         This gives the ranges for the parameters in the parameterized
         curve. For example, a circle might have `ranges = {theta: (0, 2*pi)}`.
     area : float, int, SymPy Exprs
-        The surface area/perimeter of the curve.
+        The surface area/perimeter of the curve. Constant areas of curves
+        without criteria are stored as exact area.
     criteria : SymPy Boolean Function
         If this boolean expression is false then we do not
         sample their on curve. This can be used to enforce
@@ -370,6 +348,7 @@ class SympyCurve(Curve):
         lambdify_functions["area"] = area_fn
 
         # lambdify criteria function
+        sympy_criteria = criteria
         if criteria is not None:
             criteria = _sympy_func_to_func(criteria)
 
@@ -388,10 +367,7 @@ class SympyCurve(Curve):
                 invar = {
                     str(key): np.empty((0, 1)) for key in lambdify_functions.keys()
                 }
-                params = {
-                    str(key): np.empty((0, 1))
-                    for key in parameterization.param_ranges.keys()
-                }
+                params = {key: np.empty((0, 1)) for key in parameterization.parameters}
                 total_sampled = 0
                 total_tried = 0
                 nr_try = 0
@@ -463,10 +439,187 @@ class SympyCurve(Curve):
 
             return sample
 
+        # create closure for torch sample function, compiled on first use
+        def _torch_sample(functions, area, criteria, internal_parameterization):
+            compiled = {}
+
+            def torch_sample(
+                nr_points, parameterization=Parameterization(), device=None
+            ):
+                # compile sympy functions to torch
+                if not compiled:
+                    for key, func in {**functions, "area": area}.items():
+                        try:
+                            compiled[key] = float(func)
+                        except:
+                            compiled[key] = _sympy_func_to_torch_func(func)
+                    compiled["criteria"] = (
+                        None
+                        if criteria is None
+                        else _sympy_func_to_torch_func(criteria)
+                    )
+                torch_criteria = compiled["criteria"]
+
+                # use internal parameterization if not given
+                i_parameterization = internal_parameterization.copy()
+                for key, value in parameterization.param_ranges.items():
+                    i_parameterization.param_ranges[key] = value
+
+                # continually sample points throwing out points that don't satisfy criteria
+                list_invar, list_params = [], []
+                total_sampled = 0
+                nr_try = 0
+                while total_sampled < nr_points:
+                    # sample parameter ranges
+                    local_params = i_parameterization.sample_torch(nr_points, device)
+
+                    # compute curve points from functions
+                    local_invar = {}
+                    for key, func in compiled.items():
+                        if key == "criteria":
+                            continue
+                        if isinstance(func, float):
+                            local_invar[key] = torch.full(
+                                (nr_points, 1), func, dtype=torch.float64, device=device
+                            )
+                        else:
+                            local_invar[key] = func(local_params) + torch.zeros(
+                                (nr_points, 1), dtype=torch.float64, device=device
+                            )
+                    local_invar["area"] = local_invar["area"] / nr_points
+
+                    # remove points that don't satisfy curve criteria if needed
+                    if torch_criteria is not None:
+                        computed_criteria = torch_criteria(local_params)[:, 0].bool()
+                        local_invar = {
+                            key: value[computed_criteria]
+                            for key, value in local_invar.items()
+                        }
+                        local_params = {
+                            key: value[computed_criteria]
+                            for key, value in local_params.items()
+                        }
+
+                    # only store external parameters
+                    list_invar.append(local_invar)
+                    list_params.append(
+                        {
+                            key: value
+                            for key, value in local_params.items()
+                            if key in parameterization.parameters
+                        }
+                    )
+                    total_sampled += next(iter(local_invar.values())).shape[0]
+                    nr_try += 1
+
+                    # check if couldn't sample
+                    if nr_try > 10000 and total_sampled < 1:
+                        raise Exception("Unable to sample curve")
+
+                # concatenate and keep nr_points
+                invar = {
+                    key: torch.cat([i[key] for i in list_invar], dim=0)[:nr_points]
+                    for key in list_invar[0].keys()
+                }
+                params = {
+                    key: torch.cat([p[key] for p in list_params], dim=0)[:nr_points]
+                    for key in list_params[0].keys()
+                }
+                return invar, params
+
+            return torch_sample
+
         # initialize curve
         Curve.__init__(
             self,
             _sample(lambdify_functions, criteria, parameterization),
             len(functions) // 2,
             parameterization=parameterization,
+            area=area_fn if isinstance(area_fn, float) and criteria is None else None,
+            torch_sample=_torch_sample(
+                functions, area, sympy_criteria, parameterization
+            ),
+        )
+
+
+class InstancedCurve(Curve):
+    """
+    Copies of a curve placed by affine transforms. Points are sampled on the
+    curve in one batch and moved to copies chosen with probability
+    proportional to their area, so the cost does not grow with the number
+    of copies.
+
+    Parameters
+    ----------
+    curve : Curve
+        Curve that is copied.
+    transforms : np.ndarray
+        Homogeneous matrices of rotations, reflections, uniform scaling and
+        translations with shape `[nr_instances, dims + 1, dims + 1]`.
+    """
+
+    def __init__(self, curve, transforms):
+        dims = curve.dims
+        linear, translation, scale = decompose_similarity(transforms)
+        rotation = linear / scale[:, None, None]
+        weights = scale ** (len(dims) - 1)
+        total_weight = float(np.sum(weights))
+        probabilities = weights / total_weight
+
+        # copies only moved by translations share their linear part
+        shared_linear = np.allclose(linear, linear[0])
+
+        def sample(nr_points, parameterization=Parameterization(), quasirandom=False):
+            invar, params = curve._sample(nr_points, parameterization, quasirandom)
+            instance = np.random.choice(len(weights), nr_points, p=probabilities)
+
+            # move points and normals to their copies
+            points = np.concatenate([invar[d] for d in dims], axis=1)
+            normals = np.concatenate([invar["normal_" + d] for d in dims], axis=1)
+            if shared_linear:
+                points = np.matmul(points, linear[0].T)
+                normals = np.matmul(normals, rotation[0].T)
+            else:
+                points = np.einsum("nij,nj->ni", linear[instance], points)
+                normals = np.einsum("nij,nj->ni", rotation[instance], normals)
+            points += translation[instance]
+            for i, d in enumerate(dims):
+                invar[d] = points[:, i : i + 1]
+                invar["normal_" + d] = normals[:, i : i + 1]
+            invar["area"] = invar["area"] * total_weight
+            return invar, params
+
+        def torch_sample(nr_points, parameterization=Parameterization(), device=None):
+            invar, params = curve._torch_sample(nr_points, parameterization, device)
+            instance = torch.multinomial(
+                torch.as_tensor(probabilities, device=device),
+                nr_points,
+                replacement=True,
+            )
+
+            # move points and normals to their copies
+            points = torch.cat([invar[d] for d in dims], dim=1)
+            normals = torch.cat([invar["normal_" + d] for d in dims], dim=1)
+            t_linear = torch.as_tensor(linear, device=device)
+            t_rotation = torch.as_tensor(rotation, device=device)
+            if shared_linear:
+                points = torch.matmul(points, t_linear[0].T)
+                normals = torch.matmul(normals, t_rotation[0].T)
+            else:
+                points = torch.einsum("nij,nj->ni", t_linear[instance], points)
+                normals = torch.einsum("nij,nj->ni", t_rotation[instance], normals)
+            points = points + torch.as_tensor(translation, device=device)[instance]
+            for i, d in enumerate(dims):
+                invar[d] = points[:, i : i + 1]
+                invar["normal_" + d] = normals[:, i : i + 1]
+            invar["area"] = invar["area"] * total_weight
+            return invar, params
+
+        Curve.__init__(
+            self,
+            sample,
+            len(dims),
+            parameterization=curve.parameterization,
+            area=None if curve.area is None else curve.area * total_weight,
+            torch_sample=None if curve._torch_sample is None else torch_sample,
         )
@@ -7,6 +7,7 @@ import csv
 from stl import mesh as np_mesh
 from sympy import Symbol
 
+from .curve import Curve
 from .geometry import Geometry
 from .parameterization import Parameterization, Bounds, Parameter
 from modulus.constants import diff_str
@@ -23,46 +24,60 @@ class DiscreteGeometry(Geometry):
 
         # make sdf function
         def _sdf(list_sdf, discrete_parameterization, dims):
+            keys = discrete_parameterization.parameters
+            table = _variant_table(discrete_parameterization, keys, len(list_sdf))
+
             def sdf(invar, params, compute_sdf_derivatives=False):
+                # sort points by geometry variant so each is a contiguous slice
+                nr_points = next(iter(invar.values())).shape[0]
+                variant = _variant_index(params, keys, table, nr_points)
+                order, offsets = _group(variant, len(list_sdf))
+                sorted_invar = {key: value[order] for key, value in invar.items()}
+                sorted_params = {
+                    key: value[order]
+                    for key, value in params.items()
+                    if isinstance(value, np.ndarray) and value.shape[0] == nr_points
+                }
+                constant_params = {
+                    key: value
+                    for key, value in params.items()
+                    if key not in sorted_params
+                }
+
                 # make output array to gather sdf values
-                outputs = {"sdf": np.full_like(next(iter(invar.values())), np.nan)}
+                sorted_outputs = {
+                    "sdf": np.full_like(next(iter(invar.values())), np.nan)
+                }
                 if compute_sdf_derivatives:
                     for d in dims:
-                        outputs["sdf" + diff_str + d] = np.full_like(
+                        sorted_outputs["sdf" + diff_str + d] = np.full_like(
                             next(iter(invar.values())), -1000
                         )
 
-                # compute sdf values for given parameterizations
+                # compute sdf values of every variant on its slice
                 for i, f in enumerate(list_sdf):
-                    # get sdf index for each point evaluating on
-                    sdf_index = np.full_like(
-                        next(iter(invar.values())), True
-                    )  # TODO this could be simplified
-                    for key in discrete_parameterization.parameters:
-                        expanded_d = np.tile(
-                            discrete_parameterization.param_ranges[Parameter(key)][
-                                i : i + 1
-                            ],
-                            (params[key].shape[0], 1),
-                        )
-                        sdf_index = np.logical_and(
-                            sdf_index, (params[key] == expanded_d)
-                        )
-
-                    # compute sdf values on indexed sdf function
-                    sdf_indexed_invar = {
-                        key: value[sdf_index[:, 0], :] for key, value in invar.items()
-                    }
-                    sdf_indexed_params = {
-                        key: value[sdf_index[:, 0], :] for key, value in params.items()
-                    }
+                    block = slice(offsets[i], offsets[i + 1])
+                    if offsets[i] == offsets[i + 1]:
+                        continue
                     computed_sdf = f(
-                        sdf_indexed_invar, sdf_indexed_params, compute_sdf_derivatives
+                        {key: value[block] for key, value in sorted_invar.items()},
+                        {
+                            **constant_params,
+                            **{
+                                key: value[block]
+                                for key, value in sorted_params.items()
+                            },
+                        },
+                        compute_sdf_derivatives,
                     )
-
-                    # update output values
-                    for key, value in computed_sdf.items():
-                        outputs[key][sdf_index[:, 0], :] = value
+                    for key, value in sorted_outputs.items():
+                        value[block] = computed_sdf[key]
+
+                # scatter values back to order of points
+                outputs = {}
+                for key, value in sorted_outputs.items():
+                    outputs[key] = np.empty_like(value)
+                    outputs[key][order] = value
                 return outputs
 
             return sdf
@@ -76,10 +91,16 @@ class DiscreteGeometry(Geometry):
         for g in geometries[1:]:
             bounds = bounds.union(g.bounds)
 
-        # make curves
-        new_curves = []
-        for g in geometries:
-            new_curves += g.curves
+        # make curves, matching curves of variants are sampled together
+        if all(len(g.curves) == len(geometries[0].curves) for g in geometries):
+            new_curves = [
+                DiscreteCurve(list(curves), parameterization)
+                for curves in zip(*[g.curves for g in geometries])
+            ]
+        else:
+            new_curves = []
+            for g in geometries:
+                new_curves += g.curves
 
         # initialize geometry
         super().__init__(
@@ -89,72 +110,117 @@ class DiscreteGeometry(Geometry):
             bounds=bounds,
             parameterization=parameterization,
         )
+        self.geometries = geometries
 
+    def _primitive_curves(self):
+        # curves of csg variants also cover parts cut away by their operands
+        return all(g._primitive_curves() for g in self.geometries)
+
+
+class DiscreteCurve(Curve):
+    """
+    Curve of a discrete list of curves. Every sampled point belongs to a
+    random curve variant and gets the discrete parameter values of that
+    variant. Points are grouped by variant so each curve is sampled once.
+
+    Parameters
+    ----------
+    curves : List[Curve]
+        Curve of every variant.
+    discrete_parameterization : Parameterization
+        Parameterization with an array of values of every variant for each
+        parameter.
+    """
 
-class DiscreteCurve:
     def __init__(self, curves, discrete_parameterization=Parameterization()):
         # store attributes
         self.curves = curves
-        self._dims = len(curves[0].dims)
         self.discrete_parameterization = discrete_parameterization
+        keys = discrete_parameterization.parameters
+        table = _variant_table(discrete_parameterization, keys, len(curves))
+
+        def sample(nr_points, parameterization=Parameterization(), quasirandom=False):
+            # number of points of every variant
+            variant = np.random.randint(len(curves), size=nr_points)
+            counts = np.bincount(variant, minlength=len(curves))
+
+            # sample each variant and set its discrete parameters
+            invar, params = {}, {}
+            for i, curve in enumerate(curves):
+                if counts[i] == 0:
+                    continue
+                local_invar, local_params = curve._sample(
+                    counts[i], parameterization, quasirandom
+                )
+                local_invar["area"] = local_invar["area"] * (counts[i] / nr_points)
+                for j, key in enumerate(keys):
+                    local_params[key] = np.full((counts[i], 1), table[i, j])
+                for values, local_values in [
+                    (invar, local_invar),
+                    (params, local_params),
+                ]:
+                    for key, value in local_values.items():
+                        values.setdefault(key, []).append(value)
+            invar = {key: np.concatenate(value, axis=0) for key, value in invar.items()}
+            params = {
+                key: np.concatenate(value, axis=0) for key, value in params.items()
+            }
+            return invar, params
+
+        # exact area is mean area of variants
+        if all(c.area is not None for c in curves):
+            area = float(np.mean([c.area for c in curves]))
+        else:
+            area = None
+        super().__init__(
+            sample,
+            len(curves[0].dims),
+            parameterization=discrete_parameterization,
+            area=area,
+        )
 
-    def sample(
-        self, nr_points, criteria=None, parameterization=None, quasirandom=False
-    ):
-        # use internal parameterization if not given
-        if parameterization is None:
-            parameterization = self.parameterization
-
-        # continually sample points throwing out points that don't satisfy criteria
-        invar = {
-            key: np.empty((0, 1))
-            for key in self.dims + ["normal_" + x for x in self.dims] + ["area"]
-        }
-        params = {key: np.empty((0, 1)) for key in parameterization.parameters}
-        total_sampled = 0
-        total_tried = 0
-        nr_try = 0
-        while True:
-            # sample curve
-            local_invar, local_params = self._sample(
-                nr_points, parameterization, quasirandom
-            )
-
-            # compute given criteria and remove points
-            if criteria is not None:
-                computed_criteria = criteria(local_invar, local_params)
-                local_invar = {
-                    key: value[computed_criteria[:, 0], :]
-                    for key, value in local_invar.items()
-                }
-                local_params = {
-                    key: value[computed_criteria[:, 0], :]
-                    for key, value in local_params.items()
-                }
-
-            # store invar
-            for key in local_invar.keys():
-                invar[key] = np.concatenate([invar[key], local_invar[key]], axis=0)
 
-            # store params
-            for key in local_params.keys():
-                params[key] = np.concatenate([params[key], local_params[key]], axis=0)
+def _variant_table(discrete_parameterization, keys, nr_variants):
+    # discrete parameter values of every variant, [nr_variants, nr_params]
+    table = np.zeros((nr_variants, len(keys)))
+    for j, key in enumerate(keys):
+        table[:, j] = np.reshape(
+            discrete_parameterization.param_ranges[Parameter(key)], -1
+        )
+    return table
+
+
+def _variant_index(params, keys, table, nr_points):
+    # index of variant with the parameters of every point, -1 if none
+    nr_variants = table.shape[0]
+    variant_code = np.zeros(nr_variants, dtype=np.int64)
+    code = np.zeros(nr_points, dtype=np.int64)
+    matched = np.ones(nr_points, dtype=bool)
+    for j, key in enumerate(keys):
+        # combine codes of previous parameters with code of this parameter
+        values = np.unique(table[:, j])
+        point_values = np.broadcast_to(params[key], (nr_points, 1))[:, 0]
+        column = np.minimum(np.searchsorted(values, point_values), len(values) - 1)
+        matched &= values[column] == point_values
+        combined_variant_code = variant_code * len(values) + np.searchsorted(
+            values, table[:, j]
+        )
+        combined_code = code * len(values) + column
 
-            # keep track of sampling
-            total_sampled = next(iter(invar.values())).shape[0]
-            total_tried += nr_points
-            nr_try += 1
+        # relabel combined codes so they stay below number of variants
+        codes = np.unique(combined_variant_code)
+        variant_code = np.searchsorted(codes, combined_variant_code)
+        code = np.minimum(np.searchsorted(codes, combined_code), len(codes) - 1)
+        matched &= codes[code] == combined_code
 
-            # break when finished sampling
-            if total_sampled >= nr_points:
-                for key, value in invar.items():
-                    invar[key] = value[:nr_points]
-                for key, value in params.items():
-                    params[key] = value[:nr_points]
-                break
+    # last variant is used if variants have equal parameters
+    last = np.full(nr_variants, -1)
+    np.maximum.at(last, variant_code, np.arange(nr_variants))
+    return np.where(matched, last[code], -1)
 
-            # check if couldn't sample
-            if nr_try > 1000 and total_sampled < 1:
-                raise Exception("Unable to sample curve")
 
-        return invar, params
+def _group(variant, nr_variants):
+    # order of points sorted by variant and offset of every variant in order
+    order = np.argsort(variant, kind="stable")
+    counts = np.bincount(variant + 1, minlength=nr_variants + 1)
+    return order, np.cumsum(counts)
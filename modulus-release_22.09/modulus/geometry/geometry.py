@@ -2,32 +2,129 @@
 Defines base class for all geometries
 """
 
+import os
 import copy
+import json
 import numpy as np
-import itertools
 import sympy
+from collections import Counter, OrderedDict
 from typing import Callable, Union, List
 
 from modulus.utils.sympy import np_lambdify
 from modulus.constants import diff_str
-from .parameterization import Parameterization, Bounds
+from .parameterization import Parameterization, Bounds, Parameter
+from .sdf_plan import compile_sdf_plan, plan_to_sdf
+from .affine import AffineTransform, lattice_transforms
+from .curve import InstancedCurve
+from .bvh import (
+    MIN_BVH_OPERANDS,
+    numeric_bounds,
+    csg_operands,
+    subtract_operands,
+    max_sdf,
+    curve_csg,
+    curve_csg_sdf,
+)
 from .helper import (
     _concat_numpy_dict_list,
+    _rejection_sample,
+    _rejection_sample_groups,
+    _cast_floats,
     _sympy_sdf_to_sdf,
     _sympy_criteria_to_criteria,
-    _sympy_func_to_func,
+    _interpolate_grid,
+    _ranges,
 )
 
 
+# lookups of curve areas in sample_boundary, "exact" for known areas and
+# "hit" or "miss" for estimated areas in the area cache
+area_cache_stats = Counter()
+
+# name of parameter holding index of integral in sample_integral_boundary
+INTEGRAL_INDEX = "integral_index"
+
+# maximum number of points sampled at once to estimate areas of integrals
+MAX_AREA_POINTS = 2**16
+
+# number of sdf bins of equal volume and points sampled uniformly to find
+# them when sampling the interior with a density
+NR_DENSITY_BINS = 32
+NR_DENSITY_PILOT_POINTS = 10000
+
+# fraction of candidates drawn uniformly from the bounds instead of from grid
+# cells near the sdf band of a bin, keeps parts of bins the cells could miss
+DENSITY_UNIFORM_FRACTION = 0.1
+
+# number of points a cached sdf grid file is checked at
+NR_SDF_GRID_PROBES = 16
+
+
 def csg_curve_naming(index):
     return "PRIMITIVE_PARAM_" + str(index).zfill(5)
 
 
+def _sdf_grid_metadata_filename(filename):
+    return os.path.splitext(filename)[0] + ".json"
+
+
+def _sdf_grid_matches(filename, metadata):
+    # check grid file and its metadata exist and were made with same settings
+    metadata_filename = _sdf_grid_metadata_filename(filename)
+    if not (os.path.isfile(filename) and os.path.isfile(metadata_filename)):
+        return False
+    with open(metadata_filename) as f:
+        saved = json.load(f)
+    return (
+        all(saved.get(key) == metadata[key] for key in ["dims", "resolution", "dtype"])
+        and all(
+            np.shape(saved.get(key)) == np.shape(metadata[key])
+            and np.allclose(saved[key], metadata[key])
+            for key in ["lower", "upper", "probe_sdf"]
+        )
+        and np.load(filename, mmap_mode="r").dtype == np.dtype(metadata["dtype"])
+    )
+
+
+def _parameterization_key(parameterization):
+    # hashable key of parameter ranges
+    key = []
+    for parameter, value in parameterization.param_ranges.items():
+        if isinstance(value, np.ndarray):
+            value = (value.shape, value.tobytes())
+        elif isinstance(value, list):
+            value = tuple(value)
+        key.append((str(parameter), value))
+    return tuple(sorted(key, key=lambda x: x[0]))
+
+
+def _integral_parameterization(table, keys, weights=None):
+    # parameterization drawing rows of table with probabilities weights or
+    # evenly if None, all parameters are drawn together as one dependent key
+    def sample_rows(nr_points):
+        if weights is None:
+            counts = np.full(table.shape[0], nr_points // table.shape[0])
+            counts[: nr_points % table.shape[0]] += 1
+        else:
+            counts = np.random.multinomial(nr_points, weights)
+        return table[np.repeat(np.arange(table.shape[0]), counts)]
+
+    if not keys:
+        return Parameterization({})
+    return Parameterization({tuple(Parameter(key) for key in keys): sample_rows})
+
+
 class Geometry:
     """
     Base class for all geometries
     """
 
+    # number of estimated curve areas kept by sample_boundary
+    area_cache_size = 128
+
+    # if set estimated curve areas are refined every this many uses
+    area_refresh_freq = None
+
     def __init__(
         self,
         curves,
@@ -36,6 +133,7 @@ class Geometry:
         bounds,
         parameterization=Parameterization(),
         interior_epsilon=1e-6,
+        bounded_sdf=False,
     ):
         # store attributes
         self.curves = curves
@@ -44,6 +142,16 @@ class Geometry:
         self.bounds = bounds
         self.parameterization = parameterization
         self.interior_epsilon = interior_epsilon  # to check if in domain or outside
+        self.bounded_sdf = bounded_sdf  # sdf below minus distance to bounds outside
+
+        # csg operation that made this geometry, None for primitives
+        self._csg = None
+
+        # csg operations applied to each curve, made on first boundary sample
+        self._curve_csg = None
+
+        # estimated curve areas used by sample_boundary
+        self._area_cache = OrderedDict()
 
     @property
     def dims(self):
@@ -72,40 +180,9 @@ class Geometry:
             Parameterization if scale factor is parameterized.
         """
 
-        # create scaled sdf function
-        def _scale_sdf(sdf, dims, x):
-            if isinstance(x, (float, int)):
-                pass
-            elif isinstance(x, sympy.Basic):
-                x = _sympy_func_to_func(x)
-            else:
-                raise TypeError("Scaling by type " + str(type(x)) + "is not supported")
-
-            def scale_sdf(invar, params, compute_sdf_derivatives=False):
-                # compute scale if needed
-                if isinstance(x, (float, int)):
-                    computed_scale = x
-                else:
-                    computed_scale = x(params)
-
-                # scale input to sdf function
-                scaled_invar = {**invar}
-                for key in dims:
-                    scaled_invar[key] = scaled_invar[key] / computed_scale
-
-                # compute sdf
-                computed_sdf = sdf(scaled_invar, params, compute_sdf_derivatives)
-
-                # scale output sdf values
-                if isinstance(x, (float, int)):
-                    computed_sdf["sdf"] *= x
-                else:
-                    computed_sdf["sdf"] *= x(params)
-                return computed_sdf
-
-            return scale_sdf
-
-        new_sdf = _scale_sdf(self.sdf, self.dims, x)
+        if not isinstance(x, (float, int, sympy.Basic)):
+            raise TypeError("Scaling by type " + str(type(x)) + "is not supported")
+        transform = AffineTransform.scaling(x, len(self.dims))
 
         # add parameterization
         new_parameterization = self.parameterization.union(parameterization)
@@ -117,14 +194,7 @@ class Geometry:
         new_curves = [c.scale(x, parameterization) for c in self.curves]
 
         # return scaled geometry
-        return Geometry(
-            new_curves,
-            new_sdf,
-            len(self.dims),
-            new_bounds,
-            new_parameterization,
-            interior_epsilon=self.interior_epsilon,
-        )
+        return self._transform(transform, new_curves, new_bounds, new_parameterization)
 
     def translate(
         self,
@@ -142,42 +212,12 @@ class Geometry:
             Parameterization if translation is parameterized.
         """
 
-        # create translated sdf function
-        def _translate_sdf(sdf, dims, xyx):
-            compiled_xyz = []
-            for i, x in enumerate(xyz):
-                if isinstance(x, (float, int)):
-                    compiled_xyz.append(x)
-                elif isinstance(x, sympy.Basic):
-                    compiled_xyz.append(_sympy_func_to_func(x))
-                else:
-                    raise TypeError(
-                        "Translate by type " + str(type(x)) + "is not supported"
-                    )
-
-            def translate_sdf(invar, params, compute_sdf_derivatives=False):
-                # compute translation if needed
-                computed_translation = []
-                for x in compiled_xyz:
-                    if isinstance(x, (float, int)):
-                        computed_translation.append(x)
-                    else:
-                        computed_translation.append(x(params))
-
-                # translate input to sdf function
-                translated_invar = {**invar}
-                for i, key in enumerate(dims):
-                    translated_invar[key] = (
-                        translated_invar[key] - computed_translation[i]
-                    )
-
-                # compute sdf
-                computed_sdf = sdf(translated_invar, params, compute_sdf_derivatives)
-                return computed_sdf
-
-            return translate_sdf
-
-        new_sdf = _translate_sdf(self.sdf, self.dims, xyz)
+        for x in xyz:
+            if not isinstance(x, (float, int, sympy.Basic)):
+                raise TypeError(
+                    "Translate by type " + str(type(x)) + "is not supported"
+                )
+        transform = AffineTransform.translation(xyz, len(self.dims))
 
         # add parameterization
         new_parameterization = self.parameterization.union(parameterization)
@@ -189,14 +229,7 @@ class Geometry:
         new_curves = [c.translate(xyz, parameterization) for c in self.curves]
 
         # return translated geometry
-        return Geometry(
-            new_curves,
-            new_sdf,
-            len(self.dims),
-            new_bounds,
-            new_parameterization,
-            interior_epsilon=self.interior_epsilon,
-        )
+        return self._transform(transform, new_curves, new_bounds, new_parameterization)
 
     def rotate(
         self,
@@ -220,50 +253,15 @@ class Geometry:
             Parameterization if translation is parameterized.
         """
 
-        # create rotated sdf function
-        def _rotate_sdf(sdf, dims, angle, axis, center):
-            if isinstance(angle, (float, int)):
-                pass
-            elif isinstance(angle, sympy.Basic):
-                angle = _sympy_func_to_func(angle)
-            else:
-                raise TypeError(
-                    "Scaling by type " + str(type(angle)) + "is not supported"
-                )
-
-            def rotate_sdf(invar, params, compute_sdf_derivatives=False):
-                # compute translation if needed
-                if isinstance(angle, (float, int)):
-                    computed_angle = angle
-                else:
-                    computed_angle = angle(params)
-
-                # rotate input to sdf function
-                rotated_invar = {**invar}
-                if center is not None:
-                    for i, key in enumerate(dims):
-                        rotated_invar[key] = rotated_invar[key] - center[i]
-                _rotated_invar = {**rotated_invar}
-                rotated_dims = [key for key in dims if key != axis]
-                _rotated_invar[rotated_dims[0]] = (
-                    np.cos(computed_angle) * rotated_invar[rotated_dims[0]]
-                    + np.sin(computed_angle) * rotated_invar[rotated_dims[1]]
-                )
-                _rotated_invar[rotated_dims[1]] = (
-                    -np.sin(computed_angle) * rotated_invar[rotated_dims[0]]
-                    + np.cos(computed_angle) * rotated_invar[rotated_dims[1]]
+        if not isinstance(angle, (float, int, sympy.Basic)):
+            raise TypeError("Scaling by type " + str(type(angle)) + "is not supported")
+        transform = AffineTransform.rotation(angle, axis, len(self.dims))
+        if center is not None:
+            transform = AffineTransform.translation(center, len(self.dims)).compose(
+                transform.compose(
+                    AffineTransform.translation([-x for x in center], len(self.dims))
                 )
-                if center is not None:
-                    for i, key in enumerate(dims):
-                        _rotated_invar[key] = _rotated_invar[key] + center[i]
-
-                # compute sdf
-                computed_sdf = sdf(_rotated_invar, params, compute_sdf_derivatives)
-                return computed_sdf
-
-            return rotate_sdf
-
-        new_sdf = _rotate_sdf(self.sdf, self.dims, angle, axis, center)
+            )
 
         # add parameterization
         new_parameterization = self.parameterization.union(parameterization)
@@ -288,14 +286,46 @@ class Geometry:
             new_curves.append(new_c)
 
         # return rotated geometry
-        return Geometry(
-            new_curves,
-            new_sdf,
+        return self._transform(transform, new_curves, new_bounds, new_parameterization)
+
+    def _transform(self, transform, curves, bounds, parameterization):
+        # compose with transform of this geometry so only one is applied
+        geometry = self
+        if self._csg is not None and self._csg[0] == "affine":
+            geometry = self._csg[1][0]
+            transform = transform.compose(self._csg[2][0])
+
+        # create transformed sdf function
+        def _affine_sdf(sdf, dims, transform):
+            def affine_sdf(invar, params, compute_sdf_derivatives=False):
+                # transform input to sdf function
+                transformed_invar = {
+                    **invar,
+                    **transform.transform_points(invar, params, dims, inverse=True),
+                }
+
+                # compute sdf
+                computed_sdf = sdf(transformed_invar, params, compute_sdf_derivatives)
+
+                # scale output sdf values
+                computed_scale = transform.compute_scale(params)
+                if not (isinstance(computed_scale, float) and computed_scale == 1.0):
+                    computed_sdf["sdf"] = computed_sdf["sdf"] * computed_scale
+                return computed_sdf
+
+            return affine_sdf
+
+        new_geometry = Geometry(
+            curves,
+            _affine_sdf(geometry.sdf, self.dims, transform),
             len(self.dims),
-            new_bounds,
-            new_parameterization,
+            bounds,
+            parameterization,
             interior_epsilon=self.interior_epsilon,
+            bounded_sdf=self.bounded_sdf,
         )
+        new_geometry._csg = ("affine", [geometry], (transform,))
+        return new_geometry
 
     def repeat(
         self,
@@ -347,50 +377,248 @@ class Geometry:
             self.sdf, self.dims, spacing, repeat_lower, repeat_higher, center
         )
 
-        # repeat bounds and curves
-        new_bounds = self.bounds.copy()
-        new_curves = []
-        for t in itertools.product(
-            *[list(range(rl, rh + 1)) for rl, rh in zip(repeat_lower, repeat_higher)]
-        ):
-            new_bounds = new_bounds.union(
-                self.bounds.translate([spacing * a for a in t])
-            )
-            new_curves += [c.translate([spacing * a for a in t]) for c in self.curves]
+        # repeat bounds, curves of all tiles are sampled together
+        transforms = lattice_transforms(spacing, repeat_lower, repeat_higher)
+        new_bounds = self.bounds.translate([spacing * rl for rl in repeat_lower]).union(
+            self.bounds.translate([spacing * rh for rh in repeat_higher])
+        )
+        new_curves = [InstancedCurve(c, transforms) for c in self.curves]
 
         # return repeated geometry
-        return Geometry(
+        new_geometry = Geometry(
             new_curves,
             new_sdf,
             len(self.dims),
             new_bounds,
             self.parameterization.copy(),
             interior_epsilon=self.interior_epsilon,
+            bounded_sdf=self.bounded_sdf,
+        )
+        new_geometry._csg = (
+            "repeat",
+            [self],
+            (spacing, repeat_lower, repeat_higher, center),
+        )
+        return new_geometry
+
+    def cache_sdf(
+        self,
+        resolution: Union[int, List[int]] = 128,
+        bounds: Union[Bounds, None] = None,
+        exact_distance: Union[float, None] = None,
+        dtype: np.dtype = np.float32,
+        filename: Union[str, None] = None,
+        batch_size: int = 100000,
+    ):
+        """
+        Caches the SDF and its derivatives on a voxel grid. The returned
+        geometry evaluates the SDF by trilinear interpolation of the grid
+        so the cost per point does not depend on the complexity of the geometry.
+
+        Parameters
+        ----------
+        resolution : Union[int, List[int]]
+            Number of grid points in each dimension. Default is 128.
+        bounds : Union[Bounds, None]
+            Bounds of the voxel grid. By default the internal bounds will be used.
+            Points outside of the grid are evaluated with the exact SDF.
+        exact_distance : Union[float, None]
+            Points with an interpolated SDF magnitude less then this are evaluated
+            with the exact SDF. By default this is 1.5 times the diagonal of a grid
+            cell which keeps the sign of the SDF and boundary sampling exact.
+            If 0 then only the grid is used inside the grid bounds.
+        dtype : np.dtype
+            Data type of the stored grid, `np.float32` or `np.float16`.
+        filename : Union[str, None]
+            If given, the grid is saved to this `.npy` file and memory mapped,
+            with its bounds, resolution, data type and the SDF at a few probe
+            points in a `.json` file of the same name. If both files exist and
+            match, the grid is loaded instead of rasterizing the SDF.
+        batch_size : int
+            Number of grid points evaluated at once when rasterizing the SDF.
+        """
+
+        # cached sdf only supports fixed parameter values
+        for key, value in self.parameterization.param_ranges.items():
+            if not isinstance(value, (float, int)):
+                raise ValueError(
+                    "Caching sdf of geometry with parameter range is not supported: "
+                    + str(key)
+                )
+
+        # use internal bounds if not given
+        if bounds is None:
+            bounds = self.bounds
+        elif isinstance(bounds, dict):
+            bounds = Bounds(bounds)
+        computed_bounds = {
+            str(key): value
+            for key, value in bounds._compute_bounds(self.parameterization).items()
+        }
+        lower = np.array([computed_bounds[d][0] for d in self.dims], dtype=float)
+        upper = np.array([computed_bounds[d][1] for d in self.dims], dtype=float)
+
+        # grid stores sdf and its derivatives
+        if isinstance(resolution, int):
+            resolution = [resolution] * len(self.dims)
+        assert all(r >= 2 for r in resolution), "resolution must be at least 2"
+        shape = tuple(resolution) + (1 + len(self.dims),)
+        if exact_distance is None:
+            cell_size = (upper - lower) / (np.array(resolution) - 1)
+            exact_distance = 1.5 * float(np.linalg.norm(cell_size))
+
+        # grid file is reused if its metadata matches, the sdf at a few
+        # probe points tells apart grids of different geometries
+        if filename is not None:
+            probe = {
+                d: p[:, None]
+                for d, p in zip(
+                    self.dims,
+                    np.random.RandomState(0)
+                    .uniform(lower, upper, (NR_SDF_GRID_PROBES, len(self.dims)))
+                    .T,
+                )
+            }
+            metadata = {
+                "dims": list(self.dims),
+                "lower": lower.tolist(),
+                "upper": upper.tolist(),
+                "resolution": list(resolution),
+                "dtype": np.dtype(dtype).name,
+                "probe_sdf": self.sdf(
+                    probe, self.parameterization.sample(NR_SDF_GRID_PROBES)
+                )["sdf"][:, 0].tolist(),
+            }
+
+        # load existing grid or rasterize sdf
+        if filename is not None and _sdf_grid_matches(filename, metadata):
+            grid = np.load(filename, mmap_mode="r")
+        else:
+            mesh = np.meshgrid(
+                *[np.linspace(l, u, r) for l, u, r in zip(lower, upper, resolution)],
+                indexing="ij",
+            )
+            points = {d: m.reshape(-1, 1) for d, m in zip(self.dims, mesh)}
+            nr_grid_points = int(np.prod(resolution))
+            grid = np.empty((nr_grid_points, shape[-1]), dtype=dtype)
+            for i in range(0, nr_grid_points, batch_size):
+                invar = {d: value[i : i + batch_size] for d, value in points.items()}
+                params = self.parameterization.sample(invar[self.dims[0]].shape[0])
+                computed_sdf = self.sdf(invar, params, compute_sdf_derivatives=True)
+                grid[i : i + batch_size, 0] = computed_sdf["sdf"][:, 0]
+                for j, d in enumerate(self.dims):
+                    grid[i : i + batch_size, j + 1] = computed_sdf[
+                        "sdf" + diff_str + d
+                    ][:, 0]
+            grid = grid.reshape(shape)
+            if filename is not None:
+                np.save(filename, grid)
+                with open(_sdf_grid_metadata_filename(filename), "w") as f:
+                    json.dump(metadata, f)
+                grid = np.load(filename, mmap_mode="r")
+
+        # create cached sdf function
+        def _cached_sdf(sdf, grid, lower, upper, dims, exact_distance):
+            def cached_sdf(invar, params, compute_sdf_derivatives=False):
+                # interpolate sdf from grid
+                points = np.concatenate([invar[d] for d in dims], axis=1)
+                nr_channels = 1 + len(dims) if compute_sdf_derivatives else 1
+                values = _interpolate_grid(
+                    grid[..., :nr_channels], lower, upper, points
+                )
+                computed_sdf = {"sdf": values[:, 0:1]}
+                if compute_sdf_derivatives:
+                    for j, d in enumerate(dims):
+                        computed_sdf["sdf" + diff_str + d] = values[:, j + 1 : j + 2]
+
+                # use exact sdf outside of grid and close to surface
+                exact = np.logical_or(
+                    np.any(np.logical_or(points < lower, points > upper), axis=1),
+                    np.abs(computed_sdf["sdf"][:, 0]) < exact_distance,
+                )
+                if np.any(exact):
+                    exact_sdf = sdf(
+                        {key: value[exact] for key, value in invar.items()},
+                        {key: value[exact] for key, value in params.items()},
+                        compute_sdf_derivatives,
+                    )
+                    for key, value in computed_sdf.items():
+                        value[exact] = exact_sdf[key]
+                return computed_sdf
+
+            return cached_sdf
+
+        new_sdf = _cached_sdf(self.sdf, grid, lower, upper, self.dims, exact_distance)
+
+        # return cached geometry
+        return Geometry(
+            self.curves,
+            new_sdf,
+            len(self.dims),
+            self.bounds.copy(),
+            self.parameterization.copy(),
+            interior_epsilon=self.interior_epsilon,
+        )
+
+    def compile(self):
+        """
+        Compiles the CSG tree of this geometry into a flat evaluation plan.
+        The returned geometry gives identical SDF values but evaluates them
+        without nested closures, computes shared coordinate transforms once
+        and combines SDF values in place. Sampling the returned geometry
+        uses the compiled plan.
+        """
+
+        new_sdf = plan_to_sdf(compile_sdf_plan(self), self.dims)
+
+        # return compiled geometry
+        new_geometry = Geometry(
+            self.curves,
+            new_sdf,
+            len(self.dims),
+            self.bounds.copy(),
+            self.parameterization.copy(),
+            interior_epsilon=self.interior_epsilon,
+            bounded_sdf=self.bounded_sdf,
         )
+        new_geometry._csg = self._csg
+        return new_geometry
 
     def copy(self):
         return copy.deepcopy(self)
 
-    def boundary_criteria(self, invar, criteria=None, params={}):
-        # check if moving in or out of normal direction changes SDF
-        invar_normal_plus = {**invar}
-        invar_normal_minus = {**invar}
-        for key in self.dims:
-            invar_normal_plus[key] = (
-                invar_normal_plus[key]
-                + self.interior_epsilon * invar_normal_plus["normal_" + key]
+    def boundary_criteria(self, invar, criteria=None, params={}, curve_csg=None):
+        # check if moving in or out of normal direction changes SDF, both
+        # probes are evaluated in one call
+        nr_points = invar[self.dims[0]].shape[0]
+        probe_invar = {
+            key: np.concatenate(
+                [
+                    invar[key] + self.interior_epsilon * invar["normal_" + key],
+                    invar[key] - self.interior_epsilon * invar["normal_" + key],
+                ],
+                axis=0,
             )
-            invar_normal_minus[key] = (
-                invar_normal_minus[key]
-                - self.interior_epsilon * invar_normal_minus["normal_" + key]
-            )
-        sdf_normal_plus = self.sdf(
-            invar_normal_plus, params, compute_sdf_derivatives=False
-        )["sdf"]
-        sdf_normal_minus = self.sdf(
-            invar_normal_minus, params, compute_sdf_derivatives=False
-        )["sdf"]
-        on_boundary = np.greater_equal(0, sdf_normal_plus * sdf_normal_minus)
+            for key in self.dims
+        }
+        probe_params = {
+            key: np.concatenate([value, value], axis=0)
+            if isinstance(value, np.ndarray)
+            and value.ndim > 0
+            and value.shape[0] == nr_points
+            else value
+            for key, value in params.items()
+        }
+
+        # only operations applied after primitive of curve are evaluated
+        if curve_csg is None:
+            probe_sdf = self.sdf(probe_invar, probe_params, False)["sdf"]
+        else:
+            probe_sdf = curve_csg_sdf(curve_csg, probe_invar, probe_params, self.dims)
+        probe_sign = np.sign(probe_sdf)
+        on_boundary = np.greater_equal(
+            0, probe_sign[:nr_points] * probe_sign[nr_points:]
+        )
 
         # check if points satisfy the criteria function
         if criteria is not None:
@@ -408,6 +636,7 @@ class Geometry:
         criteria: Union[sympy.Basic, None] = None,
         parameterization: Union[Parameterization, None] = None,
         quasirandom: bool = False,
+        dtype=np.float64,
     ):
         """
         Samples the surface or perimeter of the geometry.
@@ -422,9 +651,13 @@ class Geometry:
             If the geometry is parameterized then you can provide ranges
             for the parameters with this. By default the sampling will be
             done with the internal parameterization.
-        quasirandom : bool
-            If true then sample the points using the Halton sequences.
-            Default is False.
+        quasirandom : Union[bool, QuasiRandomEngine]
+            If true then sample the points using scrambled Halton sequences.
+            If an engine is given the sequence continues where the last
+            call with this engine stopped. Default is False.
+        dtype : np.dtype
+            Data type points are filtered and stored in, float32 halves
+            their memory. Default is float64.
 
         Returns
         -------
@@ -443,37 +676,19 @@ class Geometry:
             `total_area = np.sum(points['area'])`
         """
 
-        # compile criteria from sympy if needed
-        if criteria is not None:
-            if isinstance(criteria, sympy.Basic):
-                criteria = _sympy_criteria_to_criteria(criteria)
-            elif isinstance(criteria, Callable):
-                pass
-            else:
-                raise TypeError(
-                    "criteria type is not supported: " + str(type(criteria))
-                )
-
         # use internal parameterization if not given
         if parameterization is None:
             parameterization = self.parameterization
         elif isinstance(parameterization, dict):
             parameterization = Parameterization(parameterization)
-
-        # create boundary criteria closure
-        def _boundary_criteria(criteria):
-            def boundary_criteria(invar, params):
-                return self.boundary_criteria(invar, criteria=criteria, params=params)
-
-            return boundary_criteria
-
-        closed_boundary_criteria = _boundary_criteria(criteria)
+        criteria_key = criteria
+        curve_criteria = self._curve_criteria(criteria)
 
         # compute required points on each curve
         curve_areas = np.array(
             [
-                curve.approx_area(parameterization, criteria=closed_boundary_criteria)
-                for curve in self.curves
+                self._curve_area(curve, parameterization, criteria_key, c)
+                for curve, c in zip(self.curves, curve_criteria)
             ]
         )
         assert np.sum(curve_areas) > 0, "Geometry has no surface"
@@ -489,12 +704,16 @@ class Geometry:
         # continually sample each curve until reached desired number of points
         list_invar = []
         list_params = []
-        for n, a, curve in zip(points_per_curve, curve_areas, self.curves):
+        for n, a, curve, c in zip(
+            points_per_curve, curve_areas, self.curves, curve_criteria
+        ):
             if n > 0:
                 i, p = curve.sample(
                     n,
-                    criteria=closed_boundary_criteria,
+                    criteria=c,
                     parameterization=parameterization,
+                    quasirandom=quasirandom,
+                    dtype=dtype,
                 )
                 i["area"] = np.full_like(i["area"], a / n)
                 list_invar.append(i)
@@ -504,6 +723,246 @@ class Geometry:
         invar.update(params)
         return invar
 
+    def sample_integral_boundary(
+        self,
+        nr_integrals: int,
+        nr_points: int,
+        criteria: Union[sympy.Basic, None] = None,
+        parameterization: Union[Parameterization, None] = None,
+        quasirandom: bool = False,
+        dtype=np.float64,
+        approx_nr: int = 10000,
+    ):
+        """
+        Samples `nr_integrals` values of the parameterization and the surface
+        or perimeter of the geometry for every value, as calling
+        `sample_boundary` with each value would. Every curve is sampled in
+        one batch for all values and curve areas of all values are estimated
+        together.
+
+        Parameters
+        ----------
+        nr_integrals : int
+            number of parameter values to sample.
+        nr_points : int
+            number of points to sample on boundary for every value.
+        criteria : Union[sympy.Basic, None]
+            Only sample points that satisfy this criteria.
+        parameterization : Union[Parameterization, None], optional
+            Parameterization values are sampled from. By default the
+            internal parameterization is used.
+        quasirandom : Union[bool, QuasiRandomEngine]
+            If true then sample the points using scrambled Halton sequences.
+            Parameter values are sampled randomly. Default is False.
+        dtype : np.dtype
+            Data type points are filtered and stored in. Default is float64.
+        approx_nr : int
+            Number of points sampled for every value to estimate curve areas
+            if they are not known.
+
+        Returns
+        -------
+        invar : Dict[str, np.ndarray]
+            Points of integral `i` in rows `i * nr_points` to
+            `(i + 1) * nr_points`, including parameter values. The `area`
+            values of every integral sum to its boundary area.
+        params : Dict[str, np.ndarray]
+            Parameter values of every integral, `[nr_integrals, 1]`.
+        """
+
+        # use internal parameterization if not given
+        if parameterization is None:
+            parameterization = self.parameterization
+        elif isinstance(parameterization, dict):
+            parameterization = Parameterization(parameterization)
+        criteria_key = criteria
+        curve_criteria = self._curve_criteria(criteria)
+
+        # parameter values with index of integral they belong to
+        params = _cast_floats(parameterization.sample(nr_integrals), dtype)
+        keys = list(params.keys()) + [INTEGRAL_INDEX]
+        table = np.concatenate(
+            [np.broadcast_to(params[key], (nr_integrals, 1)) for key in keys[:-1]]
+            + [np.arange(nr_integrals)[:, None]],
+            axis=1,
+        ).astype(np.float64)
+
+        # areas and number of points of every curve and integral
+        curve_areas = np.stack(
+            [
+                self._integral_curve_areas(
+                    curve, parameterization, criteria_key, c, table, keys, approx_nr
+                )
+                for curve, c in zip(self.curves, curve_criteria)
+            ]
+        )
+        total_areas = np.sum(curve_areas, axis=0)
+        assert np.all(total_areas > 0), "Geometry has no surface"
+        curve_counts = np.zeros(curve_areas.shape, dtype=np.int64)
+        remaining_counts = np.full(nr_integrals, nr_points)
+        remaining_areas = total_areas
+        for i in range(len(self.curves)):
+            probabilities = np.clip(
+                curve_areas[i] / np.maximum(remaining_areas, 1e-300), 0, 1
+            )
+            curve_counts[i] = np.random.binomial(remaining_counts, probabilities)
+            remaining_counts -= curve_counts[i]
+            remaining_areas = remaining_areas - curve_areas[i]
+        curve_counts[-1] += remaining_counts
+        curve_offsets = np.cumsum(curve_counts, axis=0) - curve_counts
+
+        # sample every curve for all integrals and place points of integrals
+        invar = None
+        for i, (curve, c) in enumerate(zip(self.curves, curve_criteria)):
+            if np.sum(curve_counts[i]) == 0:
+                continue
+
+            def _sample(nr_candidates, weights):
+                local_invar, local_params = curve._sample(
+                    nr_candidates,
+                    _integral_parameterization(table, keys, weights),
+                    quasirandom,
+                )
+                accepted = c(local_invar, local_params)[:, 0]
+                integral = local_params.pop(INTEGRAL_INDEX)[:, 0].astype(np.int64)
+                return [{**local_invar, **local_params}], accepted, integral
+
+            (values,), _ = _rejection_sample_groups(
+                _sample,
+                curve_counts[i],
+                max_nr_try=1000,
+                error_message="Unable to sample curve",
+                dtype=dtype,
+            )
+            rows, integral = _ranges(
+                np.arange(nr_integrals) * nr_points + curve_offsets[i],
+                curve_counts[i],
+            )
+            if invar is None:
+                invar = {
+                    key: np.empty((nr_integrals * nr_points,) + v.shape[1:], v.dtype)
+                    for key, v in values.items()
+                }
+            for key, value in values.items():
+                invar[key][rows] = value
+            invar["area"][rows, 0] = (curve_areas[i] / np.maximum(curve_counts[i], 1))[
+                integral
+            ]
+        return invar, params
+
+    def _integral_curve_areas(
+        self, curve, parameterization, criteria_key, criteria, table, keys, approx_nr
+    ):
+        # curves of primitives are exactly their boundary
+        nr_integrals = table.shape[0]
+        if criteria_key is None and curve.area is not None and self._primitive_curves():
+            return np.full(nr_integrals, float(curve.area))
+
+        # curves not depending on parameters of integrals have the same area
+        # for all integrals
+        if not self._curve_depends_on(curve, criteria_key, keys[:-1]):
+            area = self._curve_area(curve, parameterization, criteria_key, criteria)
+            return np.full(nr_integrals, float(area))
+
+        # estimate areas with points of chunks of integrals, each point has
+        # area of curve for its parameters divided by number of points
+        areas = np.zeros(nr_integrals)
+        chunk_size = max(1, MAX_AREA_POINTS // approx_nr)
+        for start in range(0, nr_integrals, chunk_size):
+            chunk = table[start : start + chunk_size]
+            nr_chunk_points = chunk.shape[0] * approx_nr
+            invar, params = curve._sample(
+                nr_chunk_points,
+                _integral_parameterization(chunk, keys),
+                False,
+            )
+            accepted = criteria(invar, params)[:, 0]
+            integral = params[INTEGRAL_INDEX][:, 0].astype(np.int64) - start
+            counts = np.bincount(integral, minlength=chunk.shape[0])
+            sums = np.bincount(
+                integral[accepted],
+                weights=invar["area"][accepted, 0],
+                minlength=chunk.shape[0],
+            )
+            areas[start : start + chunk.shape[0]] = (
+                sums * invar["area"].shape[0] / np.maximum(counts, 1)
+            )
+        return areas
+
+    def _curve_depends_on(self, curve, criteria_key, keys):
+        # whether curve points or criteria may change with parameters keys
+        names = set(curve.parameterization.parameters)
+        names |= set(self.parameterization.parameters)
+        if isinstance(criteria_key, sympy.Basic):
+            names |= {str(x) for x in criteria_key.free_symbols}
+        elif criteria_key is not None:  # callable criteria may use any parameter
+            return True
+        return any(str(key) in names for key in keys)
+
+    def _curve_criteria(self, criteria):
+        # compile criteria from sympy if needed
+        if criteria is not None:
+            if isinstance(criteria, sympy.Basic):
+                criteria = _sympy_criteria_to_criteria(criteria)
+            elif isinstance(criteria, Callable):
+                pass
+            else:
+                raise TypeError(
+                    "criteria type is not supported: " + str(type(criteria))
+                )
+
+        # create boundary criteria closure of every curve
+        def _boundary_criteria(criteria, curve_csg):
+            def boundary_criteria(invar, params):
+                return self.boundary_criteria(
+                    invar, criteria=criteria, params=params, curve_csg=curve_csg
+                )
+
+            return boundary_criteria
+
+        if self._curve_csg is None:
+            self._curve_csg = curve_csg(self)
+        return [_boundary_criteria(criteria, s) for s in self._curve_csg]
+
+    def _curve_area(self, curve, parameterization, criteria_key, criteria):
+        # curves of primitives are exactly their boundary
+        if criteria_key is None and curve.area is not None and self._primitive_curves():
+            area_cache_stats["exact"] += 1
+            return curve.area
+
+        # reuse estimated area of curve with same parameterization and criteria
+        try:
+            key = (curve, _parameterization_key(parameterization), criteria_key)
+            entry = self._area_cache.get(key)
+        except TypeError:  # unhashable parameterization or criteria
+            return curve.approx_area(parameterization, criteria=criteria)
+        if entry is None:
+            area_cache_stats["miss"] += 1
+            entry = [curve.approx_area(parameterization, criteria=criteria), 1, 0]
+            self._area_cache[key] = entry
+            if len(self._area_cache) > self.area_cache_size:
+                self._area_cache.popitem(last=False)
+        else:
+            area_cache_stats["hit"] += 1
+            self._area_cache.move_to_end(key)
+        entry[2] += 1
+
+        # refine estimate with running mean of new estimates
+        if (
+            self.area_refresh_freq is not None
+            and entry[2] % self.area_refresh_freq == 0
+        ):
+            area = curve.approx_area(parameterization, criteria=criteria)
+            entry[0] = (entry[0] * entry[1] + area) / (entry[1] + 1)
+            entry[1] += 1
+        return entry[0]
+
+    def _primitive_curves(self):
+        # curves of primitives, also if transformed, cover exactly the boundary
+        if self._csg is not None and self._csg[0] == "affine":
+            return self._csg[1][0]._primitive_curves()
+        return self._csg is None and type(self) is not Geometry
+
     def sample_interior(
         self,
         nr_points: int,
@@ -512,6 +971,8 @@ class Geometry:
         parameterization: Union[Parameterization, None] = None,
         compute_sdf_derivatives: bool = False,
         quasirandom: bool = False,
+        dtype=np.float64,
+        density: Union[Callable, None] = None,
     ):
         """
         Samples the interior of the geometry.
@@ -531,14 +992,30 @@ class Geometry:
             for the parameters with this.
         compute_sdf_derivatives : bool
             Compute sdf derivatives if true.
-        quasirandom : bool
-            If true then sample the points using the Halton sequences.
-            Default is False.
+        quasirandom : Union[bool, QuasiRandomEngine]
+            If true then sample the points using scrambled Halton sequences.
+            If an engine is given the sequence continues where the last
+            call with this engine stopped. Default is False.
+        dtype : np.dtype
+            Data type points are sampled, filtered and stored in, float32
+            halves their memory. Default is float64.
+        density : Union[Callable, None]
+            Function of the sdf array giving the relative density of points,
+            for example `lambda sdf: np.exp(-sdf / 0.05) + 0.1` to cluster
+            points near walls. The interior is split into bins of sdf with
+            equal volume and every bin is sampled with a number of points in
+            proportion to its integrated density. Candidates of geometries
+            without parameters are drawn from grid cells near the sdf bands
+            of bins. The `area` of points is their share of the volume of
+            their bin, the inverse of the sampling density, so Monte Carlo
+            integrals stay unbiased. Should be positive in the interior.
+            By default points are sampled uniformly.
 
         Returns
         -------
         points : Dict[str, np.ndarray]
-            Dictionary contain a point cloud sampled uniformly.
+            Dictionary contain a point cloud sampled uniformly or with
+            `density`.
             For example in 2D it would be
             ```
             points = {'x': np.ndarray (N, 1),
@@ -551,6 +1028,15 @@ class Geometry:
             `total_area = np.sum(points['area'])`
         """
 
+        # sdf derivatives are only computed for accepted points if not in criteria
+        defer_sdf_derivatives = compute_sdf_derivatives and (
+            criteria is None
+            or (
+                isinstance(criteria, sympy.Basic)
+                and not any(diff_str in str(x) for x in criteria.free_symbols)
+            )
+        )
+
         # compile criteria from sympy if needed
         if criteria is not None:
             if isinstance(criteria, sympy.Basic):
@@ -574,22 +1060,22 @@ class Geometry:
         elif isinstance(parameterization, dict):
             parameterization = Parameterization(parameterization)
 
-        # continually sample until reached desired number of points
-        invar = {}
-        params = {}
-        total_tried = 0
-        nr_try = 0
-        while True:
-            # sample invar and params
-            local_invar = bounds.sample(nr_points, parameterization, quasirandom)
-            local_params = parameterization.sample(nr_points, quasirandom)
+        # sample candidates and keep points inside domain
+        def _sample(nr_candidates, move=None):
+            local_invar = bounds.sample(
+                nr_candidates, parameterization, quasirandom, dtype
+            )
+            if move is not None:  # candidates of focused proposals
+                move(local_invar)
+            local_params = parameterization.sample(nr_candidates, quasirandom, dtype)
 
             # evaluate SDF function on points
             local_invar.update(
                 self.sdf(
                     local_invar,
                     local_params,
-                    compute_sdf_derivatives=compute_sdf_derivatives,
+                    compute_sdf_derivatives=compute_sdf_derivatives
+                    and not defer_sdf_derivatives,
                 )
             )
 
@@ -599,50 +1085,232 @@ class Geometry:
                 criteria_index = np.logical_and(
                     criteria_index, criteria(local_invar, local_params)
                 )
-            for key in local_invar.keys():
-                local_invar[key] = local_invar[key][criteria_index[:, 0], :]
-            for key in local_params.keys():
-                local_params[key] = local_params[key][criteria_index[:, 0], :]
-
-            # add sampled points to list
-            for key in local_invar.keys():
-                if key not in invar.keys():  # TODO this can be condensed
-                    invar[key] = local_invar[key]
-                else:
-                    invar[key] = np.concatenate([invar[key], local_invar[key]], axis=0)
-            for key in local_params.keys():
-                if key not in params.keys():  # TODO this can be condensed
-                    params[key] = local_params[key]
-                else:
-                    params[key] = np.concatenate(
-                        [params[key], local_params[key]], axis=0
-                    )
+            return [local_invar, local_params], criteria_index[:, 0]
+
+        if density is None:
+            (invar, params), total_sampled, total_tried = _rejection_sample(
+                _sample,
+                nr_points,
+                max_nr_try=100,
+                error_message="Could not sample interior of geometry. Check to make sure non-zero volume",
+                dtype=dtype,
+            )
 
-            # check if finished
-            total_sampled = next(iter(invar.values())).shape[0]
-            total_tried += nr_points
-            nr_try += 1
-            if total_sampled >= nr_points:
-                for key, value in invar.items():
-                    invar[key] = value[:nr_points]
-                for key, value in params.items():
-                    params[key] = value[:nr_points]
-                break
-
-            # report error if could not sample
-            if nr_try > 100 and total_sampled < 1:
-                raise RuntimeError(
-                    "Could not sample interior of geometry. Check to make sure non-zero volume"
+            # compute area value for monte carlo integration
+            volume = (total_sampled / total_tried) * bounds.volume(parameterization)
+            area = np.full((nr_points, 1), volume / nr_points)
+        else:
+            # bins of sdf with equal volume and points in proportion to the
+            # density integrated over every bin, every bin gets at least one
+            # point so its volume is kept in the integral
+            nr_bins = min(NR_DENSITY_BINS, nr_points)
+            pilot = self.sample_interior(
+                NR_DENSITY_PILOT_POINTS, bounds, criteria, parameterization
+            )
+            edges = np.quantile(pilot["sdf"], np.linspace(0, 1, nr_bins + 1))[1:-1]
+            masses = np.bincount(
+                np.searchsorted(edges, pilot["sdf"][:, 0]),
+                weights=np.ravel(density(pilot["sdf"])),
+                minlength=nr_bins,
+            )
+            expected = (nr_points - nr_bins) * masses / np.sum(masses)
+            counts = np.floor(expected).astype(np.int64)
+            counts[
+                np.argsort(counts - expected)[: nr_points - nr_bins - np.sum(counts)]
+            ] += 1
+            counts += 1
+
+            # candidates of every bin, the pilot points count as uniform
+            # candidates when estimating volumes of bins
+            bounds_volume = bounds.volume(parameterization)
+            nr_pilot_tried = (
+                pilot["sdf"].shape[0] * bounds_volume / np.sum(pilot["area"])
+            )
+            if parameterization.parameters:
+                _sample_bins, bin_volumes = self._uniform_bin_sampler(
+                    _sample, pilot, nr_pilot_tried, edges, bounds_volume
+                )
+            else:
+                _sample_bins, bin_volumes = self._focused_bin_sampler(
+                    _sample, pilot, nr_pilot_tried, edges, bounds, parameterization
                 )
+            (invar, params, weight), _ = _rejection_sample_groups(
+                _sample_bins,
+                counts,
+                max_nr_try=100,
+                error_message="Could not sample interior of geometry. Check to make sure non-zero volume",
+                dtype=dtype,
+            )
 
-        # compute area value for monte carlo integration
-        volume = (total_sampled / total_tried) * bounds.volume(parameterization)
-        invar["area"] = np.full_like(next(iter(invar.values())), volume / nr_points)
+            # compute area value for monte carlo integration, points of a bin
+            # from one pass share their part of the bin volume in proportion
+            # to their inverse proposal densities
+            bins = np.repeat(np.arange(nr_bins), counts)
+            group = bins * (np.max(weight["pass"]) + 1) + weight["pass"][:, 0]
+            weight = weight["weight"][:, 0].astype(np.float64)
+            nr_group = np.bincount(group)
+            area = (
+                bin_volumes()[bins]
+                * nr_group[group]
+                / counts[bins]
+                * weight
+                / np.bincount(group, weights=weight)[group]
+            )[:, None]
+        if defer_sdf_derivatives:
+            invar.update(
+                _cast_floats(
+                    self.sdf(invar, params, compute_sdf_derivatives=True), dtype
+                )
+            )
+        invar["area"] = area.astype(next(iter(invar.values())).dtype)
 
         # add params to invar
         invar.update(params)
         return invar
 
+    @staticmethod
+    def _uniform_bin_sampler(sample, pilot, nr_pilot_tried, edges, bounds_volume):
+        # bins are given by the sdf of uniform candidates, so they cannot be
+        # drawn with the weights of missing points
+        nr_bins = len(edges) + 1
+        state = {
+            "tried": nr_pilot_tried,
+            "inside": np.bincount(
+                np.searchsorted(edges, pilot["sdf"][:, 0]), minlength=nr_bins
+            ),
+        }
+
+        def sample_bins(nr_candidates, weights):
+            (local_invar, local_params), accepted = sample(nr_candidates)
+            bins = np.searchsorted(edges, local_invar["sdf"][:, 0])
+            state["tried"] += nr_candidates
+            state["inside"] += np.bincount(bins[accepted], minlength=nr_bins)
+            values = {
+                "weight": np.ones((nr_candidates, 1)),
+                "pass": np.zeros((nr_candidates, 1), dtype=np.int64),
+            }
+            return [local_invar, local_params, values], accepted, bins
+
+        def bin_volumes():
+            return state["inside"] / state["tried"] * bounds_volume
+
+        return sample_bins, bin_volumes
+
+    @staticmethod
+    def _focused_bin_sampler(
+        sample, pilot, nr_pilot_tried, edges, bounds, parameterization
+    ):
+        # candidates are drawn uniformly from grid cells whose sdf range can
+        # reach the sdf band of a bin, mixed with uniform candidates in case
+        # the sdf changes faster than distance
+        nr_bins = len(edges) + 1
+        computed_bounds = bounds._compute_bounds(parameterization)
+        dims = [str(key) for key in computed_bounds.keys()]
+        lower = np.array([float(value[0]) for value in computed_bounds.values()])
+        upper = np.array([float(value[1]) for value in computed_bounds.values()])
+        bounds_volume = np.prod(upper - lower)
+        resolution = max(1, int(round(NR_DENSITY_PILOT_POINTS ** (1.0 / len(dims)))))
+        cell_size = (upper - lower) / resolution
+        centers = (
+            lower
+            + (np.indices((resolution,) * len(dims)).reshape(len(dims), -1).T + 0.5)
+            * cell_size
+        )
+
+        def cell_index(invar):
+            points = np.concatenate([invar[d] for d in dims], axis=1)
+            index = np.floor((points - lower) / cell_size).astype(np.int64)
+            index = np.clip(index, 0, resolution - 1)
+            return np.ravel_multi_index(index.T, (resolution,) * len(dims))
+
+        def move_to_centers(local_invar):
+            for j, d in enumerate(dims):
+                local_invar[d][:, 0] = centers[:, j]
+
+        (cell_invar, _), _ = sample(centers.shape[0], move_to_centers)
+        cell_sdf = cell_invar["sdf"][:, 0].astype(np.float64)
+        radius = np.linalg.norm(cell_size) / 2.0
+        band_lower = np.concatenate([[0], edges])
+        band_upper = np.concatenate([edges, [np.inf]])
+        cell_masks = (cell_sdf[None, :] + radius >= band_lower[:, None]) & (
+            cell_sdf[None, :] - radius <= band_upper[:, None]
+        )
+        bin_cells = np.nonzero(cell_masks)[1]
+        nr_cells = np.sum(cell_masks, axis=1)
+        cell_starts = np.cumsum(nr_cells) - nr_cells
+        cells_volume = np.maximum(nr_cells, 1) * np.prod(cell_size)
+
+        # accepted candidates of all passes counted by bin and cell, and
+        # number of uniform and focused candidates of every bin drawn in all
+        # passes, their densities weight all candidates together
+        nr_grid_cells = centers.shape[0]
+        state = {
+            "nr_pass": 0,
+            "uniform": nr_pilot_tried,
+            "focused": np.zeros(nr_bins),
+            "counts": np.bincount(
+                np.searchsorted(edges, pilot["sdf"][:, 0]) * nr_grid_cells
+                + cell_index(pilot),
+                minlength=nr_bins * nr_grid_cells,
+            ),
+        }
+
+        def sample_bins(nr_candidates, weights):
+            # candidates are drawn from cells of bins with probability weights
+            # and kept in the bin they fall into, so cells of a bin also fill
+            # its neighbours
+            weights = np.where(nr_cells > 0, weights, 0.0)
+            if np.sum(weights) > 0:
+                uniform_fraction = DENSITY_UNIFORM_FRACTION
+                weights = weights / np.sum(weights)
+            else:
+                uniform_fraction = 1.0
+            focused = np.flatnonzero(np.random.rand(nr_candidates) >= uniform_fraction)
+            groups = np.random.choice(
+                nr_bins, focused.shape[0], p=weights if focused.shape[0] else None
+            )
+            cells = bin_cells[
+                cell_starts[groups]
+                + (np.random.rand(focused.shape[0]) * nr_cells[groups]).astype(np.int64)
+            ]
+            offsets = (np.random.rand(focused.shape[0], len(dims)) - 0.5) * cell_size
+
+            def move(local_invar):
+                for j, d in enumerate(dims):
+                    local_invar[d][focused, 0] = centers[cells, j] + offsets[:, j]
+
+            (local_invar, local_params), accepted = sample(nr_candidates, move)
+            bins = np.searchsorted(edges, local_invar["sdf"][:, 0])
+            cell = cell_index(local_invar)
+            density = (
+                uniform_fraction / bounds_volume
+                + (1 - uniform_fraction) * ((weights / cells_volume) @ cell_masks)[cell]
+            )
+            state["uniform"] += uniform_fraction * nr_candidates
+            state["focused"] += (1 - uniform_fraction) * nr_candidates * weights
+            state["counts"] += np.bincount(
+                bins[accepted] * nr_grid_cells + cell[accepted],
+                minlength=nr_bins * nr_grid_cells,
+            )
+            values = {
+                "weight": (1.0 / density)[:, None],
+                "pass": np.full((nr_candidates, 1), state["nr_pass"]),
+            }
+            state["nr_pass"] += 1
+            return [local_invar, local_params, values], accepted, bins
+
+        def bin_volumes():
+            # accepted candidates weighted by the inverse density of all
+            # candidates drawn, including the pilot points
+            density = (
+                state["uniform"] / bounds_volume
+                + (state["focused"] / cells_volume) @ cell_masks
+            )
+            counts = state["counts"].reshape(nr_bins, nr_grid_cells)
+            return counts @ (1.0 / density)
+
+        return sample_bins, bin_volumes
+
     @staticmethod
     def _convert_criteria(criteria):
         return criteria
@@ -667,18 +1335,27 @@ class Geometry:
 
             return add_sdf
 
-        new_sdf = _add_sdf(self.sdf, other.sdf, self.dims)
+        # skip operands far from points using their bounds if possible
+        operands = csg_operands(self, "union") + csg_operands(other, "union")
+        operand_bounds = [numeric_bounds(g) for g in operands]
+        if sum(b is not None for b in operand_bounds) >= MIN_BVH_OPERANDS:
+            new_sdf = max_sdf([g.sdf for g in operands], operand_bounds, self.dims)
+        else:
+            new_sdf = _add_sdf(self.sdf, other.sdf, self.dims)
         new_parameterization = self.parameterization.union(other.parameterization)
         new_bounds = self.bounds.union(other.bounds)
 
-        return Geometry(
+        new_geometry = Geometry(
             self.curves + other.curves,
             new_sdf,
             len(self.dims),
             new_bounds,
             new_parameterization,
             interior_epsilon=self.interior_epsilon,
+            bounded_sdf=all(g.bounded_sdf for g in operands),
         )
+        new_geometry._csg = ("union", [self, other], ())
+        return new_geometry
 
     def __sub__(self, other):
         def _sub_sdf(sdf_1, sdf_2, dims):
@@ -700,19 +1377,34 @@ class Geometry:
 
             return sub_sdf
 
-        new_sdf = _sub_sdf(self.sdf, other.sdf, self.dims)
+        # skip subtracted operands far from points using their bounds if possible
+        base, operands = subtract_operands(self)
+        operands = operands + csg_operands(other, "union")
+        operand_bounds = [numeric_bounds(g) for g in operands]
+        if sum(b is not None for b in operand_bounds) >= MIN_BVH_OPERANDS:
+            new_sdf = max_sdf(
+                [base.sdf] + [g.sdf for g in operands],
+                [None] + operand_bounds,
+                self.dims,
+                negate_first=True,
+            )
+        else:
+            new_sdf = _sub_sdf(self.sdf, other.sdf, self.dims)
         new_parameterization = self.parameterization.union(other.parameterization)
         new_bounds = self.bounds.union(other.bounds)
         new_curves = self.curves + [c.invert_normal() for c in other.curves]
 
-        return Geometry(
+        new_geometry = Geometry(
             new_curves,
             new_sdf,
             len(self.dims),
             new_bounds,
             new_parameterization,
             interior_epsilon=self.interior_epsilon,
+            bounded_sdf=self.bounded_sdf,
         )
+        new_geometry._csg = ("subtract", [self, other], ())
+        return new_geometry
 
     def __invert__(self):
         def _invert_sdf(sdf, dims):
@@ -733,14 +1425,17 @@ class Geometry:
         new_bounds = self.bounds.copy()
         new_curves = [c.invert_normal() for c in self.curves]
 
-        return Geometry(
+        new_geometry = Geometry(
             new_curves,
             new_sdf,
             len(self.dims),
             new_bounds,
             new_parameterization,
             interior_epsilon=self.interior_epsilon,
+            bounded_sdf=False,
         )
+        new_geometry._csg = ("invert", [self], ())
+        return new_geometry
 
     def __and__(self, other):
         def _and_sdf(sdf_1, sdf_2, dims):
@@ -767,11 +1462,14 @@ class Geometry:
         new_bounds = self.bounds.union(other.bounds)
         new_curves = self.curves + other.curves
 
-        return Geometry(
+        new_geometry = Geometry(
             new_curves,
             new_sdf,
             len(self.dims),
             new_bounds,
             new_parameterization,
             interior_epsilon=self.interior_epsilon,
+            bounded_sdf=self.bounded_sdf or other.bounded_sdf,
         )
+        new_geometry._csg = ("intersect", [self, other], ())
+        return new_geometry
@@ -1,8 +1,9 @@
 import numpy as np
 import sympy
+import torch
 import itertools
 
-from modulus.utils.sympy import np_lambdify
+from modulus.utils.sympy import np_lambdify, torch_lambdify
 from modulus.constants import diff_str
 
 
@@ -13,11 +14,253 @@ def _concat_numpy_dict_list(numpy_dict_list):
     return concat_variable
 
 
+def _cast_floats(values, dtype):
+    # cast floating point arrays of dictionary without copying if possible
+    return {
+        key: value.astype(dtype, copy=False) if value.dtype.kind == "f" else value
+        for key, value in values.items()
+    }
+
+
+def _ranges(starts, counts):
+    # concatenated ranges from starts with counts and index of their range
+    offsets = np.cumsum(counts) - counts
+    index = np.repeat(np.arange(starts.shape[0]), counts)
+    return starts[index] + np.arange(np.sum(counts)) - offsets[index], index
+
+
+def _rejection_sample(sample, nr_points, max_nr_try, error_message, dtype=None):
+    """
+    Samples `nr_points` accepted points in as few passes as possible. The
+    acceptance rate of previous passes sets how many candidates are drawn
+    and accepted points are written into preallocated arrays.
+
+    Parameters
+    ----------
+    sample : Callable
+        Function `sample(nr_candidates)` returning a list of dictionaries of
+        candidate arrays and a boolean array of accepted candidates.
+    nr_points : int
+        Number of points to sample.
+    max_nr_try : int
+        Number of passes without any accepted point before giving up.
+    error_message : str
+        Message of error raised if no point could be sampled.
+    dtype : Union[np.dtype, None]
+        Data type accepted floating point values are stored in. Default is
+        the data type of the candidates.
+
+    Returns
+    -------
+    values : List[Dict[str, np.ndarray]]
+        Dictionaries of accepted points.
+    nr_accepted : int
+        Number of accepted candidates, also counting ones not returned.
+    nr_tried : int
+        Number of candidates.
+    """
+
+    values = None
+    nr_stored, nr_accepted, nr_tried, nr_try = 0, 0, 0, 0
+    nr_candidates = nr_points
+    max_nr_candidates = 4 * nr_points  # limits memory of a single pass
+    while nr_stored < nr_points:
+        candidates, accepted = sample(nr_candidates)
+        index = np.flatnonzero(accepted)
+        nr_accepted += index.shape[0]
+        nr_tried += nr_candidates
+        nr_try += 1
+
+        # store accepted points until reached desired number of points
+        if values is None:
+            values = [
+                {
+                    key: np.empty(
+                        (nr_points,) + value.shape[1:],
+                        dtype
+                        if dtype is not None and value.dtype.kind == "f"
+                        else value.dtype,
+                    )
+                    for key, value in c.items()
+                }
+                for c in candidates
+            ]
+        index = index[: nr_points - nr_stored]
+        for v, c in zip(values, candidates):
+            for key, value in c.items():
+                v[key][nr_stored : nr_stored + index.shape[0]] = value[index]
+        nr_stored += index.shape[0]
+
+        # report error if could not sample
+        if nr_try > max_nr_try and nr_accepted < 1:
+            raise RuntimeError(error_message)
+
+        # oversample remaining points by the estimated acceptance rate
+        if nr_accepted > 0:
+            nr_candidates = int(
+                np.ceil(1.1 * (nr_points - nr_stored) * nr_tried / nr_accepted)
+            )
+        else:
+            nr_candidates = 2 * nr_candidates
+        nr_candidates = min(max(nr_candidates, 1), max_nr_candidates)
+    return values, nr_accepted, nr_tried
+
+
+def _rejection_sample_groups(sample, counts, max_nr_try, error_message, dtype=None):
+    """
+    Same as `_rejection_sample` for points split into groups, such as the
+    points of every parameter value of a batch of integrals. Candidates are
+    drawn for groups in proportion to their missing points and accepted
+    points of a group are stored in consecutive rows.
+
+    Parameters
+    ----------
+    sample : Callable
+        Function `sample(nr_candidates, weights)` returning a list of
+        dictionaries of candidate arrays, a boolean array of accepted
+        candidates and the group of every candidate. Groups should be
+        drawn with probability `weights`.
+    counts : np.ndarray
+        Number of points to sample in every group.
+    max_nr_try : int
+        Number of passes without any accepted point before giving up.
+    error_message : str
+        Message of error raised if no point could be sampled.
+    dtype : Union[np.dtype, None]
+        Data type accepted floating point values are stored in. Default is
+        the data type of the candidates.
+
+    Returns
+    -------
+    values : List[Dict[str, np.ndarray]]
+        Dictionaries of accepted points, group `i` in rows `starts[i]` to
+        `starts[i] + counts[i]`.
+    starts : np.ndarray
+        First row of every group.
+    """
+
+    nr_points = int(np.sum(counts))
+    starts = np.cumsum(counts) - counts
+    stored = np.zeros_like(counts)
+    values = None
+    nr_accepted, nr_tried, nr_try = 0, 0, 0
+    nr_candidates = nr_points
+    max_nr_candidates = 4 * nr_points  # limits memory of a single pass
+    while np.any(stored < counts):
+        missing = counts - stored
+        candidates, accepted, group = sample(nr_candidates, missing / np.sum(missing))
+        index = np.flatnonzero(accepted)
+        nr_accepted += index.shape[0]
+        nr_tried += nr_candidates
+        nr_try += 1
+
+        # rank accepted candidates in their group and keep missing points
+        index = index[np.argsort(group[index], kind="stable")]
+        index_group = group[index]
+        rank = np.arange(index.shape[0]) - np.searchsorted(index_group, index_group)
+        keep = rank < missing[index_group]
+        index, index_group, rank = index[keep], index_group[keep], rank[keep]
+        rows = starts[index_group] + stored[index_group] + rank
+
+        # store accepted points in rows of their group
+        if values is None:
+            values = [
+                {
+                    key: np.empty(
+                        (nr_points,) + value.shape[1:],
+                        dtype
+                        if dtype is not None and value.dtype.kind == "f"
+                        else value.dtype,
+                    )
+                    for key, value in c.items()
+                }
+                for c in candidates
+            ]
+        for v, c in zip(values, candidates):
+            for key, value in c.items():
+                v[key][rows] = value[index]
+        stored += np.bincount(index_group, minlength=counts.shape[0])
+
+        # report error if could not sample
+        if nr_try > max_nr_try and nr_accepted < 1:
+            raise RuntimeError(error_message)
+
+        # oversample remaining points by the estimated acceptance rate
+        nr_missing = nr_points - int(np.sum(stored))
+        if nr_accepted > 0:
+            nr_candidates = int(np.ceil(1.1 * nr_missing * nr_tried / nr_accepted))
+        else:
+            nr_candidates = 2 * nr_candidates
+        nr_candidates = min(max(nr_candidates, 1), max_nr_candidates)
+    return values, starts
+
+
+def _rejection_sample_torch(sample, nr_points, max_nr_try, error_message):
+    """
+    Same as `_rejection_sample` for candidates given as tensors. Accepted
+    points are written into preallocated tensors on the device of the
+    candidates.
+    """
+
+    values = None
+    nr_stored, nr_accepted, nr_tried, nr_try = 0, 0, 0, 0
+    nr_candidates = nr_points
+    max_nr_candidates = 4 * nr_points  # limits memory of a single pass
+    while nr_stored < nr_points:
+        candidates, accepted = sample(nr_candidates)
+        index = torch.nonzero(accepted)[:, 0]
+        nr_accepted += index.shape[0]
+        nr_tried += nr_candidates
+        nr_try += 1
+
+        # store accepted points until reached desired number of points
+        if values is None:
+            values = [
+                {
+                    key: value.new_empty((nr_points,) + value.shape[1:])
+                    for key, value in c.items()
+                }
+                for c in candidates
+            ]
+        index = index[: nr_points - nr_stored]
+        for v, c in zip(values, candidates):
+            for key, value in c.items():
+                v[key][nr_stored : nr_stored + index.shape[0]] = value[index]
+        nr_stored += index.shape[0]
+
+        # report error if could not sample
+        if nr_try > max_nr_try and nr_accepted < 1:
+            raise RuntimeError(error_message)
+
+        # oversample remaining points by the estimated acceptance rate
+        if nr_accepted > 0:
+            nr_candidates = int(
+                np.ceil(1.1 * (nr_points - nr_stored) * nr_tried / nr_accepted)
+            )
+        else:
+            nr_candidates = 2 * nr_candidates
+        nr_candidates = min(max(nr_candidates, 1), max_nr_candidates)
+    return values, nr_accepted, nr_tried
+
+
+def _interpolate_grid(grid, lower, upper, points):
+    # multilinear interpolation of grid (R_1, ..., R_d, C) spanning lower to upper
+    resolution = np.array(grid.shape[:-1])
+    t = (points - lower) / (upper - lower) * (resolution - 1)
+    index = np.clip(np.floor(t).astype(np.int64), 0, resolution - 2)
+    frac = np.clip(t - index, 0.0, 1.0)
+    values = np.zeros((points.shape[0], grid.shape[-1]))
+    for corner in itertools.product([0, 1], repeat=points.shape[1]):
+        weight = np.prod(np.where(corner, frac, 1.0 - frac), axis=1, keepdims=True)
+        values += weight * grid[tuple((index + np.array(corner)).T)]
+    return values
+
+
 def _sympy_sdf_to_sdf(sdf, dx=0.0001):
     sdf_inputs = list(set([str(x) for x in sdf.free_symbols]))
     fn_sdf = np_lambdify(sdf, sdf_inputs)
 
-    def _sdf(fn_sdf, sdf_inputs, dx):
+    def _sdf(fn_sdf, sdf_inputs, dx, sympy_sdf):
         def sdf(invar, params, compute_sdf_derivatives=False):
             # get inputs to sdf sympy expression
             inputs = {}
@@ -29,6 +272,94 @@ def _sympy_sdf_to_sdf(sdf, dx=0.0001):
             computed_sdf = fn_sdf(**inputs)
             outputs = {"sdf": computed_sdf}
 
+            # compute sdf derivatives if needed
+            if compute_sdf_derivatives:
+                for d in [x for x in invar.keys() if x in ["x", "y", "z"]]:
+                    # If primative is function of this direction
+                    if d in sdf_inputs:
+                        # offsets need float64, float32 points would round them
+                        x = np.asarray(inputs[d], dtype=np.float64)
+
+                        # compute sdf plus dx/2
+                        inputs_plus = {**inputs}
+                        inputs_plus[d] = x + (dx / 2)
+                        computed_sdf_plus = fn_sdf(**inputs_plus)
+
+                        # compute sdf minus dx/2
+                        inputs_minus = {**inputs}
+                        inputs_minus[d] = x - (dx / 2)
+                        computed_sdf_minus = fn_sdf(**inputs_minus)
+
+                        # store sdf derivative
+                        outputs["sdf" + diff_str + d] = (
+                            (computed_sdf_plus - computed_sdf_minus) / dx
+                        ).astype(np.result_type(computed_sdf), copy=False)
+                    else:
+                        # Fill deriv with zeros for compatibility
+                        outputs["sdf" + diff_str + d] = np.zeros_like(computed_sdf)
+
+            return outputs
+
+        # sympy expression is kept for other backends
+        sdf.sympy_sdf = sympy_sdf
+        return sdf
+
+    return _sdf(fn_sdf, sdf_inputs, dx, sdf)
+
+
+def _reduce_torch(reduce, reduce_constants, clamp):
+    # pairwise reduction without stacking, constants clamp tensors
+    def _reduce(*x):
+        tensors = [value for value in x if isinstance(value, torch.Tensor)]
+        constants = [value for value in x if not isinstance(value, torch.Tensor)]
+        value = tensors[0]
+        for tensor in tensors[1:]:
+            value = reduce(value, tensor)
+        if constants:
+            value = clamp(value, float(reduce_constants(constants)))
+        return value
+
+    return _reduce
+
+
+# exact square roots and pairwise min and max instead of training versions
+GEOMETRY_TORCH_MODULES = {
+    "sqrt": torch.sqrt,
+    "Min": _reduce_torch(torch.minimum, min, lambda x, c: torch.clamp(x, max=c)),
+    "Max": _reduce_torch(torch.maximum, max, lambda x, c: torch.clamp(x, min=c)),
+}
+
+
+def _torch_lambdify(func, func_inputs):
+    # numeric functions are evaluated so torch functions only get tensors
+    if isinstance(func, sympy.Basic):
+        func = func.xreplace(
+            {f: f.evalf() for f in func.atoms(sympy.Function, sympy.Pow) if f.is_number}
+        )
+    return torch_lambdify(
+        func, func_inputs, separable=True, modules=GEOMETRY_TORCH_MODULES
+    )
+
+
+def _sympy_sdf_to_torch_sdf(sdf, dx=0.0001):
+    sdf_inputs = list(set([str(x) for x in sdf.free_symbols]))
+    fn_sdf = _torch_lambdify(sdf, sdf_inputs)
+
+    def _sdf(fn_sdf, sdf_inputs, dx):
+        def sdf(invar, params, compute_sdf_derivatives=False):
+            # get inputs to sdf sympy expression
+            inputs = {}
+            for key, value in itertools.chain(invar.items(), params.items()):
+                if key in sdf_inputs:
+                    inputs[key] = value
+
+            # compute sdf, constant sdfs take shape from points
+            if inputs:
+                computed_sdf = fn_sdf(**inputs)
+            else:
+                computed_sdf = fn_sdf(**invar)
+            outputs = {"sdf": computed_sdf}
+
             # compute sdf derivatives if needed
             if compute_sdf_derivatives:
                 for d in [x for x in invar.keys() if x in ["x", "y", "z"]]:
@@ -50,7 +381,7 @@ def _sympy_sdf_to_sdf(sdf, dx=0.0001):
                         ) / dx
                     else:
                         # Fill deriv with zeros for compatibility
-                        outputs["sdf" + diff_str + d] = np.zeros_like(computed_sdf)
+                        outputs["sdf" + diff_str + d] = torch.zeros_like(computed_sdf)
 
             return outputs
 
@@ -79,6 +410,26 @@ def _sympy_criteria_to_criteria(criteria):
     return _criteria(fn_criteria, criteria_inputs)
 
 
+def _sympy_criteria_to_torch_criteria(criteria):
+    criteria_inputs = list(set([str(x) for x in criteria.free_symbols]))
+    fn_criteria = _torch_lambdify(criteria, criteria_inputs)
+
+    def _criteria(fn_criteria, criteria_inputs):
+        def criteria(invar, params):
+            # get inputs to criteria sympy expression
+            inputs = {}
+            for key, value in itertools.chain(invar.items(), params.items()):
+                if key in criteria_inputs:
+                    inputs[key] = value
+
+            # compute criteria
+            return fn_criteria(**inputs)
+
+        return criteria
+
+    return _criteria(fn_criteria, criteria_inputs)
+
+
 def _sympy_func_to_func(func):
     func_inputs = list(
         set([str(x) for x in func.free_symbols])
@@ -99,3 +450,23 @@ def _sympy_func_to_func(func):
         return func
 
     return _func(fn_func, func_inputs)
+
+
+def _sympy_func_to_torch_func(func):
+    func_inputs = list(set([str(x) for x in func.free_symbols]))
+    fn_func = _torch_lambdify(func, func_inputs)
+
+    def _func(fn_func, func_inputs):
+        def func(params):
+            # get inputs to sympy expression
+            inputs = {}
+            for key, value in params.items():
+                if key in func_inputs:
+                    inputs[key] = value
+
+            # compute func
+            return fn_func(**inputs)
+
+        return func
+
+    return _func(fn_func, func_inputs)
@@ -0,0 +1,373 @@
+"""
+Defines a geometry made of many copies of one geometry
+"""
+
+import itertools
+import numpy as np
+from scipy.spatial import cKDTree
+
+from modulus.constants import diff_str
+
+from .affine import decompose_similarity, lattice_transforms
+from .curve import InstancedCurve
+from .geometry import Geometry
+from .helper import _ranges
+from .parameterization import Parameter, Bounds
+
+# maximum number of cells of spatial hash
+MAX_HASH_CELLS = 2**18
+
+
+class InstancedGeometry(Geometry):
+    """
+    Union of copies of a geometry placed by affine transforms. Only the base
+    geometry and an array of transforms are stored. Boundary points are
+    sampled on the base geometry in one batch and moved to copies chosen by
+    area. The SDF is first evaluated on the closest copy of every point and
+    then in one call of the base SDF on the other copies that can still hold
+    a larger value. These copies are found with a spatial hash over the
+    bounds of the copies if the base SDF is bounded and not larger than the
+    distance to the surface, else all copies are evaluated. Copies are
+    assumed to not intersect each other.
+
+    Parameters
+    ----------
+    base : Geometry
+        Geometry that is copied. Its bounds must not be parameterized.
+    transforms : np.ndarray
+        Homogeneous matrices of rotations, reflections, uniform scaling and
+        translations with shape `[nr_instances, dims + 1, dims + 1]`.
+    """
+
+    def __init__(self, base, transforms):
+        dims = base.dims
+        transforms = np.asarray(transforms, dtype=float)
+        linear, translation, scale = decompose_similarity(transforms)
+        rotation = linear / scale[:, None, None]
+        inverse_linear = np.transpose(rotation, (0, 2, 1)) / scale[:, None, None]
+
+        # bounds of every copy from corners of base bounds
+        base_lower, base_upper = _numeric_box(base)
+        corners = np.array(list(itertools.product(*zip(base_lower, base_upper))))
+        moved_corners = (
+            np.einsum("mij,cj->mci", linear, corners) + translation[:, None, :]
+        )
+        instance_lower = np.min(moved_corners, axis=1)
+        instance_upper = np.max(moved_corners, axis=1)
+        if base.bounded_sdf:
+            instance_hash = _InstanceHash(instance_lower, instance_upper)
+        else:
+            instance_hash = None
+
+        shared_linear = bool(np.allclose(linear, linear[0]))
+
+        def sdf(invar, params, compute_sdf_derivatives=False):
+            points = np.concatenate([invar[d] for d in dims], axis=1)
+            nr_points = points.shape[0]
+
+            def _evaluate(point, instance, compute_sdf_derivatives):
+                # base sdf of points mapped into copies
+                moved_points = points[point] - translation[instance]
+                if shared_linear:
+                    local_points = moved_points @ inverse_linear[0].T
+                else:
+                    local_points = np.einsum(
+                        "nij,nj->ni", inverse_linear[instance], moved_points
+                    )
+                computed_sdf = base.sdf(
+                    {d: local_points[:, i : i + 1] for i, d in enumerate(dims)},
+                    {
+                        key: value[point]
+                        if isinstance(value, np.ndarray)
+                        and value.ndim > 0
+                        and value.shape[0] == nr_points
+                        else value
+                        for key, value in params.items()
+                    },
+                    compute_sdf_derivatives,
+                )
+                computed_sdf["sdf"] = computed_sdf["sdf"] * scale[instance, None]
+                return computed_sdf
+
+            # start from a close copy so most others are skipped
+            if instance_hash is not None:
+                instance = instance_hash.seed(points)
+            else:
+                instance = np.zeros(nr_points, dtype=np.int64)
+            computed_sdf = _evaluate(
+                np.arange(nr_points), instance, compute_sdf_derivatives
+            )
+            values = computed_sdf["sdf"][:, 0]
+
+            # other copies that can have a larger sdf, grouped by point
+            if instance_hash is not None:
+                point, other = instance_hash.candidates(points, instance, -values)
+            else:
+                point = np.repeat(np.arange(nr_points), scale.shape[0])
+                other = np.tile(np.arange(scale.shape[0]), nr_points)
+                keep = other != instance[point]
+                point, other = point[keep], other[keep]
+
+            # copy with largest sdf of every point
+            if point.shape[0] > 0:
+                other_values = _evaluate(point, other, False)["sdf"][:, 0]
+                new_point = np.diff(point, prepend=-1) != 0
+                group = np.cumsum(new_point) - 1
+                largest = np.maximum.reduceat(other_values, np.flatnonzero(new_point))
+                best = np.flatnonzero(other_values == largest[group])
+                _, first = np.unique(group[best], return_index=True)
+                changed = largest > values[point[new_point]]
+                changed_point = point[new_point][changed]
+                instance[changed_point] = other[best[first]][changed]
+                computed_sdf["sdf"][changed_point, 0] = largest[changed]
+                if compute_sdf_derivatives and changed_point.shape[0] > 0:
+                    changed_sdf = _evaluate(
+                        changed_point, instance[changed_point], True
+                    )
+                    for key, value in changed_sdf.items():
+                        computed_sdf[key][changed_point] = value
+
+            # rotate sdf derivatives of copies
+            outputs = {"sdf": computed_sdf["sdf"]}
+            if compute_sdf_derivatives:
+                gradient = np.concatenate(
+                    [computed_sdf["sdf" + diff_str + d] for d in dims], axis=1
+                )
+                if shared_linear:
+                    gradient = gradient @ rotation[0].T
+                else:
+                    gradient = np.einsum("nij,nj->ni", rotation[instance], gradient)
+                for i, d in enumerate(dims):
+                    outputs["sdf" + diff_str + d] = gradient[:, i : i + 1]
+            return outputs
+
+        # bounds of all copies
+        bounds = Bounds(
+            {
+                Parameter(d): (
+                    float(np.min(instance_lower[:, i])),
+                    float(np.max(instance_upper[:, i])),
+                )
+                for i, d in enumerate(dims)
+            },
+            parameterization=base.parameterization,
+        )
+
+        # initialize geometry
+        super().__init__(
+            [InstancedCurve(c, transforms) for c in base.curves],
+            sdf,
+            len(dims),
+            bounds,
+            base.parameterization,
+            interior_epsilon=base.interior_epsilon,
+            bounded_sdf=base.bounded_sdf,
+        )
+        self.base = base
+        self.transforms = transforms
+
+    @classmethod
+    def lattice(cls, base, spacing, repeat_lower, repeat_higher):
+        """
+        Copies of geometry translated by `spacing` times every integer
+        offset between `repeat_lower` and `repeat_higher`, the same copies
+        as `Geometry.repeat`.
+
+        Parameters
+        ----------
+        base : Geometry
+            Geometry that is copied.
+        spacing : float
+            Spacing between each repetition.
+        repeat_lower : List[int]
+            How many repetitions going in negative direction.
+        repeat_higher : List[int]
+            How many repetitions going in positive direction.
+        """
+
+        return cls(base, lattice_transforms(spacing, repeat_lower, repeat_higher))
+
+    def _primitive_curves(self):
+        return self.base._primitive_curves()
+
+
+def _numeric_box(geometry):
+    # lower and upper bounds of geometry as arrays
+    bound_ranges = {
+        str(key): value for key, value in geometry.bounds.bound_ranges.items()
+    }
+    box = np.array([bound_ranges[d] for d in geometry.dims], dtype=object)
+    if not all(isinstance(x, (float, int)) for x in box.flatten()):
+        raise ValueError("InstancedGeometry requires bounds that are not parameterized")
+    return box[:, 0].astype(float), box[:, 1].astype(float)
+
+
+class _InstanceHash:
+    """
+    Uniform grid over the bounds of copies storing for every cell the copies
+    that can have the largest SDF value at a point in the cell. The SDF of a
+    copy is below minus the distance to its bounds outside of them and above
+    minus the largest distance to its bounds, so copies whose bounds are
+    farther from the cell than the largest distance of the cell to the bounds
+    of some other copy are skipped.
+    """
+
+    def __init__(self, instance_lower, instance_upper):
+        self.instance_lower = instance_lower
+        self.instance_upper = instance_upper
+        self.tree = cKDTree((instance_lower + instance_upper) / 2.0)
+        self.max_radius = np.max(
+            np.linalg.norm(instance_upper - instance_lower, axis=1) / 2.0
+        )
+
+        # cells about the size of a copy
+        self.lower = np.min(instance_lower, axis=0)
+        extent = np.max(instance_upper, axis=0) - self.lower
+        cell_size = np.median(instance_upper - instance_lower, axis=0)
+        cell_size = np.where(cell_size > 0, cell_size, np.where(extent > 0, extent, 1))
+        while np.prod(np.ceil(extent / cell_size)) > MAX_HASH_CELLS:
+            cell_size = cell_size * 2.0
+        self.cell_size = cell_size
+        self.resolution = np.maximum(np.ceil(extent / cell_size), 1).astype(np.int64)
+        self.upper = self.lower + self.resolution * cell_size
+
+        # closest copy and copies of every cell in compressed rows
+        cells = np.indices(self.resolution).reshape(len(self.resolution), -1).T
+        cell_lower = self.lower + cells * cell_size
+        _, self.cell_seed = self.tree.query(cell_lower + cell_size / 2.0)
+        cell, instance = self._query(cell_lower, cell_lower + cell_size)
+        self.counts = np.bincount(cell, minlength=cells.shape[0])
+        self.offsets = np.cumsum(self.counts) - self.counts
+
+        # copies of cell sorted by distance so copies within reach are a prefix
+        distance = _box_distance(
+            cell_lower[cell],
+            cell_lower[cell] + cell_size,
+            instance_lower[instance],
+            instance_upper[instance],
+        )
+        order = np.lexsort((distance, cell))
+        self.cell_instances = instance[order]
+        self.row_length = float(np.max(distance, initial=0.0)) + 1.0
+        self.cell_distance = cell[order] * self.row_length + distance[order]
+
+    def seed(self, points):
+        """
+        Returns index of a copy close to each point.
+        """
+
+        cell, inside, outside = self._cell(points)
+        seed = np.empty(points.shape[0], dtype=np.int64)
+        seed[inside] = self.cell_seed[cell]
+        if outside.shape[0] > 0:
+            _, seed[outside] = self.tree.query(points[outside])
+        return seed
+
+    def candidates(self, points, seed, reach):
+        """
+        Returns pairs of point index and copy index, grouped by point, of
+        copies other than the seed copy with bounds closer to each point than
+        `reach`.
+        """
+
+        # points inside their seed copy have no other candidates
+        index = np.flatnonzero(reach > 0)
+        points, seed, reach = points[index], seed[index], reach[index]
+
+        # points in grid use copies of their cell
+        cell, inside, outside = self._cell(points)
+        counts = (
+            np.searchsorted(self.cell_distance, cell * self.row_length + reach[inside])
+            - self.offsets[cell]
+        )
+        position, point = _ranges(self.offsets[cell], counts)
+        point = [inside[point]]
+        instance = [self.cell_instances[position]]
+
+        # points outside of grid are queried on their own
+        if outside.shape[0] > 0:
+            point_index, outside_instance = self._query(
+                points[outside], points[outside]
+            )
+            point.append(outside[point_index])
+            instance.append(outside_instance)
+        point = np.concatenate(point)
+        instance = np.concatenate(instance)
+        if outside.shape[0] > 0:
+            order = np.argsort(point, kind="stable")
+            point, instance = point[order], instance[order]
+
+        # skip copies farther than reach of point
+        squared_distance = np.zeros(point.shape[0])
+        for i in range(points.shape[1]):
+            x = points[point, i]
+            gap = np.maximum(
+                np.maximum(self.instance_lower[instance, i] - x, 0),
+                x - self.instance_upper[instance, i],
+            )
+            squared_distance += gap * gap
+        keep = (instance != seed[point]) & (squared_distance < reach[point] ** 2)
+        return index[point[keep]], instance[keep]
+
+    def _cell(self, points):
+        # cell of points in grid, index of points in and outside of grid
+        in_grid = np.all((points >= self.lower) & (points <= self.upper), axis=1)
+        inside = np.flatnonzero(in_grid)
+        cell = np.floor((points[inside] - self.lower) / self.cell_size)
+        cell = np.minimum(cell.astype(np.int64), self.resolution - 1)
+        cell = np.ravel_multi_index(tuple(cell.T), self.resolution)
+        return cell, inside, np.flatnonzero(~in_grid)
+
+    def _query(self, lower, upper):
+        # copies that can have largest sdf in boxes, as pairs of box and copy
+        centers = (lower + upper) / 2.0
+        radius = np.linalg.norm(upper - lower, axis=1) / 2.0
+        nr_nearest = min(4, self.instance_lower.shape[0])
+        _, nearest = self.tree.query(centers, k=nr_nearest)
+        nearest = np.reshape(nearest, (centers.shape[0], nr_nearest))
+        reach = np.min(
+            [
+                _farthest_distance(
+                    lower,
+                    upper,
+                    self.instance_lower[nearest[:, k]],
+                    self.instance_upper[nearest[:, k]],
+                )
+                for k in range(nr_nearest)
+            ],
+            axis=0,
+        )
+
+        # copies with centers close enough to have bounds within reach
+        neighbours = self.tree.query_ball_point(
+            centers, reach + radius + self.max_radius
+        )
+        counts = np.array([len(n) for n in neighbours], dtype=np.int64)
+        box = np.repeat(np.arange(centers.shape[0]), counts)
+        instance = np.fromiter(
+            itertools.chain.from_iterable(neighbours),
+            dtype=np.int64,
+            count=int(np.sum(counts)),
+        )
+        keep = (
+            _box_distance(
+                lower[box],
+                upper[box],
+                self.instance_lower[instance],
+                self.instance_upper[instance],
+            )
+            <= reach[box]
+        )
+        return box[keep], instance[keep]
+
+
+def _box_distance(lower_1, upper_1, lower_2, upper_2):
+    # smallest distance between boxes
+    gap = np.maximum(np.maximum(lower_2 - upper_1, lower_1 - upper_2), 0)
+    return np.linalg.norm(gap, axis=1)
+
+
+def _farthest_distance(lower_1, upper_1, lower_2, upper_2):
+    # largest distance between points of boxes
+    span = np.maximum(np.abs(upper_2 - lower_1), np.abs(upper_1 - lower_2))
+    return np.linalg.norm(span, axis=1)
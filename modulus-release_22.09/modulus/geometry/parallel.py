@@ -0,0 +1,101 @@
+"""
+Samples geometries in parallel processes with independent random streams
+"""
+
+import multiprocessing
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+
+# sample function used by forked workers, closures can not be pickled
+_shard_sample = None
+
+
+def parallel_sample(sample, nr_points, num_workers, seed_sequences=None):
+    """
+    Samples `nr_points` points by splitting them over `num_workers` processes.
+    Every worker seeds the global NumPy random state, used by all geometry
+    sampling, from its own seed sequence so results are reproducible for a
+    fixed seed and number of workers. Sampled points are gathered through
+    shared memory.
+
+    Parameters
+    ----------
+    sample : Callable
+        Function `sample(nr_points)` returning dictionary of sampled points
+        such as `lambda n: geometry.sample_interior(n)`.
+    nr_points : int
+        Number of points to sample.
+    num_workers : int
+        Number of worker processes.
+    seed_sequences : Union[List[np.random.SeedSequence], None]
+        Seed sequence of every worker. If None the workers are seeded from
+        fresh entropy.
+
+    Returns
+    -------
+    points : Dict[str, np.ndarray]
+        Sampled points of all workers. Monte Carlo `area` values are scaled
+        so they sum to the average estimate of the workers.
+    """
+
+    global _shard_sample
+
+    if seed_sequences is None:
+        seed_sequences = np.random.SeedSequence().spawn(num_workers)
+    shards = [
+        (nr_points // num_workers + int(i < nr_points % num_workers), seed_sequence)
+        for i, seed_sequence in enumerate(seed_sequences)
+    ]
+    shards = [shard for shard in shards if shard[0] > 0]
+
+    # fork so workers share sample function, else sample shards in turn
+    _shard_sample = sample
+    resource_tracker.ensure_running()  # shared by workers to track memory
+    try:
+        if len(shards) > 1 and "fork" in multiprocessing.get_all_start_methods():
+            with multiprocessing.get_context("fork").Pool(len(shards)) as pool:
+                layouts = pool.map(_sample_shard, shards)
+        else:
+            layouts = [_sample_shard(shard) for shard in shards]
+    finally:
+        _shard_sample = None
+
+    # gather shards from shared memory
+    points = {}
+    for (nr_shard_points, _), (name, layout) in zip(shards, layouts):
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            for key, shape, dtype, offset in layout:
+                value = np.ndarray(shape, dtype, buffer=shm.buf, offset=offset)
+                if key == "area":
+                    value = value * (nr_shard_points / nr_points)
+                points.setdefault(key, []).append(np.array(value))
+        finally:
+            shm.close()
+            shm.unlink()
+    return {key: np.concatenate(value, axis=0) for key, value in points.items()}
+
+
+def _sample_shard(shard):
+    # sample with worker random stream, restoring state if run in process
+    nr_points, seed_sequence = shard
+    state = np.random.get_state()
+    np.random.seed(seed_sequence.generate_state(4))
+    try:
+        values = {
+            key: np.ascontiguousarray(v) for key, v in _shard_sample(nr_points).items()
+        }
+    finally:
+        np.random.set_state(state)
+
+    # write points into shared memory read by main process, 8 byte aligned
+    layout = []
+    offset = 0
+    for key, value in values.items():
+        layout.append((key, value.shape, value.dtype.str, offset))
+        offset += -(-value.nbytes // 8) * 8
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for (key, shape, dtype, offset) in layout:
+        np.ndarray(shape, dtype, buffer=shm.buf, offset=offset)[...] = values[key]
+    shm.close()
+    return shm.name, layout
@@ -1,14 +1,12 @@
 import itertools
 import numpy as np
+import torch
 from typing import Dict, List, Union, Tuple, Callable, Optional
 import sympy
 from typing import Callable
-from chaospy.distributions.sampler.sequences.primes import create_primes
-from chaospy.distributions.sampler.sequences.van_der_corput import (
-    create_van_der_corput_samples as create_samples,
-)
 
 from modulus.utils.sympy import np_lambdify
+from .quasirandom import QuasiRandomEngine
 
 
 class Parameter(sympy.Symbol):
@@ -53,24 +51,55 @@ class Parameterization:
 
     @property
     def parameters(self):
-        return [str(x) for x in self.param_ranges.keys()]
+        # names of all parameters, dependent parameters are split
+        return [
+            str(x)
+            for key in self.param_ranges.keys()
+            for x in (key if isinstance(key, tuple) else (key,))
+        ]
 
-    def sample(self, nr_points: int, quasirandom: bool = False):
+    def sample(
+        self,
+        nr_points: int,
+        quasirandom: Union[bool, QuasiRandomEngine] = False,
+        dtype=np.float64,
+    ):
         """Sample parameterization values.
 
         Parameters
         ----------
         nr_points : int
             Number of points sampled from parameterization.
-        quasirandom : bool
-            If true then sample the points using Halton sequences.
-            Default is False.
+        quasirandom : Union[bool, QuasiRandomEngine]
+            If true then sample the points using scrambled Halton sequences.
+            If an engine is given the sequence continues where the last
+            call with this engine stopped. Default is False.
+        dtype : np.dtype
+            Data type of sampled floating point values. Default is float64.
         """
 
         return {
             str(key): value
             for key, value in _sample_ranges(
-                nr_points, self.param_ranges, quasirandom
+                nr_points, self.param_ranges, quasirandom, dtype
+            ).items()
+        }
+
+    def sample_torch(self, nr_points: int, device=None):
+        """Sample parameterization values as float64 tensors.
+
+        Parameters
+        ----------
+        nr_points : int
+            Number of points sampled from parameterization.
+        device : Union[torch.device, str, None]
+            Device of sampled tensors. Default is the cpu.
+        """
+
+        return {
+            str(key): value
+            for key, value in _sample_ranges_torch(
+                nr_points, self.param_ranges, device
             ).items()
         }
 
@@ -118,7 +147,11 @@ class OrderedParameterization(Parameterization):
         self.key = key
 
     def sample(
-        self, nr_points: int, quasirandom: bool = False, sort: Optional = "ascending"
+        self,
+        nr_points: int,
+        quasirandom: Union[bool, QuasiRandomEngine] = False,
+        sort: Optional = "ascending",
+        dtype=np.float64,
     ):
         """Sample ordered parameterization values.
 
@@ -126,18 +159,21 @@ class OrderedParameterization(Parameterization):
         ----------
         nr_points : int
             Number of points sampled from parameterization.
-        quasirandom : bool
-            If true then sample the points using Halton sequences.
-            Default is False.
+        quasirandom : Union[bool, QuasiRandomEngine]
+            If true then sample the points using scrambled Halton sequences.
+            If an engine is given the sequence continues where the last
+            call with this engine stopped. Default is False.
         sort : None or {'ascending','descending'}
             If 'ascending' then sample the sorted points in ascending order.
             If 'descending' then sample the sorted points in descending order.
             Default is 'ascending'.
+        dtype : np.dtype
+            Data type of sampled floating point values. Default is float64.
         """
 
         sample_dict = {}
         for key, value in _sample_ranges(
-            nr_points, self.param_ranges, quasirandom
+            nr_points, self.param_ranges, quasirandom, dtype
         ).items():
             # sort the samples for the given key
             if key == self.key:
@@ -196,7 +232,8 @@ class Bounds:
         self,
         nr_points: int,
         parameterization: Union[None, Parameterization] = None,
-        quasirandom: bool = False,
+        quasirandom: Union[bool, QuasiRandomEngine] = False,
+        dtype=np.float64,
     ):
         """Sample points in Bounds.
 
@@ -206,9 +243,12 @@ class Bounds:
             Number of points sampled from parameterization.
         parameterization : Parameterization
             Given if sampling bounds with different parameterization then the internal one stored in Bounds. Default is to not use this.
-        quasirandom : bool
-            If true then sample the points using Halton sequences.
-            Default is False.
+        quasirandom : Union[bool, QuasiRandomEngine]
+            If true then sample the points using scrambled Halton sequences.
+            If an engine is given the sequence continues where the last
+            call with this engine stopped. Default is False.
+        dtype : np.dtype
+            Data type of sampled points. Default is float64.
         """
 
         if parameterization is not None:
@@ -217,7 +257,7 @@ class Bounds:
         return {
             str(key): value
             for key, value in _sample_ranges(
-                nr_points, computed_bound_ranges, quasirandom
+                nr_points, computed_bound_ranges, quasirandom, dtype
             ).items()
         }
 
@@ -382,24 +422,17 @@ class Bounds:
         )
 
 
-def _sample_ranges(batch_size, ranges, quasirandom=False):
+def _sample_ranges(batch_size, ranges, quasirandom=False, dtype=np.float64):
     parameterization = {}
-    if quasirandom:
-        prime_index = 0
-        primes = create_primes(1000)
+    if quasirandom is True:
+        quasirandom = QuasiRandomEngine()
     for key, value in ranges.items():
         # sample parameter
         if isinstance(value, tuple):
             if quasirandom:
-                indices = [idx for idx in range(batch_size)]
-                rand_param = (
-                    value[0]
-                    + (value[1] - value[0])
-                    * create_samples(indices, number_base=primes[prime_index]).reshape(
-                        -1, 1
-                    )
-                ).astype(float)
-                prime_index += 1
+                rand_param = value[0] + (value[1] - value[0]) * quasirandom.sample(
+                    str(key), batch_size
+                )
             else:
                 rand_param = np.random.uniform(value[0], value[1], size=(batch_size, 1))
         elif isinstance(value, (float, int)):
@@ -416,6 +449,48 @@ def _sample_ranges(batch_size, ranges, quasirandom=False):
                 + " not supported, try (tuple, or np.ndarray)"
             )
 
+        # random values are drawn in float64 and cast to dtype one at a time
+        if np.asarray(rand_param).dtype.kind == "f":
+            rand_param = np.asarray(rand_param, dtype=dtype)
+
+        # if dependent sample break up parameter
+        if isinstance(key, tuple):
+            for i, k in enumerate(key):
+                parameterization[k] = rand_param[:, i : i + 1]
+        else:
+            parameterization[key] = rand_param
+    return parameterization
+
+
+def _sample_ranges_torch(batch_size, ranges, device=None):
+    parameterization = {}
+    for key, value in ranges.items():
+        # sample parameter
+        if isinstance(value, tuple):
+            lower, upper = float(value[0]), float(value[1])
+            rand_param = lower + (upper - lower) * torch.rand(
+                (batch_size, 1), dtype=torch.float64, device=device
+            )
+        elif isinstance(value, (float, int)):
+            rand_param = torch.full(
+                (batch_size, 1), float(value), dtype=torch.float64, device=device
+            )
+        elif isinstance(value, np.ndarray):
+            index = torch.randint(value.shape[0], (batch_size,), device=device)
+            rand_param = torch.as_tensor(value, dtype=torch.float64, device=device)[
+                index, :
+            ]
+        elif isinstance(value, Callable):
+            rand_param = torch.as_tensor(
+                value(batch_size), dtype=torch.float64, device=device
+            )
+        else:
+            raise ValueError(
+                "range type: "
+                + str(type(value))
+                + " not supported, try (tuple, or np.ndarray)"
+            )
+
         # if dependent sample break up parameter
         if isinstance(key, tuple):
             for i, k in enumerate(key):
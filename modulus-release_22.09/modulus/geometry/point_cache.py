@@ -0,0 +1,248 @@
+"""
+Persistent on-disk cache of sampled point clouds
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+import sympy
+
+from modulus import __version__
+
+from .affine import AffineTransform
+from .geometry import Geometry
+from .parameterization import Parameterization, Bounds
+
+# version of stored entries, changing it invalidates all cached points
+CACHE_VERSION = 1
+
+# number of points probing primitive geometries for their fingerprint
+NR_PROBE_POINTS = 256
+
+
+class PointCache:
+    """
+    Content-addressed cache of sampled points stored in a directory. Every
+    entry is a directory named by its key holding one `.npy` file per
+    column, which are loaded memory mapped so columns are only read when
+    used. Entries are evicted least recently used first once the cache
+    grows beyond `max_size`. Entries are written to a temporary directory
+    and renamed so processes can share the cache.
+
+    Parameters
+    ----------
+    directory : str
+        Directory of cache.
+    max_size : Union[int, None]
+        Maximum size of cached points in bytes. None to never evict entries.
+    """
+
+    def __init__(self, directory, max_size=None):
+        self.directory = directory
+        self.max_size = max_size
+
+    def get(self, key, sample):
+        """
+        Returns points stored under `key`, calling `sample()` and storing
+        its points if they are not cached.
+        """
+
+        points = self.load(key)
+        if points is None:
+            points = sample()
+            self.save(key, points)
+        return points
+
+    def load(self, key):
+        """
+        Returns dictionary of memory mapped columns stored under `key` or
+        None if not cached. Columns are copy on write so changing them does
+        not change the cache.
+        """
+
+        path = os.path.join(self.directory, key)
+        try:
+            with open(os.path.join(path, "columns.json")) as f:
+                columns = json.load(f)
+            points = {
+                column: np.load(os.path.join(path, f"{i}.npy"), mmap_mode="c")
+                for i, column in enumerate(columns)
+            }
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:  # not cached or evicted by other process
+            return None
+        return points
+
+    def save(self, key, points):
+        """
+        Stores dictionary of arrays `points` under `key` and evicts least
+        recently used entries if the cache is too large.
+        """
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, key)
+        tmp_path = os.path.join(self.directory, f".{key}.{os.getpid()}")
+        os.makedirs(tmp_path, exist_ok=True)
+        for i, value in enumerate(points.values()):
+            np.save(os.path.join(tmp_path, f"{i}.npy"), np.asarray(value))
+        with open(os.path.join(tmp_path, "columns.json"), "w") as f:
+            json.dump(list(points.keys()), f)
+        try:
+            os.rename(tmp_path, path)
+        except OSError:  # stored by other process
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        self.evict(keep=key)
+
+    def invalidate(self, key=None):
+        """
+        Removes entry stored under `key` or all entries if None.
+        """
+
+        keys = [key] if key is not None else [k for k, _, _ in self._entries()]
+        for k in keys:
+            shutil.rmtree(os.path.join(self.directory, k), ignore_errors=True)
+
+    def evict(self, keep=None):
+        """
+        Removes least recently used entries, except `keep`, until the cache
+        is not larger than `max_size`.
+        """
+
+        if self.max_size is None:
+            return
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        size = sum(entry_size for _, _, entry_size in entries)
+        for key, _, entry_size in entries:
+            if size <= self.max_size:
+                break
+            if key != keep:
+                shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+                size -= entry_size
+
+    @property
+    def size(self):
+        return sum(entry_size for _, _, entry_size in self._entries())
+
+    def _entries(self):
+        # key, last use and size of every complete entry
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for key in os.listdir(self.directory):
+            path = os.path.join(self.directory, key)
+            if key.startswith(".") or not os.path.isdir(path):
+                continue
+            try:
+                size = sum(
+                    os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)
+                )
+                entries.append((key, os.path.getmtime(path), size))
+            except FileNotFoundError:  # evicted by other process
+                pass
+        return entries
+
+
+def fingerprint(*values):
+    """
+    Returns stable hash of geometries, parameterizations, bounds, sympy
+    expressions, arrays and nested containers of them. CSG geometries are
+    hashed by their operations and operands and primitives by their SDF and
+    points sampled on their curves with a fixed random state, so equal
+    definitions give equal hashes across runs.
+
+    Raises
+    ------
+    TypeError
+        If a value can not be hashed, such as a criteria function.
+    """
+
+    h = hashlib.sha256()
+    _update(h, (CACHE_VERSION, __version__) + values, {})
+    return h.hexdigest()
+
+
+def _update(h, value, memo):
+    # hash type tag and content of value
+    if isinstance(value, Geometry):
+        if id(value) not in memo:
+            memo[id(value)] = fingerprint_geometry(value, memo)
+        h.update(b"geometry" + memo[id(value)].encode())
+    elif value is None or isinstance(value, (bool, int, float, str)):
+        h.update(repr((type(value).__name__, value)).encode())
+    elif isinstance(value, (np.ndarray, np.generic)):
+        value = np.ascontiguousarray(value)
+        h.update(repr(("array", value.dtype.str, value.shape)).encode())
+        h.update(value.tobytes())
+    elif isinstance(value, sympy.Basic):
+        h.update(b"sympy" + sympy.srepr(value).encode())
+    elif isinstance(value, dict):
+        h.update(repr(("dict", len(value))).encode())
+        for key, v in sorted(value.items(), key=lambda item: str(item[0])):
+            _update(h, key, memo)
+            _update(h, v, memo)
+    elif isinstance(value, (list, tuple)):
+        h.update(repr(("list", len(value))).encode())
+        for v in value:
+            _update(h, v, memo)
+    elif isinstance(value, (Parameterization, Bounds)):
+        h.update(type(value).__name__.encode())
+        _update(h, vars(value), memo)
+    elif isinstance(value, AffineTransform):
+        _update(h, ("affine", value.matrix, value.inverse_matrix, value.scale), memo)
+    else:
+        raise TypeError(f"Can not fingerprint value of type {type(value)}")
+
+
+def fingerprint_geometry(geometry, memo=None):
+    """
+    Returns stable hash of definition of `geometry`.
+    """
+
+    memo = {} if memo is None else memo
+    h = hashlib.sha256()
+    definition = [
+        type(geometry).__name__,
+        geometry.dims,
+        geometry.bounds,
+        geometry.parameterization,
+        geometry.interior_epsilon,
+        geometry.bounded_sdf,
+    ]
+    if geometry._csg is not None:
+        definition.append(geometry._csg)
+    else:
+        definition.append(getattr(geometry.sdf, "sympy_sdf", None))
+        definition.append(_probe(geometry))
+    _update(h, definition, memo)
+    return h.hexdigest()
+
+
+def _probe(geometry):
+    # sdf in bounds and points on curves sampled with fixed random state
+    state = np.random.get_state()
+    np.random.seed(0)
+    try:
+        params = geometry.parameterization.sample(NR_PROBE_POINTS)
+        invar = geometry.bounds.sample(NR_PROBE_POINTS, geometry.parameterization)
+        values = [geometry.sdf(invar, params)["sdf"]]
+        for curve in geometry.curves:
+            values.append(
+                curve._sample(NR_PROBE_POINTS, geometry.parameterization, False)
+            )
+    finally:
+        np.random.set_state(state)
+
+    # rounded so equal definitions agree across machines
+    return _round(values)
+
+
+def _round(value):
+    if isinstance(value, np.ndarray) and value.dtype.kind == "f":
+        return value.astype(np.float32)
+    if isinstance(value, dict):
+        return {key: _round(v) for key, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_round(v) for v in value]
+    return value
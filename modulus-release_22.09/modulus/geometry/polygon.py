@@ -0,0 +1,255 @@
+"""
+Signed distance and perimeter sampling of polygons stored as vertex arrays
+"""
+
+import numpy as np
+import torch
+
+from modulus.constants import diff_str
+from .bvh import build_bvh, build_seed_grid, _grid_lookup, _squared_box_distance
+from .curve import Curve
+from .helper import _ranges
+from .parameterization import Parameterization, Parameter
+
+# number of consecutive edges in a leaf of the bounding volume hierarchy
+LEAF_EDGES = 16
+
+
+def polygon_curve(vertices, parameterization=Parameterization()):
+    """
+    Makes single curve over all edges of a polygon. Points are placed by
+    sampling a position along the perimeter and looking up its edge in a
+    table of cumulative edge lengths.
+
+    Parameters
+    ----------
+    vertices : np.ndarray
+        Vertices of polygon with shape `[nr_vertices, 2]`.
+    parameterization : Parameterization
+        Parameterization of curve.
+    """
+
+    v1 = vertices
+    edges = np.roll(vertices, -1, axis=0) - v1
+    lengths = np.linalg.norm(edges, axis=1)
+    cumulative_lengths = np.cumsum(lengths)
+    perimeter = float(cumulative_lengths[-1])
+    position = Parameter("polygon_perimeter_position")
+
+    def sample(nr_points, parameterization=Parameterization(), quasirandom=False):
+        # edge and position on edge of position along perimeter
+        t = Parameterization({position: (0.0, perimeter)}).sample(
+            nr_points, quasirandom=quasirandom
+        )[str(position)][:, 0]
+        edge_index = np.minimum(
+            np.searchsorted(cumulative_lengths, t, side="right"), len(lengths) - 1
+        )
+        s = 1.0 - (cumulative_lengths[edge_index] - t) / lengths[edge_index]
+        s = np.clip(s, 0.0, 1.0)[:, None]
+        edge = edges[edge_index]
+        length = lengths[edge_index, None]
+        invar = {
+            "x": v1[edge_index, 0:1] + s * edge[:, 0:1],
+            "y": v1[edge_index, 1:2] + s * edge[:, 1:2],
+            "normal_x": edge[:, 1:2] / length,
+            "normal_y": -edge[:, 0:1] / length,
+            "area": np.full((nr_points, 1), perimeter / nr_points),
+        }
+
+        # sample from the param ranges
+        params = parameterization.sample(nr_points, quasirandom=quasirandom)
+        return invar, params
+
+    def torch_sample(nr_points, parameterization=Parameterization(), device=None):
+        # same as sample with float64 tensors on device
+        t_v1 = torch.as_tensor(v1, dtype=torch.float64, device=device)
+        t_edges = torch.as_tensor(edges, dtype=torch.float64, device=device)
+        t_lengths = torch.as_tensor(lengths, dtype=torch.float64, device=device)
+        t_cumulative_lengths = torch.as_tensor(
+            cumulative_lengths, dtype=torch.float64, device=device
+        )
+        t = perimeter * torch.rand(nr_points, dtype=torch.float64, device=device)
+        edge_index = torch.clamp(
+            torch.searchsorted(t_cumulative_lengths, t, right=True),
+            max=len(lengths) - 1,
+        )
+        s = 1.0 - (t_cumulative_lengths[edge_index] - t) / t_lengths[edge_index]
+        s = torch.clamp(s, 0.0, 1.0)[:, None]
+        edge = t_edges[edge_index]
+        length = t_lengths[edge_index, None]
+        invar = {
+            "x": t_v1[edge_index, 0:1] + s * edge[:, 0:1],
+            "y": t_v1[edge_index, 1:2] + s * edge[:, 1:2],
+            "normal_x": edge[:, 1:2] / length,
+            "normal_y": -edge[:, 0:1] / length,
+            "area": torch.full(
+                (nr_points, 1),
+                perimeter / nr_points,
+                dtype=torch.float64,
+                device=device,
+            ),
+        }
+        params = parameterization.sample_torch(nr_points, device)
+        return invar, params
+
+    return Curve(
+        sample,
+        dims=2,
+        parameterization=parameterization,
+        area=perimeter,
+        torch_sample=torch_sample,
+    )
+
+
+def polygon_sdf(vertices):
+    """
+    Makes SDF function of a polygon from the distance to the closest edge
+    and the number of edges crossed by a ray in positive x direction. Runs
+    of consecutive edges are stored in a bounding volume hierarchy so only
+    runs that can contain the closest edge are evaluated, and edges are
+    binned into horizontal slabs so rays are only tested against edges of
+    the slab of a point.
+
+    Parameters
+    ----------
+    vertices : np.ndarray
+        Vertices of polygon with shape `[nr_vertices, 2]`.
+    """
+
+    v1 = vertices
+    v2 = np.roll(vertices, -1, axis=0)
+    lower = np.min(vertices, axis=0)
+    upper = np.max(vertices, axis=0)
+
+    # neighbouring edges of polygon are close so runs have small bounds
+    leaves = [
+        slice(start, start + LEAF_EDGES)
+        for start in range(0, vertices.shape[0], LEAF_EDGES)
+    ]
+    leaf_lower = np.stack(
+        [np.minimum(np.min(v1[l], axis=0), np.min(v2[l], axis=0)) for l in leaves]
+    )
+    leaf_upper = np.stack(
+        [np.maximum(np.max(v1[l], axis=0), np.max(v2[l], axis=0)) for l in leaves]
+    )
+    bvh = build_bvh(leaf_lower, leaf_upper)
+    seed_grid = build_seed_grid(leaf_lower, leaf_upper)
+    slabs = _build_slabs(v1, v2, lower[1], upper[1])
+
+    def sdf(invar, params, compute_sdf_derivatives=False):
+        points = np.concatenate([invar["x"], invar["y"]], axis=1)
+        coords = [points[:, 0], points[:, 1]]
+        nr_points = points.shape[0]
+        squared_distance = np.full(nr_points, np.inf)
+        closest = np.zeros((nr_points, 2))
+
+        def _evaluate(leaf, index):
+            leaf_distance, leaf_closest = _closest_point(
+                points[index], v1[leaves[leaf]], v2[leaves[leaf]]
+            )
+            update = leaf_distance < squared_distance[index]
+            squared_distance[index[update]] = leaf_distance[update]
+            closest[index[update]] = leaf_closest[update]
+
+        def _visit(node, index):
+            # skip points already closer to polygon than to node bounds
+            keep = (
+                _squared_box_distance([c[index] for c in coords], node[0], node[1])
+                < squared_distance[index]
+            )
+            index = index[keep]
+            if index.shape[0] == 0:
+                return
+            children = node[2]
+            if isinstance(children, int):
+                index = index[seed_leaf[index] != children]
+                if index.shape[0] > 0:
+                    _evaluate(children, index)
+            else:
+                _visit(children[0], index)
+                _visit(children[1], index)
+
+        # start from a close run of edges so most others are skipped
+        seed_leaf = _grid_lookup(coords, seed_grid)
+        order = np.argsort(seed_leaf, kind="stable")
+        for index in np.split(order, np.flatnonzero(np.diff(seed_leaf[order])) + 1):
+            if index.shape[0] > 0:
+                _evaluate(seed_leaf[index[0]], index)
+        _visit(bvh, np.arange(nr_points))
+
+        # sdf is positive inside polygon, points outside bounds are outside
+        inside = np.flatnonzero(np.all((points >= lower) & (points <= upper), axis=1))
+        sign = np.full((nr_points, 1), -1.0)
+        sign[inside[_odd_crossings(points[inside], v1, v2, slabs)], 0] = 1.0
+        distance = np.sqrt(squared_distance)[:, None]
+        outputs = {"sdf": sign * distance}
+        if compute_sdf_derivatives:
+            direction = (points - closest) / np.where(distance > 0, distance, 1.0)
+            outputs["sdf" + diff_str + "x"] = sign * direction[:, 0:1]
+            outputs["sdf" + diff_str + "y"] = sign * direction[:, 1:2]
+        return outputs
+
+    # vertices let other backends evaluate the same sdf
+    sdf.vertices = vertices
+    return sdf
+
+
+def _closest_point(points, a, b):
+    # squared distance and closest point of points on segments from a to b
+    dx, dy = b[:, 0] - a[:, 0], b[:, 1] - a[:, 1]
+    d_dot_d = dx * dx + dy * dy
+    inv_d_dot_d = 1.0 / np.where(d_dot_d > 0, d_dot_d, 1.0)
+    px = points[:, 0:1] - a[:, 0]
+    py = points[:, 1:2] - a[:, 1]
+    t = np.clip((px * dx + py * dy) * inv_d_dot_d, 0, 1)
+    vx = px - dx * t
+    vy = py - dy * t
+    squared_distance = vx * vx + vy * vy
+    nearest = np.argmin(squared_distance, axis=1)
+    rows = np.arange(points.shape[0])
+    t = t[rows, nearest]
+    return squared_distance[rows, nearest], np.stack(
+        [a[nearest, 0] + dx[nearest] * t, a[nearest, 1] + dy[nearest] * t], axis=1
+    )
+
+
+def _build_slabs(v1, v2, lower, upper):
+    # edges overlapping each horizontal slab in y
+    nr_edges = v1.shape[0]
+    nr_slabs = int(min(max(nr_edges // 2, 1), 4096))
+    height = (upper - lower) / nr_slabs if upper > lower else 1.0
+    first = _slab(np.minimum(v1[:, 1], v2[:, 1]), lower, height, nr_slabs)
+    last = _slab(np.maximum(v1[:, 1], v2[:, 1]), lower, height, nr_slabs)
+    slab, edge = _ranges(first, last - first + 1)
+    order = np.argsort(slab, kind="stable")
+    counts = np.bincount(slab, minlength=nr_slabs)
+    return lower, height, nr_slabs, np.cumsum(counts) - counts, counts, edge[order]
+
+
+def _slab(y, lower, height, nr_slabs):
+    return np.clip(np.floor((y - lower) / height).astype(np.int64), 0, nr_slabs - 1)
+
+
+def _odd_crossings(points, v1, v2, slabs, block_size=2**20):
+    # ray in positive x direction crosses odd number of edges inside polygon
+    lower, height, nr_slabs, offsets, counts, edges = slabs
+    slab = _slab(points[:, 1], lower, height, nr_slabs)
+    nr_crossings = np.zeros(points.shape[0])
+    step = max(block_size // max(int(np.max(counts)), 1), 1)
+    for start in range(0, points.shape[0], step):
+        # pairs of points and edges in their slab
+        block = slice(start, start + step)
+        position, point = _ranges(offsets[slab[block]], counts[slab[block]])
+        edge = edges[position]
+        x = points[block][point, 0]
+        y = points[block][point, 1]
+        ax, ay, bx, by = v1[edge, 0], v1[edge, 1], v2[edge, 0], v2[edge, 1]
+        cross = (ax - bx) * (y - by) - (ay - by) * (x - bx)
+        above = y >= by
+        below = ay >= y
+        left = cross >= 0
+        crossed = (above & below & left) | (~above & ~below & ~left)
+        nr_crossings[block] = np.bincount(
+            point, weights=crossed, minlength=slab[block].shape[0]
+        )
+    return nr_crossings % 2 == 1
@@ -104,4 +104,5 @@ class Line1D(Geometry):
             dims=1,
             bounds=bounds,
             parameterization=parameterization,
+            bounded_sdf=True,
         )
@@ -4,6 +4,7 @@ see https://www.iquilezles.org/www/articles/distfunctions/distfunctions.html
 """
 
 import sys
+import numpy as np
 from operator import mul
 from sympy import Symbol, Abs, Max, Min, sqrt, sin, cos, acos, atan2, pi, Heaviside
 from functools import reduce
@@ -14,6 +15,7 @@ from .curve import SympyCurve
 from .helper import _sympy_sdf_to_sdf
 from .geometry import Geometry, csg_curve_naming
 from .parameterization import Parameterization, Parameter, Bounds
+from .polygon import polygon_curve, polygon_sdf
 
 
 class Line(Geometry):
@@ -246,6 +248,7 @@ class Rectangle(Geometry):
             dims=2,
             bounds=bounds,
             parameterization=parameterization,
+            bounded_sdf=True,
         )
 
 
@@ -304,6 +307,7 @@ class Circle(Geometry):
             dims=2,
             bounds=bounds,
             parameterization=parameterization,
+            bounded_sdf=True,
         )
 
 
@@ -472,96 +476,45 @@ class Ellipse(Geometry):
 
 class Polygon(Geometry):
     """
-    2D Polygon
+    2D Polygon. Polygons with numeric vertices store them as an array with
+    a vectorized SDF and a single curve over the perimeter, vertices given as
+    sympy expressions build a sympy SDF and a curve for each edge.
 
     Parameters
     ----------
-    points : list of tuple with 2 ints or floats
-        lower bound point of line segment
+    points : list of tuple with 2 ints, floats or sympy expressions
+        vertices of polygon
     parameterization : Parameterization
         Parameterization of geometry.
     """
 
     def __init__(self, points, parameterization=Parameterization()):
-        # make sympy symbols to use
-        s = Symbol(csg_curve_naming(0))
-        x = Symbol("x")
-        y = Symbol("y")
-
-        # wrap points
-        wrapted_points = points + [points[0]]
-
-        # curves for each side
-        curve_parameterization = Parameterization({s: (0, 1)})
-        curve_parameterization = Parameterization.combine(
-            curve_parameterization, parameterization
-        )
-        curves = []
-        for v1, v2 in zip(wrapted_points[:-1], wrapted_points[1:]):
-            # area
-            dx = v2[0] - v1[0]
-            dy = v2[1] - v1[1]
-            area = (dx**2 + dy**2) ** 0.5
-
-            # generate normals
-            normal_x = dy / area
-            normal_y = -dx / area
-            line = SympyCurve(
-                functions={
-                    "x": dx * s + v1[0],
-                    "y": dy * s + v1[1],
-                    "normal_x": dy / area,
-                    "normal_y": -dx / area,
-                },
-                parameterization=curve_parameterization,
-                area=area,
-            )
-            curves.append(line)
-
-        # calculate SDF
-        sdfs = [(x - wrapted_points[0][0]) ** 2 + (y - wrapted_points[0][1]) ** 2]
-        conds = []
-        for v1, v2 in zip(wrapted_points[:-1], wrapted_points[1:]):
-            # sdf calculation
-            dx = v1[0] - v2[0]
-            dy = v1[1] - v2[1]
-            px = x - v2[0]
-            py = y - v2[1]
-            d_dot_d = dx**2 + dy**2
-            p_dot_d = px * dx + py * dy
-            max_min = Max(Min(p_dot_d / d_dot_d, 1.0), 0.0)
-            vx = px - dx * max_min
-            vy = py - dy * max_min
-            sdf = vx**2 + vy**2
-            sdfs.append(sdf)
-
-            # winding calculation
-            cond_1 = Heaviside(y - v2[1])
-            cond_2 = Heaviside(v1[1] - y)
-            cond_3 = Heaviside((dx * py) - (dy * px))
-            all_cond = cond_1 * cond_2 * cond_3
-            none_cond = (1.0 - cond_1) * (1.0 - cond_2) * (1.0 - cond_3)
-            cond = 1.0 - 2.0 * Min(all_cond + none_cond, 1.0)
-            conds.append(cond)
-
-        # set inside outside
-        sdf = Min(*sdfs)
-        cond = reduce(mul, conds)
-        sdf = sqrt(sdf) * -cond
-
-        # calculate bounds
-        min_x = Min(*[p[0] for p in points])
-        if min_x.is_number:
-            min_x = float(min_x)
-        max_x = Max(*[p[0] for p in points])
-        if max_x.is_number:
-            max_x = float(max_x)
-        min_y = Min(*[p[1] for p in points])
-        if min_y.is_number:
-            min_y = float(min_y)
-        max_y = Max(*[p[1] for p in points])
-        if max_y.is_number:
-            max_y = float(max_y)
+        # numeric vertices use array sdf and a single perimeter curve
+        try:
+            vertices = np.array(points, dtype=float)
+        except TypeError:
+            vertices = None
+        if vertices is not None:
+            curves = [polygon_curve(vertices, parameterization)]
+            sdf = polygon_sdf(vertices)
+            min_x, min_y = np.min(vertices, axis=0).tolist()
+            max_x, max_y = np.max(vertices, axis=0).tolist()
+        else:
+            curves, sdf = _sympy_polygon(points, parameterization)
+
+            # calculate bounds
+            min_x = Min(*[p[0] for p in points])
+            if min_x.is_number:
+                min_x = float(min_x)
+            max_x = Max(*[p[0] for p in points])
+            if max_x.is_number:
+                max_x = float(max_x)
+            min_y = Min(*[p[1] for p in points])
+            if min_y.is_number:
+                min_y = float(min_y)
+            max_y = Max(*[p[1] for p in points])
+            if max_y.is_number:
+                max_y = float(max_y)
         bounds = Bounds(
             {
                 Parameter("x"): (min_x, max_x),
@@ -573,8 +526,78 @@ class Polygon(Geometry):
         # initialize Polygon
         super().__init__(
             curves,
-            _sympy_sdf_to_sdf(sdf),
+            sdf,
             dims=2,
             bounds=bounds,
             parameterization=parameterization,
+            bounded_sdf=True,
+        )
+
+
+def _sympy_polygon(points, parameterization):
+    # curve of every edge and sdf for vertices given as sympy expressions
+    s = Symbol(csg_curve_naming(0))
+    x = Symbol("x")
+    y = Symbol("y")
+
+    # wrap points
+    wrapted_points = points + [points[0]]
+
+    # curves for each side
+    curve_parameterization = Parameterization({s: (0, 1)})
+    curve_parameterization = Parameterization.combine(
+        curve_parameterization, parameterization
+    )
+    curves = []
+    for v1, v2 in zip(wrapted_points[:-1], wrapted_points[1:]):
+        # area
+        dx = v2[0] - v1[0]
+        dy = v2[1] - v1[1]
+        area = (dx**2 + dy**2) ** 0.5
+
+        # generate normals
+        normal_x = dy / area
+        normal_y = -dx / area
+        line = SympyCurve(
+            functions={
+                "x": dx * s + v1[0],
+                "y": dy * s + v1[1],
+                "normal_x": dy / area,
+                "normal_y": -dx / area,
+            },
+            parameterization=curve_parameterization,
+            area=area,
         )
+        curves.append(line)
+
+    # calculate SDF
+    sdfs = [(x - wrapted_points[0][0]) ** 2 + (y - wrapted_points[0][1]) ** 2]
+    conds = []
+    for v1, v2 in zip(wrapted_points[:-1], wrapted_points[1:]):
+        # sdf calculation
+        dx = v1[0] - v2[0]
+        dy = v1[1] - v2[1]
+        px = x - v2[0]
+        py = y - v2[1]
+        d_dot_d = dx**2 + dy**2
+        p_dot_d = px * dx + py * dy
+        max_min = Max(Min(p_dot_d / d_dot_d, 1.0), 0.0)
+        vx = px - dx * max_min
+        vy = py - dy * max_min
+        sdf = vx**2 + vy**2
+        sdfs.append(sdf)
+
+        # winding calculation
+        cond_1 = Heaviside(y - v2[1])
+        cond_2 = Heaviside(v1[1] - y)
+        cond_3 = Heaviside((dx * py) - (dy * px))
+        all_cond = cond_1 * cond_2 * cond_3
+        none_cond = (1.0 - cond_1) * (1.0 - cond_2) * (1.0 - cond_3)
+        cond = 1.0 - 2.0 * Min(all_cond + none_cond, 1.0)
+        conds.append(cond)
+
+    # set inside outside
+    sdf = Min(*sdfs)
+    cond = reduce(mul, conds)
+    sdf = sqrt(sdf) * -cond
+    return curves, _sympy_sdf_to_sdf(sdf)
@@ -345,6 +345,7 @@ class Box(Geometry):
             dims=3,
             bounds=bounds,
             parameterization=parameterization,
+            bounded_sdf=True,
         )
 
 
@@ -642,14 +643,14 @@ class VectorizedBoxes(Geometry):
                 if compute_sdf_derivatives:
                     for i, d in enumerate(["x", "y", "z"]):
                         # compute sdf plus dx/2
-                        plus_xyz = np.copy(xyz)
+                        plus_xyz = xyz.astype(np.float64)
                         plus_xyz[..., i] += dx / 2
                         computed_sdf_plus = VectorizedBoxes._sdf_box(
                             plus_xyz, box_centers, side
                         )
 
                         # compute sdf minus dx/2
-                        minus_xyz = np.copy(xyz)
+                        minus_xyz = xyz.astype(np.float64)
                         minus_xyz[..., i] -= dx / 2
                         computed_sdf_minus = VectorizedBoxes._sdf_box(
                             minus_xyz, box_centers, side
@@ -674,7 +675,12 @@ class VectorizedBoxes(Geometry):
 
         # initialize geometry
         Geometry.__init__(
-            self, curves, _sdf(box_bounds, box_centers, side, dx), bounds=bounds, dims=3
+            self,
+            curves,
+            _sdf(box_bounds, box_centers, side, dx),
+            bounds=bounds,
+            dims=3,
+            bounded_sdf=True,
         )
 
     @staticmethod
@@ -754,6 +760,7 @@ class Sphere(Geometry):
             dims=3,
             bounds=bounds,
             parameterization=parameterization,
+            bounded_sdf=True,
         )
 
 
@@ -853,6 +860,7 @@ class Cylinder(Geometry):
             dims=3,
             bounds=bounds,
             parameterization=parameterization,
+            bounded_sdf=True,
         )
 
 
@@ -943,6 +951,7 @@ class Torus(Geometry):
             dims=3,
             bounds=bounds,
             parameterization=parameterization,
+            bounded_sdf=True,
         )
 
 
@@ -0,0 +1,113 @@
+"""
+Scrambled Halton sequences that continue across sampling calls
+"""
+
+import os
+import numpy as np
+
+
+def _primes(n):
+    # first n prime numbers
+    primes = []
+    candidate = 2
+    while len(primes) < n:
+        if all(candidate % p != 0 for p in primes if p * p <= candidate):
+            primes.append(candidate)
+        candidate += 1
+    return primes
+
+
+class QuasiRandomEngine:
+    """
+    Scrambled Halton sequence engine. Every sampled variable gets its own
+    prime base and a cursor so successive calls continue the sequence instead
+    of restarting at the first point. Variables advanced together, such as
+    the coordinates of one batch, form one multidimensional sequence. Digits
+    are scrambled by random permutations drawn from the NumPy random state
+    on first use in a process so forked data loader workers sample
+    different sequences.
+
+    Parameters
+    ----------
+    max_variables : int
+        Maximum number of variables sampled by this engine.
+    """
+
+    def __init__(self, max_variables: int = 64):
+        self._max_variables = max_variables
+        self._bases = {}  # prime base of every variable
+        self._cursors = {}  # index of next point of every variable
+        self._pid = None
+
+    def sample(self, key: str, nr_points: int) -> np.ndarray:
+        """
+        Samples next `nr_points` points of variable `key` in `[0, 1)`.
+
+        Returns
+        -------
+        points : np.ndarray
+            Array of shape `[nr_points, 1]`.
+        """
+
+        # scrambling is drawn again in forked processes
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._primes = _primes(self._max_variables)
+            self._tables = {}
+
+        # assign base and cursor on first use of variable
+        if key not in self._bases:
+            if len(self._bases) == self._max_variables:
+                raise ValueError(
+                    "Quasirandom engine has more than "
+                    + str(self._max_variables)
+                    + " variables"
+                )
+            self._bases[key] = self._primes[len(self._bases)]
+            self._cursors[key] = 0
+        base = self._bases[key]
+        if base not in self._tables:
+            # digits of double precision numbers
+            nr_digits = int(np.ceil(53 * np.log(2) / np.log(base)))
+            permutations = [np.random.permutation(base) for _ in range(nr_digits)]
+            self._tables[base] = _digit_tables(base, permutations)
+
+        # continue sequence from cursor
+        index = np.arange(
+            self._cursors[key], self._cursors[key] + nr_points, dtype=np.int64
+        )
+        self._cursors[key] += nr_points
+        return _scrambled_radical_inverse(index, *self._tables[base]).reshape(-1, 1)
+
+
+def _digit_tables(base, permutations, max_table_size=4096):
+    # scrambled values of groups of digits so several are mirrored per lookup
+    nr_group_digits = 1
+    while base ** (nr_group_digits + 1) <= max_table_size:
+        nr_group_digits += 1
+    group_base = base**nr_group_digits
+    tables = []
+    for k in range(0, len(permutations), nr_group_digits):
+        rest = np.arange(group_base)
+        table = np.zeros(group_base)
+        for i, permutation in enumerate(permutations[k : k + nr_group_digits]):
+            rest, digit = np.divmod(rest, base)
+            table += permutation[digit] * float(base) ** -(k + i + 1)
+        tables.append(table)
+
+    # value of remaining groups when all their digits are zero
+    tails = [sum(table[0] for table in tables[m:]) for m in range(len(tables) + 1)]
+    return group_base, tables, tails
+
+
+def _scrambled_radical_inverse(index, group_base, tables, tails):
+    # mirror digits of index around decimal point permuting every digit
+    nr_groups = 1
+    while index.shape[0] > 0 and group_base**nr_groups <= index[-1]:
+        nr_groups += 1
+    points = np.zeros(index.shape[0])
+    for table in tables[:nr_groups]:
+        index, group = np.divmod(index, group_base)
+        points += table[group]
+    points += tails[nr_groups]
+    return np.minimum(points, 1.0 - np.finfo(float).eps / 2)
@@ -0,0 +1,206 @@
+"""
+Compiles CSG geometry trees into a flat list of instructions that
+evaluate the SDF without nested closures
+"""
+
+import numpy as np
+import sympy
+
+from modulus.constants import diff_str
+from .helper import _sympy_func_to_func
+
+
+def _compile_value(x):
+    # float values are used directly and sympy values are lambdified
+    if isinstance(x, (float, int)):
+        return x
+    elif isinstance(x, sympy.Basic):
+        return _sympy_func_to_func(x)
+    else:
+        raise TypeError("CSG value of type " + str(type(x)) + " is not supported")
+
+
+def _eval_value(x, params):
+    if isinstance(x, (float, int)):
+        return x
+    return x(params)
+
+
+def _hashable(x):
+    if isinstance(x, (list, tuple)):
+        return tuple(_hashable(v) for v in x)
+    return x
+
+
+def _affine_coords(dims, transform):
+    def affine_coords(invar, params):
+        return transform.transform_points(invar, params, dims, inverse=True)
+
+    return affine_coords
+
+
+def _repeat_coords(dims, spacing, repeat_lower, repeat_higher, center):
+    def repeat_coords(invar, params):
+        clamped_invar = {key: invar[key] for key in dims}
+        if center is not None:
+            for i, key in enumerate(dims):
+                clamped_invar[key] = clamped_invar[key] - center[i]
+        for d, rl, rh in zip(dims, repeat_lower, repeat_higher):
+            clamped_invar[d] = clamped_invar[d] - spacing * np.minimum(
+                np.maximum(np.around(clamped_invar[d] / spacing), rl), rh
+            )
+        if center is not None:
+            for i, key in enumerate(dims):
+                clamped_invar[key] = clamped_invar[key] + center[i]
+        return clamped_invar
+
+    return repeat_coords
+
+
+_coords_transforms = {
+    "affine": _affine_coords,
+    "repeat": _repeat_coords,
+}
+
+
+def compile_sdf_plan(geometry):
+    """
+    Lowers the CSG tree of a geometry into a flat list of instructions.
+    Coordinates are kept in registers, register 0 being the input points,
+    and SDF values on a stack.
+
+    Instructions
+    ------------
+    ("coords", in_register, transform) : compute new coordinate register
+    ("sdf", in_register, sdf) : push SDF of a primitive
+    ("union",), ("subtract",), ("intersect",) : combine top two SDFs
+    ("invert",) : invert top SDF
+    ("scale", x) : multiply top SDF by scale factor
+    """
+
+    plan = []
+    registers = {}  # shared coordinate transforms are only computed once
+
+    def _lower(geometry, in_register):
+        if geometry._csg is None:
+            plan.append(("sdf", in_register, geometry.sdf))
+            return
+        op, children, args = geometry._csg
+        if op in _coords_transforms:
+            key = (op, in_register, _hashable(args))
+            if key not in registers:
+                plan.append(
+                    (
+                        "coords",
+                        in_register,
+                        _coords_transforms[op](geometry.dims, *args),
+                    )
+                )
+                registers[key] = len(registers) + 1
+            _lower(children[0], registers[key])
+            if op == "affine" and args[0].scale != 1:
+                plan.append(("scale", _compile_value(args[0].scale)))
+        else:
+            for child in children:
+                _lower(child, in_register)
+            plan.append((op,))
+
+    _lower(geometry, 0)
+    return plan
+
+
+def plan_to_sdf(plan, dims):
+    """
+    Makes SDF function that runs the compiled plan. Combined SDF values are
+    written in place into buffers owned by the plan so deep trees do not
+    allocate new arrays for every operation.
+    """
+
+    derivative_keys = ["sdf" + diff_str + d for d in dims]
+
+    def sdf(invar, params, compute_sdf_derivatives=False):
+        keys = ["sdf"] + (derivative_keys if compute_sdf_derivatives else [])
+        registers = [invar]
+        stack = []  # (computed sdf, owned by plan)
+        for instruction in plan:
+            op = instruction[0]
+            if op == "coords":
+                _, in_register, transform = instruction
+                registers.append(
+                    {
+                        **registers[in_register],
+                        **transform(registers[in_register], params),
+                    }
+                )
+            elif op == "sdf":
+                _, in_register, primitive_sdf = instruction
+                computed_sdf = primitive_sdf(
+                    registers[in_register], params, compute_sdf_derivatives
+                )
+                stack.append(({key: computed_sdf[key] for key in keys}, False))
+            elif op == "invert":
+                computed_sdf, owned = stack.pop()
+                for key in keys:
+                    computed_sdf[key] = _negative(computed_sdf[key], owned)
+                stack.append((computed_sdf, True))
+            elif op == "scale":
+                computed_sdf, owned = stack.pop()
+                x = _eval_value(instruction[1], params)
+                if owned and _can_write(computed_sdf["sdf"], x):
+                    computed_sdf["sdf"] *= x
+                else:
+                    computed_sdf["sdf"] = computed_sdf["sdf"] * x
+                stack.append((computed_sdf, owned))
+            else:
+                right = stack.pop()
+                left = stack.pop()
+                stack.append(_combine(op, left, right, keys))
+        return stack.pop()[0]
+
+    return sdf
+
+
+def _can_write(a, b):
+    # a can hold the result of a binary operation with b in place
+    return a.dtype == np.result_type(a, b) and a.shape == np.broadcast(a, b).shape
+
+
+def _negative(a, owned):
+    if owned:
+        return np.negative(a, out=a)
+    return -a
+
+
+def _combine(op, left, right, keys):
+    (sdf_1, owned_1), (sdf_2, owned_2) = left, right
+
+    # subtraction combines with inverted right sdf
+    if op == "subtract":
+        sdf_2 = {key: _negative(value, owned_2) for key, value in sdf_2.items()}
+        owned_2 = True
+
+    # points where left sdf derivatives are kept
+    if op == "union":
+        keep_1 = sdf_1["sdf"] > sdf_2["sdf"]
+        combine_fn = np.maximum
+    else:
+        keep_1 = sdf_1["sdf"] < sdf_2["sdf"]
+        combine_fn = np.minimum
+
+    # combine in place when buffers are owned by plan
+    computed_sdf = {}
+    if owned_1 and _can_write(sdf_1["sdf"], sdf_2["sdf"]):
+        computed_sdf["sdf"] = combine_fn(sdf_1["sdf"], sdf_2["sdf"], out=sdf_1["sdf"])
+    else:
+        computed_sdf["sdf"] = combine_fn(sdf_1["sdf"], sdf_2["sdf"])
+    for key in keys[1:]:
+        if (
+            owned_1
+            and _can_write(sdf_1[key], sdf_2[key])
+            and _can_write(sdf_1[key], keep_1)
+        ):
+            np.copyto(sdf_1[key], sdf_2[key], where=np.logical_not(keep_1))
+            computed_sdf[key] = sdf_1[key]
+        else:
+            computed_sdf[key] = np.where(keep_1, sdf_1[key], sdf_2[key])
+    return computed_sdf, True
@@ -2,8 +2,11 @@
 Defines base class for all mesh type geometries
 """
 
+import os
 import numpy as np
 import csv
+from concurrent.futures import ThreadPoolExecutor
+from scipy.spatial import cKDTree
 from stl import mesh as np_mesh
 from sympy import Symbol
 
@@ -11,9 +14,10 @@ try:
     import pysdf.sdf as pysdf
 except:
     print(
-        "Error importing pysdf. Make sure 'libsdf.so' is in LD_LIBRARY_PATH and pysdf is installed"
+        "Error importing pysdf. Make sure 'libsdf.so' is in LD_LIBRARY_PATH and pysdf is installed. "
+        + "Falling back to NumPy signed distance computation for Tessellation."
     )
-    raise
+    pysdf = None
 
 from .geometry import Geometry
 from .parameterization import Parameterization, Bounds, Parameter
@@ -40,62 +44,41 @@ class Tessellation(Geometry):
 
         # make curves
         def _sample(mesh):
+            # compute triangle areas, unit normals and cumulative area table once
+            triangle_areas = _area_of_triangles(mesh.v0, mesh.v1, mesh.v2)
+            triangle_normals = mesh.normals / np.linalg.norm(
+                mesh.normals, axis=1, keepdims=True
+            )
+            cumulative_areas = np.cumsum(triangle_areas)
+            total_area = cumulative_areas[-1]
+
             def sample(
                 nr_points, parameterization=Parameterization(), quasirandom=False
             ):
-                # compute required points on per triangle
-                triangle_areas = _area_of_triangles(mesh.v0, mesh.v1, mesh.v2)
-                triangle_probabilities = triangle_areas / np.linalg.norm(
-                    triangle_areas, ord=1
-                )
-                triangle_index = np.arange(triangle_probabilities.shape[0])
-                points_per_triangle = np.random.choice(
-                    triangle_index, nr_points, p=triangle_probabilities
-                )
-                points_per_triangle, _ = np.histogram(
-                    points_per_triangle,
-                    np.arange(triangle_probabilities.shape[0] + 1) - 0.5,
+                # pick triangle for every point with probability proportional to area
+                triangle_index = np.searchsorted(
+                    cumulative_areas,
+                    np.random.uniform(0, total_area, size=nr_points),
+                    side="right",
                 )
+                triangle_index = np.minimum(triangle_index, len(triangle_areas) - 1)
 
-                # go through every triangle and sample it
+                # sample all triangles in one batch
+                x, y, z = _sample_triangle(
+                    mesh.v0[triangle_index],
+                    mesh.v1[triangle_index],
+                    mesh.v2[triangle_index],
+                    nr_points,
+                )
                 invar = {
-                    "x": [],
-                    "y": [],
-                    "z": [],
-                    "normal_x": [],
-                    "normal_y": [],
-                    "normal_z": [],
-                    "area": [],
+                    "x": x,
+                    "y": y,
+                    "z": z,
+                    "normal_x": triangle_normals[triangle_index, 0:1],
+                    "normal_y": triangle_normals[triangle_index, 1:2],
+                    "normal_z": triangle_normals[triangle_index, 2:3],
+                    "area": np.full(x.shape, total_area / nr_points),
                 }
-                for index, nr_p in enumerate(
-                    points_per_triangle
-                ):  # TODO can be more efficent
-                    x, y, z = _sample_triangle(
-                        mesh.v0[index], mesh.v1[index], mesh.v2[index], nr_p
-                    )
-                    invar["x"].append(x)
-                    invar["y"].append(y)
-                    invar["z"].append(z)
-                    normal_scale = np.linalg.norm(mesh.normals[index])
-                    invar["normal_x"].append(
-                        np.full(x.shape, mesh.normals[index, 0]) / normal_scale
-                    )
-                    invar["normal_y"].append(
-                        np.full(x.shape, mesh.normals[index, 1]) / normal_scale
-                    )
-                    invar["normal_z"].append(
-                        np.full(x.shape, mesh.normals[index, 2]) / normal_scale
-                    )
-                    invar["area"].append(
-                        np.full(x.shape, triangle_areas[index] / x.shape[0])
-                    )
-                invar["x"] = np.concatenate(invar["x"], axis=0)
-                invar["y"] = np.concatenate(invar["y"], axis=0)
-                invar["z"] = np.concatenate(invar["z"], axis=0)
-                invar["normal_x"] = np.concatenate(invar["normal_x"], axis=0)
-                invar["normal_y"] = np.concatenate(invar["normal_y"], axis=0)
-                invar["normal_z"] = np.concatenate(invar["normal_z"], axis=0)
-                invar["area"] = np.concatenate(invar["area"], axis=0)
 
                 # sample from the param ranges
                 params = parameterization.sample(nr_points, quasirandom=quasirandom)
@@ -103,49 +86,40 @@ class Tessellation(Geometry):
 
             return sample
 
-        curves = [Curve(_sample(mesh), dims=3, parameterization=parameterization)]
+        curves = [
+            Curve(
+                _sample(mesh),
+                dims=3,
+                parameterization=parameterization,
+                area=float(np.sum(_area_of_triangles(mesh.v0, mesh.v1, mesh.v2))),
+            )
+        ]
 
         # make sdf function
-        def _sdf(triangles, airtight):
+        def _sdf(mesh_sdf, airtight):
             def sdf(invar, params, compute_sdf_derivatives=False):
                 # gather points
-                points = np.stack([invar["x"], invar["y"], invar["z"]], axis=1)
-
-                # normalize triangles and points
-                minx, maxx, miny, maxy, minz, maxz = _find_mins_maxs(points)
-                max_dis = max(max((maxx - minx), (maxy - miny)), (maxz - minz))
-                store_triangles = np.array(triangles, dtype=np.float64)
-                store_triangles[:, :, 0] -= minx
-                store_triangles[:, :, 1] -= miny
-                store_triangles[:, :, 2] -= minz
-                store_triangles *= 1 / max_dis
-                store_triangles = store_triangles.flatten()
-                points[:, 0] -= minx
-                points[:, 1] -= miny
-                points[:, 2] -= minz
-                points *= 1 / max_dis
-                points = points.astype(np.float64).flatten()
+                points = np.concatenate([invar["x"], invar["y"], invar["z"]], axis=1)
+
+                # distances are computed in float64 and returned in dtype of points
+                dtype = np.result_type(points, np.float32)
 
                 # compute sdf values
                 outputs = {}
                 if airtight:
-                    sdf_field, sdf_derivative = pysdf.signed_distance_field(
-                        store_triangles, points, include_hit_points=True
-                    )
-                    sdf_field = -np.expand_dims(max_dis * sdf_field, axis=1)
+                    distance, hit_points = mesh_sdf.signed_distance(points)
+                    sdf_field = -np.expand_dims(distance, axis=1)
                 else:
                     sdf_field = np.zeros_like(invar["x"])
-                outputs["sdf"] = sdf_field
+                outputs["sdf"] = sdf_field.astype(dtype, copy=False)
 
                 # get sdf derivatives
                 if compute_sdf_derivatives:
-                    sdf_derivative = -(sdf_derivative - points)
-                    sdf_derivative = np.reshape(
-                        sdf_derivative, (sdf_derivative.shape[0] // 3, 3)
-                    )
+                    sdf_derivative = -(hit_points - points)
                     sdf_derivative = sdf_derivative / np.linalg.norm(
                         sdf_derivative, axis=1, keepdims=True
                     )
+                    sdf_derivative = sdf_derivative.astype(dtype, copy=False)
                     outputs["sdf" + diff_str + "x"] = sdf_derivative[:, 0:1]
                     outputs["sdf" + diff_str + "y"] = sdf_derivative[:, 1:2]
                     outputs["sdf" + diff_str + "z"] = sdf_derivative[:, 2:3]
@@ -176,10 +150,11 @@ class Tessellation(Geometry):
         # initialize geometry
         super(Tessellation, self).__init__(
             curves,
-            _sdf(mesh.vectors, airtight),
+            _sdf(_TriangleMeshSDF(mesh.vectors), airtight),
             dims=3,
             bounds=bounds,
             parameterization=parameterization,
+            bounded_sdf=airtight,
         )
 
     @classmethod
@@ -206,16 +181,183 @@ class Tessellation(Geometry):
         return cls(mesh, airtight, parameterization)
 
 
-# helper for sampling triangle
+class _TriangleMeshSDF:
+    """
+    Signed distance to a triangle mesh that is built once and reused for
+    every query. Triangles are stored in the fixed normalized frame of the
+    mesh bounds. If pysdf is available it is used for the queries, otherwise
+    a NumPy fallback that searches the nearest triangles with a k-d tree
+    over triangle centroids is used.
+
+    Parameters
+    ----------
+    triangles : np.ndarray (T, 3, 3)
+        Vertices of every triangle in the mesh.
+    chunk_size : int
+        Number of query points handled by each thread of the NumPy fallback.
+    nr_neighbors : int
+        Initial number of nearest triangles checked by the NumPy fallback.
+    """
+
+    def __init__(self, triangles, chunk_size=4096, nr_neighbors=16):
+        # normalize triangles with mesh bounds
+        triangles = np.array(triangles, dtype=np.float64)
+        vertices = triangles.reshape(-1, 3)
+        self.offset = np.min(vertices, axis=0)
+        self.scale = float(np.max(np.max(vertices, axis=0) - self.offset))
+        if self.scale == 0.0:
+            self.scale = 1.0
+        self.triangles = (triangles - self.offset) / self.scale
+        self.flat_triangles = self.triangles.flatten()
+
+        # acceleration structure for NumPy fallback, built on first query
+        self.chunk_size = chunk_size
+        self.nr_neighbors = nr_neighbors
+        self._tree = None
+
+    def signed_distance(self, points):
+        """
+        Computes signed distance, positive outside of the mesh, and
+        closest point on the mesh for array of points (N, 3).
+        """
+
+        points = (np.asarray(points, dtype=np.float64) - self.offset) / self.scale
+        if pysdf is not None:
+            distance, hit_points = pysdf.signed_distance_field(
+                self.flat_triangles, points.flatten(), include_hit_points=True
+            )
+            hit_points = np.reshape(hit_points, (-1, 3))
+        else:
+            distance, hit_points = self._numpy_signed_distance(points)
+        return self.scale * distance, self.scale * hit_points + self.offset
+
+    def _build(self):
+        # bounding spheres around triangle centroids
+        centroids = np.mean(self.triangles, axis=1)
+        radius = np.max(
+            np.linalg.norm(self.triangles - centroids[:, None, :], axis=2), axis=1
+        )
+
+        # large triangles are checked against every point and the rest are
+        # searched through the tree so the distance bound stays tight
+        large = radius > 4.0 * np.median(radius)
+        if np.sum(large) > 64:
+            large = radius >= np.sort(radius)[-64]
+        if np.all(large):
+            large[:] = False
+        self._large_index = np.where(large)[0]
+        self._small_index = np.where(~large)[0]
+        self._small_radius = float(np.max(radius[self._small_index]))
+        self._tree = cKDTree(centroids[self._small_index])
+
+        # angle weighted pseudo normals of faces, vertices and edges for sign
+        self._pseudo_normals = _pseudo_normals(self.triangles)
+
+    def _numpy_signed_distance(self, points):
+        if self._tree is None:
+            self._build()
+
+        # split points into chunks and compute them in parallel
+        chunks = [
+            points[i : i + self.chunk_size]
+            for i in range(0, points.shape[0], self.chunk_size)
+        ]
+        if len(chunks) <= 1:
+            results = [self._signed_distance_chunk(c) for c in chunks]
+        else:
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+                results = list(executor.map(self._signed_distance_chunk, chunks))
+        if len(results) == 0:
+            return np.zeros((0,)), np.zeros((0, 3))
+        distance = np.concatenate([r[0] for r in results], axis=0)
+        hit_points = np.concatenate([r[1] for r in results], axis=0)
+        return distance, hit_points
+
+    def _signed_distance_chunk(self, points, max_pairs=2**18):
+        nr_points = points.shape[0]
+        best_distance = np.full(nr_points, np.inf)
+        best_point = np.zeros((nr_points, 3))
+        best_triangle = np.zeros(nr_points, dtype=np.int64)
+        best_feature = np.zeros(nr_points, dtype=np.int64)
+
+        def update(point_index, triangle_index):
+            # exact distance for every point triangle pair, in memory bounded blocks
+            for i in range(0, point_index.shape[0], max_pairs):
+                p_index = point_index[i : i + max_pairs]
+                t_index = triangle_index[i : i + max_pairs]
+                p = points[p_index]
+                closest, feature = _closest_point_on_triangles(
+                    p, self.triangles[t_index]
+                )
+                distance = np.linalg.norm(p - closest, axis=1)
+
+                # closest pair for every point
+                order = np.lexsort((distance, p_index))
+                first = np.ones(order.shape[0], dtype=bool)
+                first[1:] = p_index[order[1:]] != p_index[order[:-1]]
+                pair = order[first]
+
+                # keep if closer then current closest triangle
+                pair = pair[distance[pair] < best_distance[p_index[pair]]]
+                index = p_index[pair]
+                best_distance[index] = distance[pair]
+                best_point[index] = closest[pair]
+                best_triangle[index] = t_index[pair]
+                best_feature[index] = feature[pair]
+
+        # large triangles are checked for every point
+        nr_large = self._large_index.shape[0]
+        if nr_large > 0:
+            update(
+                np.repeat(np.arange(nr_points), nr_large),
+                np.tile(self._large_index, nr_points),
+            )
+
+        # nearest triangles give upper bound on distance
+        nr_small = self._small_index.shape[0]
+        k = min(self.nr_neighbors, nr_small)
+        centroid_distance, neighbors = self._tree.query(points, k=k)
+        centroid_distance = np.reshape(centroid_distance, (nr_points, k))
+        neighbors = np.reshape(neighbors, (nr_points, k))
+        update(
+            np.repeat(np.arange(nr_points), k), self._small_index[neighbors.flatten()]
+        )
+
+        # unchecked triangles are at least this far away, search any that could be closer
+        if k < nr_small:
+            lower_bound = centroid_distance[:, -1] - self._small_radius
+            index = np.where(best_distance > lower_bound)[0]
+            for i in range(0, index.shape[0], 256):
+                batch = index[i : i + 256]
+                candidates = self._tree.query_ball_point(
+                    points[batch],
+                    best_distance[batch] + self._small_radius,
+                    return_sorted=False,
+                )
+                lengths = np.array([len(c) for c in candidates])
+                if np.sum(lengths) == 0:
+                    continue
+                update(
+                    np.repeat(batch, lengths),
+                    self._small_index[np.concatenate(candidates).astype(np.int64)],
+                )
+
+        # sign from pseudo normal of closest feature
+        normals = self._pseudo_normals[best_triangle, best_feature]
+        sign = np.where(np.sum((points - best_point) * normals, axis=1) < 0, -1.0, 1.0)
+        return sign * best_distance, best_point
+
+
+# helper for sampling batch of triangles, vertices given as arrays (N, 3)
 def _sample_triangle(
     v0, v1, v2, nr_points
 ):  # ref https://math.stackexchange.com/questions/18686/uniform-random-point-in-triangle
     r1 = np.random.uniform(0, 1, size=(nr_points, 1))
     r2 = np.random.uniform(0, 1, size=(nr_points, 1))
     s1 = np.sqrt(r1)
-    x = v0[0] * (1.0 - s1) + v1[0] * (1.0 - r2) * s1 + v2[0] * r2 * s1
-    y = v0[1] * (1.0 - s1) + v1[1] * (1.0 - r2) * s1 + v2[1] * r2 * s1
-    z = v0[2] * (1.0 - s1) + v1[2] * (1.0 - r2) * s1 + v2[2] * r2 * s1
+    x = v0[:, 0:1] * (1.0 - s1) + v1[:, 0:1] * (1.0 - r2) * s1 + v2[:, 0:1] * r2 * s1
+    y = v0[:, 1:2] * (1.0 - s1) + v1[:, 1:2] * (1.0 - r2) * s1 + v2[:, 1:2] * r2 * s1
+    z = v0[:, 2:3] * (1.0 - s1) + v1[:, 2:3] * (1.0 - r2) * s1 + v2[:, 2:3] * r2 * s1
     return x, y, z
 
 
@@ -246,12 +388,113 @@ def _area_of_triangles(
     return area
 
 
-# helper for min max
-def _find_mins_maxs(points):
-    minx = float(np.min(points[:, 0]))
-    miny = float(np.min(points[:, 1]))
-    minz = float(np.min(points[:, 2]))
-    maxx = float(np.max(points[:, 0]))
-    maxy = float(np.max(points[:, 1]))
-    maxz = float(np.max(points[:, 2]))
-    return minx, maxx, miny, maxy, minz, maxz
+# closest point on array of triangles (N, 3, 3) to array of points (N, 3)
+def _closest_point_on_triangles(
+    p, triangles
+):  # ref Ericson, Real-Time Collision Detection, section 5.1.5
+    # features: 0 face, 1-3 vertices a b c, 4-6 edges ab bc ca
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    ab = b - a
+    ac = c - a
+    ap = p - a
+    bp = p - b
+    cp = p - c
+    d1 = np.sum(ab * ap, axis=1)
+    d2 = np.sum(ac * ap, axis=1)
+    d3 = np.sum(ab * bp, axis=1)
+    d4 = np.sum(ac * bp, axis=1)
+    d5 = np.sum(ab * cp, axis=1)
+    d6 = np.sum(ac * cp, axis=1)
+    va = d3 * d6 - d5 * d4
+    vb = d5 * d2 - d1 * d6
+    vc = d1 * d4 - d3 * d2
+
+    # closest point in every voronoi region, invalid values only occur in regions
+    # that are not selected or for degenerate triangles which are never closest
+    with np.errstate(divide="ignore", invalid="ignore"):
+        v_ab = d1 / (d1 - d3)
+        w_ac = d2 / (d2 - d6)
+        w_bc = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+        denom = 1.0 / (va + vb + vc)
+        v_face = vb * denom
+        w_face = vc * denom
+
+        # find region of closest point, earlier regions take priority
+        regions = [
+            (d1 <= 0) & (d2 <= 0),
+            (d3 >= 0) & (d4 <= d3),
+            (d6 >= 0) & (d5 <= d6),
+            (vc <= 0) & (d1 >= 0) & (d3 <= 0),
+            (va <= 0) & ((d4 - d3) >= 0) & ((d5 - d6) >= 0),
+            (vb <= 0) & (d2 >= 0) & (d6 <= 0),
+        ]
+        feature = np.select(regions, [1, 2, 3, 4, 5, 6], default=0)
+        closest = np.select(
+            [r[:, None] for r in regions],
+            [
+                a,
+                b,
+                c,
+                a + v_ab[:, None] * ab,
+                b + w_bc[:, None] * (c - b),
+                a + w_ac[:, None] * ac,
+            ],
+            default=a + v_face[:, None] * ab + w_face[:, None] * ac,
+        )
+    return closest, feature
+
+
+# angle weighted pseudo normals for every feature of triangles (T, 7, 3)
+def _pseudo_normals(
+    triangles,
+):  # ref Baerentzen and Aanaes, Signed distance computation using the angle weighted pseudonormal
+    nr_triangles = triangles.shape[0]
+
+    # face normals, flipped if mesh is oriented inward
+    face_normals = np.cross(
+        triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0]
+    )
+    if np.sum(triangles[:, 0] * face_normals) < 0:
+        face_normals = -face_normals
+    face_normals = face_normals / np.maximum(
+        np.linalg.norm(face_normals, axis=1, keepdims=True), 1e-30
+    )
+
+    # weld vertices shared between triangles
+    _, vertex_index = np.unique(triangles.reshape(-1, 3), axis=0, return_inverse=True)
+    vertex_index = vertex_index.reshape(nr_triangles, 3)
+
+    # vertex pseudo normals weighted by incident angle
+    vertex_normals = np.zeros((np.max(vertex_index) + 1, 3))
+    for i in range(3):
+        e1 = triangles[:, (i + 1) % 3] - triangles[:, i]
+        e2 = triangles[:, (i + 2) % 3] - triangles[:, i]
+        cos_angle = np.sum(e1 * e2, axis=1) / np.maximum(
+            np.linalg.norm(e1, axis=1) * np.linalg.norm(e2, axis=1), 1e-30
+        )
+        angle = np.arccos(np.clip(cos_angle, -1.0, 1.0))
+        np.add.at(vertex_normals, vertex_index[:, i], angle[:, None] * face_normals)
+
+    # edge pseudo normals from sum of adjacent faces
+    edges = np.concatenate(
+        [vertex_index[:, [0, 1]], vertex_index[:, [1, 2]], vertex_index[:, [2, 0]]],
+        axis=0,
+    )
+    _, edge_index = np.unique(np.sort(edges, axis=1), axis=0, return_inverse=True)
+    edge_index = edge_index.reshape(-1)
+    edge_normals = np.zeros((np.max(edge_index) + 1, 3))
+    np.add.at(edge_normals, edge_index, np.tile(face_normals, (3, 1)))
+    edge_index = edge_index.reshape(3, nr_triangles).T
+
+    return np.stack(
+        [
+            face_normals,
+            vertex_normals[vertex_index[:, 0]],
+            vertex_normals[vertex_index[:, 1]],
+            vertex_normals[vertex_index[:, 2]],
+            edge_normals[edge_index[:, 0]],
+            edge_normals[edge_index[:, 1]],
+            edge_normals[edge_index[:, 2]],
+        ],
+        axis=1,
+    )
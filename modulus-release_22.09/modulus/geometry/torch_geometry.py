@@ -0,0 +1,532 @@
+"""
+Defines a torch backend of geometries so points are sampled on the
+training device
+"""
+
+import numpy as np
+import sympy
+import torch
+from collections import OrderedDict
+from typing import Callable, Union
+
+from modulus.constants import diff_str, tf_dt
+from .geometry import Geometry, _parameterization_key
+from .parameterization import Parameterization, Bounds, _sample_ranges_torch
+from .helper import (
+    _sympy_sdf_to_torch_sdf,
+    _sympy_criteria_to_torch_criteria,
+    _rejection_sample_torch,
+)
+
+
+class TorchGeometry:
+    """
+    Samples a geometry with torch. SDFs of primitives given by sympy
+    expressions or polygon vertices and the CSG operations, affine
+    transforms and repetitions combining them are evaluated with torch, and
+    curves are sampled with torch, so `sample_boundary` and
+    `sample_interior` return tensors on `device` without copies from the
+    host. Other SDFs and curves are evaluated with numpy and copied. Points are sampled in float64
+    like the numpy backend and converted to `dtype` when returned.
+
+    Parameters
+    ----------
+    geometry : Geometry
+        Geometry that is sampled.
+    device : Union[torch.device, str, None]
+        Device of sampled tensors. Default is the cpu.
+    dtype : torch.dtype
+        Type of sampled tensors. Default is `modulus.constants.tf_dt`.
+    """
+
+    def __init__(self, geometry: Geometry, device=None, dtype=tf_dt):
+        self.geometry = geometry
+        self.device = torch.device("cpu") if device is None else torch.device(device)
+        self.dtype = dtype
+        self.sdf = _torch_sdf(geometry)
+
+        # estimated curve areas used by sample_boundary
+        self._area_cache = OrderedDict()
+
+    @property
+    def dims(self):
+        return self.geometry.dims
+
+    @property
+    def bounds(self):
+        return self.geometry.bounds
+
+    @property
+    def parameterization(self):
+        return self.geometry.parameterization
+
+    def boundary_criteria(self, invar, criteria=None, params={}):
+        # check if moving in or out of normal direction changes SDF, both
+        # probes are evaluated in one call
+        nr_points = invar[self.dims[0]].shape[0]
+        epsilon = self.geometry.interior_epsilon
+        probe_invar = {
+            key: torch.cat(
+                [
+                    invar[key] + epsilon * invar["normal_" + key],
+                    invar[key] - epsilon * invar["normal_" + key],
+                ],
+                dim=0,
+            )
+            for key in self.dims
+        }
+        probe_params = {
+            key: torch.cat([value, value], dim=0)
+            if isinstance(value, torch.Tensor)
+            and value.ndim > 0
+            and value.shape[0] == nr_points
+            else value
+            for key, value in params.items()
+        }
+        probe_sign = torch.sign(self.sdf(probe_invar, probe_params, False)["sdf"])
+        on_boundary = probe_sign[:nr_points] * probe_sign[nr_points:] <= 0
+
+        # check if points satisfy the criteria function
+        if criteria is not None:
+            on_boundary = torch.logical_and(on_boundary, criteria(invar, params).bool())
+        return on_boundary
+
+    def sample_boundary(
+        self,
+        nr_points: int,
+        criteria: Union[sympy.Basic, None] = None,
+        parameterization: Union[Parameterization, None] = None,
+        quasirandom: bool = False,
+    ):
+        """
+        Same as `Geometry.sample_boundary` returning tensors on `device`.
+        Callable criteria are evaluated on tensors. Quasirandom sampling
+        is not supported.
+        """
+
+        if quasirandom:
+            raise NotImplementedError(
+                "Quasirandom sampling is not supported with torch"
+            )
+
+        # compile criteria from sympy if needed
+        criteria_key = criteria
+        criteria = _convert_criteria(criteria)
+
+        # use internal parameterization if not given
+        if parameterization is None:
+            parameterization = self.geometry.parameterization
+        elif isinstance(parameterization, dict):
+            parameterization = Parameterization(parameterization)
+
+        def boundary_criteria(invar, params):
+            return self.boundary_criteria(invar, criteria=criteria, params=params)
+
+        # compute required points on each curve
+        curves = self.geometry.curves
+        curve_areas = np.array(
+            [
+                self._curve_area(curve, parameterization, criteria_key, criteria)
+                for curve in curves
+            ]
+        )
+        assert np.sum(curve_areas) > 0, "Geometry has no surface"
+        curve_probabilities = curve_areas / np.linalg.norm(curve_areas, ord=1)
+        points_per_curve = np.random.choice(
+            np.arange(len(curves)), nr_points, p=curve_probabilities
+        )
+        points_per_curve, _ = np.histogram(
+            points_per_curve, np.arange(len(curves) + 1) - 0.5
+        )
+
+        # sample curves checking points of all curves in one call per pass
+        list_invar, list_params = _sample_curves(
+            curves,
+            points_per_curve,
+            boundary_criteria,
+            parameterization,
+            self.device,
+        )
+        for i, (n, a) in enumerate(zip(points_per_curve, curve_areas)):
+            if n > 0:
+                list_invar[i]["area"] = torch.full_like(list_invar[i]["area"], a / n)
+        invar = _concat_tensor_dict_list([i for i in list_invar if i is not None])
+        invar.update(
+            _concat_tensor_dict_list([p for p in list_params if p is not None])
+        )
+        return {key: value.to(self.dtype) for key, value in invar.items()}
+
+    def _curve_area(self, curve, parameterization, criteria_key, criteria):
+        # curves of primitives are exactly their boundary
+        if (
+            criteria_key is None
+            and curve.area is not None
+            and self.geometry._primitive_curves()
+        ):
+            return curve.area
+
+        # reuse estimated area of curve with same parameterization and criteria
+        try:
+            key = (curve, _parameterization_key(parameterization), criteria_key)
+            area = self._area_cache.get(key)
+        except TypeError:  # unhashable parameterization or criteria
+            key, area = None, None
+        if area is None:
+            s, p = _curve_torch_sample(curve, 10000, parameterization, self.device)
+            on_boundary = self.boundary_criteria(s, criteria=criteria, params=p)
+            area = float(torch.sum(s["area"][on_boundary[:, 0]]))
+            if key is not None:
+                self._area_cache[key] = area
+                if len(self._area_cache) > self.geometry.area_cache_size:
+                    self._area_cache.popitem(last=False)
+        else:
+            self._area_cache.move_to_end(key)
+        return area
+
+    def sample_interior(
+        self,
+        nr_points: int,
+        bounds: Union[Bounds, None] = None,
+        criteria: Union[sympy.Basic, None] = None,
+        parameterization: Union[Parameterization, None] = None,
+        compute_sdf_derivatives: bool = False,
+        quasirandom: bool = False,
+    ):
+        """
+        Same as `Geometry.sample_interior` returning tensors on `device`.
+        Callable criteria are evaluated on tensors. Quasirandom sampling
+        is not supported.
+        """
+
+        if quasirandom:
+            raise NotImplementedError(
+                "Quasirandom sampling is not supported with torch"
+            )
+
+        # sdf derivatives are only computed for accepted points if not in criteria
+        defer_sdf_derivatives = compute_sdf_derivatives and (
+            criteria is None
+            or (
+                isinstance(criteria, sympy.Basic)
+                and not any(diff_str in str(x) for x in criteria.free_symbols)
+            )
+        )
+
+        # compile criteria from sympy if needed
+        criteria = _convert_criteria(criteria)
+
+        # use internal bounds if not given
+        if bounds is None:
+            bounds = self.geometry.bounds
+        elif isinstance(bounds, dict):
+            bounds = Bounds(bounds)
+
+        # use internal parameterization if not given
+        if parameterization is None:
+            parameterization = self.geometry.parameterization
+        elif isinstance(parameterization, dict):
+            parameterization = Parameterization(parameterization)
+        bound_ranges = bounds._compute_bounds(parameterization)
+
+        # sample candidates and keep points inside domain
+        def _sample(nr_candidates):
+            local_invar = {
+                str(key): value
+                for key, value in _sample_ranges_torch(
+                    nr_candidates, bound_ranges, self.device
+                ).items()
+            }
+            local_params = parameterization.sample_torch(nr_candidates, self.device)
+
+            # evaluate SDF function on points
+            local_invar.update(
+                self.sdf(
+                    local_invar,
+                    local_params,
+                    compute_sdf_derivatives=compute_sdf_derivatives
+                    and not defer_sdf_derivatives,
+                )
+            )
+
+            # remove points outside of domain
+            criteria_index = local_invar["sdf"] > 0
+            if criteria is not None:
+                criteria_index = torch.logical_and(
+                    criteria_index, criteria(local_invar, local_params).bool()
+                )
+            return [local_invar, local_params], criteria_index[:, 0]
+
+        (invar, params), total_sampled, total_tried = _rejection_sample_torch(
+            _sample,
+            nr_points,
+            max_nr_try=100,
+            error_message="Could not sample interior of geometry. Check to make sure non-zero volume",
+        )
+        if defer_sdf_derivatives:
+            invar.update(self.sdf(invar, params, compute_sdf_derivatives=True))
+
+        # compute area value for monte carlo integration
+        volume = (total_sampled / total_tried) * bounds.volume(parameterization)
+        invar["area"] = torch.full_like(invar["sdf"], volume / nr_points)
+
+        # add params to invar
+        invar.update(params)
+        return {key: value.to(self.dtype) for key, value in invar.items()}
+
+
+def _convert_criteria(criteria):
+    if criteria is None or isinstance(criteria, sympy.Basic):
+        return None if criteria is None else _sympy_criteria_to_torch_criteria(criteria)
+    if isinstance(criteria, Callable):
+        return criteria
+    raise TypeError("criteria type is not supported: " + str(type(criteria)))
+
+
+def _sample_curves(
+    curves, points_per_curve, criteria, parameterization, device, max_nr_try=1000
+):
+    """
+    Samples `points_per_curve` points on every curve that satisfy
+    `criteria`. Candidates of all curves are stacked so criteria is
+    evaluated once per pass. Returns lists of dictionaries of points and
+    parameters of every curve, None for curves without points.
+    """
+
+    nr_curves = len(curves)
+    list_invar, list_params = [None] * nr_curves, [None] * nr_curves
+    stored = [[] for _ in range(nr_curves)]
+    nr_stored = np.zeros(nr_curves, dtype=np.int64)
+    nr_accepted = np.zeros(nr_curves, dtype=np.int64)
+    nr_tried = np.zeros(nr_curves, dtype=np.int64)
+    nr_candidates = np.array(points_per_curve, dtype=np.int64)
+    nr_try = 0
+    while np.any(nr_stored < points_per_curve):
+        index = np.flatnonzero(nr_stored < points_per_curve)
+        samples = [
+            _curve_torch_sample(
+                curves[i], int(nr_candidates[i]), parameterization, device
+            )
+            for i in index
+        ]
+        accepted = criteria(
+            _concat_tensor_dict_list([s[0] for s in samples]),
+            _concat_tensor_dict_list([s[1] for s in samples]),
+        )[:, 0]
+        nr_try += 1
+
+        # store accepted points of every curve
+        for i, sample, curve_accepted in zip(
+            index, samples, torch.split(accepted, list(nr_candidates[index]))
+        ):
+            accepted_index = torch.nonzero(curve_accepted)[:, 0]
+            nr_accepted[i] += accepted_index.shape[0]
+            nr_tried[i] += nr_candidates[i]
+            accepted_index = accepted_index[: points_per_curve[i] - nr_stored[i]]
+            stored[i].append(
+                [{k: v[accepted_index] for k, v in d.items()} for d in sample]
+            )
+            nr_stored[i] += accepted_index.shape[0]
+
+        # report error if could not sample
+        if nr_try > max_nr_try and np.any(nr_accepted[index] < 1):
+            raise RuntimeError("Unable to sample curve")
+
+        # oversample remaining points by the estimated acceptance rate
+        remaining = points_per_curve - nr_stored
+        nr_candidates = np.where(
+            nr_accepted > 0,
+            np.ceil(1.1 * remaining * nr_tried / np.maximum(nr_accepted, 1)),
+            2 * nr_candidates,
+        ).astype(np.int64)
+        nr_candidates = np.clip(nr_candidates, 1, 4 * np.maximum(points_per_curve, 1))
+
+    # concatenate points of every curve
+    for i in range(nr_curves):
+        if points_per_curve[i] > 0:
+            list_invar[i] = _concat_tensor_dict_list([s[0] for s in stored[i]])
+            list_params[i] = _concat_tensor_dict_list([s[1] for s in stored[i]])
+    return list_invar, list_params
+
+
+def _curve_torch_sample(curve, nr_points, parameterization, device):
+    # curves without torch sampling are sampled with numpy and copied
+    if curve._torch_sample is not None:
+        return curve._torch_sample(nr_points, parameterization, device)
+    return tuple(
+        {
+            key: torch.as_tensor(value, dtype=torch.float64, device=device)
+            for key, value in values.items()
+        }
+        for values in curve._sample(nr_points, parameterization, False)
+    )
+
+
+def _concat_tensor_dict_list(tensor_dict_list):
+    return {
+        key: torch.cat([x[key] for x in tensor_dict_list], dim=0)
+        for key in tensor_dict_list[0].keys()
+    }
+
+
+def _torch_sdf(geometry):
+    # primitives are defined by sympy sdfs or polygon vertices, other sdfs
+    # are evaluated with numpy
+    if geometry._csg is None:
+        sympy_sdf = getattr(geometry.sdf, "sympy_sdf", None)
+        vertices = getattr(geometry.sdf, "vertices", None)
+        if sympy_sdf is not None:
+            return _sympy_sdf_to_torch_sdf(sympy_sdf)
+        elif vertices is not None:
+            return _polygon_sdf(vertices)
+        return _numpy_sdf(geometry.sdf)
+
+    # csg operations combine sdfs of their operands
+    op, operands, args = geometry._csg
+    sdfs = [_torch_sdf(g) for g in operands]
+    dims = geometry.dims
+    if op == "union":
+        return _combine_sdf(sdfs[0], sdfs[1], dims, larger=True, negate=False)
+    elif op == "subtract":
+        return _combine_sdf(sdfs[0], sdfs[1], dims, larger=False, negate=True)
+    elif op == "intersect":
+        return _combine_sdf(sdfs[0], sdfs[1], dims, larger=False, negate=False)
+    elif op == "invert":
+        return _invert_sdf(sdfs[0], dims)
+    elif op == "affine":
+        return _affine_sdf(sdfs[0], dims, *args)
+    elif op == "repeat":
+        return _repeat_sdf(sdfs[0], dims, *args)
+    raise NotImplementedError("CSG operation " + op + " is not supported with torch")
+
+
+def _polygon_sdf(vertices, block_size=2**22):
+    # distance to closest edge and crossings of a ray in positive x
+    # direction, evaluated against all edges for blocks of points
+    def polygon_sdf(invar, params, compute_sdf_derivatives=False):
+        points = torch.cat([invar["x"], invar["y"]], dim=1)
+        v1 = torch.as_tensor(vertices, dtype=points.dtype, device=points.device)
+        v2 = torch.roll(v1, -1, dims=0)
+        d = v2 - v1
+        d_dot_d = torch.sum(d * d, dim=1)
+        inv_d_dot_d = 1.0 / torch.where(d_dot_d > 0, d_dot_d, torch.ones_like(d_dot_d))
+        list_distance, list_closest, list_sign = [], [], []
+        nr_block_points = max(1, block_size // v1.shape[0])
+        for block in torch.split(points, nr_block_points):
+            px = block[:, 0:1] - v1[:, 0]
+            py = block[:, 1:2] - v1[:, 1]
+            t = torch.clamp((px * d[:, 0] + py * d[:, 1]) * inv_d_dot_d, 0, 1)
+            vx = px - d[:, 0] * t
+            vy = py - d[:, 1] * t
+            squared_distance, nearest = torch.min(vx * vx + vy * vy, dim=1)
+            t = torch.gather(t, 1, nearest[:, None])
+            list_distance.append(torch.sqrt(squared_distance)[:, None])
+            list_closest.append(v1[nearest] + t * d[nearest])
+
+            # odd number of crossed edges is inside
+            crosses = (v1[:, 1] > block[:, 1:2]) != (v2[:, 1] > block[:, 1:2])
+            x_cross = v1[:, 0] + (block[:, 1:2] - v1[:, 1]) * d[:, 0] / torch.where(
+                d[:, 1] != 0, d[:, 1], torch.ones_like(d[:, 1])
+            )
+            odd = torch.sum(crosses & (block[:, 0:1] < x_cross), dim=1) % 2 == 1
+            list_sign.append(torch.where(odd, 1.0, -1.0).to(points.dtype)[:, None])
+        distance = torch.cat(list_distance)
+        sign = torch.cat(list_sign)
+        outputs = {"sdf": sign * distance}
+        if compute_sdf_derivatives:
+            direction = (points - torch.cat(list_closest)) / torch.where(
+                distance > 0, distance, torch.ones_like(distance)
+            )
+            outputs["sdf" + diff_str + "x"] = sign * direction[:, 0:1]
+            outputs["sdf" + diff_str + "y"] = sign * direction[:, 1:2]
+        return outputs
+
+    return polygon_sdf
+
+
+def _numpy_sdf(sdf):
+    # evaluate numpy sdf with one copy of points to and from the host
+    def numpy_sdf(invar, params, compute_sdf_derivatives=False):
+        value = next(iter(invar.values()))
+        computed_sdf = sdf(
+            {key: v.detach().cpu().numpy() for key, v in invar.items()},
+            {
+                key: v.detach().cpu().numpy() if isinstance(v, torch.Tensor) else v
+                for key, v in params.items()
+            },
+            compute_sdf_derivatives,
+        )
+        return {
+            key: torch.as_tensor(v, dtype=value.dtype, device=value.device)
+            for key, v in computed_sdf.items()
+        }
+
+    return numpy_sdf
+
+
+def _combine_sdf(sdf_1, sdf_2, dims, larger, negate):
+    # union takes larger sdf, intersection and subtraction the smaller one
+    def combine_sdf(invar, params, compute_sdf_derivatives=False):
+        computed_sdf_1 = sdf_1(invar, params, compute_sdf_derivatives)
+        computed_sdf_2 = sdf_2(invar, params, compute_sdf_derivatives)
+        sign = -1.0 if negate else 1.0
+        value_2 = sign * computed_sdf_2["sdf"]
+        if larger:
+            first = computed_sdf_1["sdf"] > value_2
+        else:
+            first = computed_sdf_1["sdf"] < value_2
+        computed_sdf = {"sdf": torch.where(first, computed_sdf_1["sdf"], value_2)}
+        if compute_sdf_derivatives:
+            for d in dims:
+                computed_sdf["sdf" + diff_str + d] = torch.where(
+                    first,
+                    computed_sdf_1["sdf" + diff_str + d],
+                    sign * computed_sdf_2["sdf" + diff_str + d],
+                )
+        return computed_sdf
+
+    return combine_sdf
+
+
+def _invert_sdf(sdf, dims):
+    def invert_sdf(invar, params, compute_sdf_derivatives=False):
+        computed_sdf = sdf(invar, params, compute_sdf_derivatives)
+        return {key: -value for key, value in computed_sdf.items()}
+
+    return invert_sdf
+
+
+def _affine_sdf(sdf, dims, transform):
+    def affine_sdf(invar, params, compute_sdf_derivatives=False):
+        # transform input to sdf function
+        transformed_invar = {
+            **invar,
+            **transform.transform_points_torch(invar, params, dims, inverse=True),
+        }
+
+        # compute sdf and scale output sdf values
+        computed_sdf = sdf(transformed_invar, params, compute_sdf_derivatives)
+        computed_scale = transform.compute_scale_torch(params)
+        if not (isinstance(computed_scale, float) and computed_scale == 1.0):
+            computed_sdf["sdf"] = computed_sdf["sdf"] * computed_scale
+        return computed_sdf
+
+    return affine_sdf
+
+
+def _repeat_sdf(sdf, dims, spacing, repeat_lower, repeat_higher, center):
+    def repeat_sdf(invar, params, compute_sdf_derivatives=False):
+        # clamp position values
+        clamped_invar = {**invar}
+        if center is not None:
+            for i, key in enumerate(dims):
+                clamped_invar[key] = clamped_invar[key] - center[i]
+        for d, rl, rh in zip(dims, repeat_lower, repeat_higher):
+            clamped_invar[d] = clamped_invar[d] - spacing * torch.clamp(
+                torch.round(clamped_invar[d] / spacing), rl, rh
+            )
+        if center is not None:
+            for i, key in enumerate(dims):
+                clamped_invar[key] = clamped_invar[key] + center[i]
+        return sdf(clamped_invar, params, compute_sdf_derivatives)
+
+    return repeat_sdf
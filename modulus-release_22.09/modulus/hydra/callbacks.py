@@ -13,7 +13,7 @@ from typing import Any
 from omegaconf import DictConfig, OmegaConf
 
 from modulus.distributed import DistributedManager
-from modulus.manager import JitManager, JitArchMode, GraphManager
+from modulus.manager import JitManager, JitArchMode, GraphManager, SamplingManager
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +25,10 @@ class ModulusCallback(Callback):
         manager.broadcast_buffers = config.broadcast_buffers
         manager.find_unused_parameters = config.find_unused_parameters
         manager.cuda_graphs = config.cuda_graphs
+        manager.device_datasets = config.device_datasets
+        manager.packed_datasets = config.packed_datasets
+        manager.prefetch_depth = config.prefetch_depth
+        manager.load_workers = config.load_workers
 
         # jit manager
         jit_manager = JitManager()
@@ -48,8 +52,19 @@ class ModulusCallback(Callback):
             jit_manager.enabled = False
             logger.warning("Disabling JIT because functorch does not work with it.")
 
+        # sampling manager
+        sampling_manager = SamplingManager()
+        sampling_manager.init(
+            config.sampling.num_workers,
+            config.sampling.seed,
+            config.sampling.cache_dir,
+            config.sampling.cache_max_gb,
+            config.sampling.dtype,
+        )
+
         logger.info(jit_manager)
         logger.info(graph_manager)
+        logger.info(sampling_manager)
 
 
 DefaultCallbackConfigs = DictConfig(
@@ -41,6 +41,14 @@ class ModulusConfig:
     cuda_graph_warmup: int = 20
     find_unused_parameters: bool = False
     broadcast_buffers: bool = False
+    # keep fixed pointwise datasets on the device and batch them there
+    device_datasets: bool = False
+    # store fixed datasets as one tensor gathered and copied once per batch
+    packed_datasets: bool = False
+    # number of continuous batches sampled ahead in a background thread
+    prefetch_depth: int = 0
+    # number of threads loading the batches of all constraints concurrently
+    load_workers: int = 0
 
     device: str = ""
     debug: bool = False
@@ -68,6 +76,7 @@ class ModulusConfig:
 default_defaults = [
     {"training": "default_training"},
     {"graph": "default"},
+    {"sampling": "default"},
     {"stop_criterion": "default_stop_criterion"},
     {"profiler": "nvtx"},
     {"override hydra/job_logging": "info_logging"},
@@ -88,6 +97,7 @@ class DefaultModulusConfig(ModulusConfig):
 debug_defaults = [
     {"training": "default_training"},
     {"graph": "default"},
+    {"sampling": "default"},
     {"stop_criterion": "default_stop_criterion"},
     {"profiler": "nvtx"},
     {"override hydra/job_logging": "debug_logging"},
@@ -109,6 +119,7 @@ class DebugModulusConfig(ModulusConfig):
 experimental_defaults = [
     {"training": "default_training"},
     {"graph": "default"},
+    {"sampling": "default"},
     {"stop_criterion": "default_stop_criterion"},
     {"profiler": "nvtx"},
     {"override hydra/job_logging": "info_logging"},
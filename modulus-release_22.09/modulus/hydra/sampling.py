@@ -0,0 +1,37 @@
+"""
+Supported Modulus geometry sampling configs
+"""
+
+from dataclasses import dataclass
+from hydra.core.config_store import ConfigStore
+from omegaconf import MISSING
+from typing import Optional
+
+
+@dataclass
+class SamplingConf:
+    num_workers: int = MISSING
+    seed: Optional[int] = MISSING
+    cache_dir: Optional[str] = MISSING
+    cache_max_gb: Optional[float] = MISSING
+    dtype: str = MISSING
+
+
+@dataclass
+class DefaultSamplingConf(SamplingConf):
+    num_workers: int = 1
+    seed: Optional[int] = None
+    # fixed datasets of seeded runs are cached here, None to disable
+    cache_dir: Optional[str] = "${network_dir}/point_cache"
+    cache_max_gb: Optional[float] = 10.0
+    # float32 halves host memory of fixed datasets
+    dtype: str = "float64"
+
+
+def register_sampling_configs() -> None:
+    cs = ConfigStore.instance()
+    cs.store(
+        group="sampling",
+        name="default",
+        node=DefaultSamplingConf,
+    )
@@ -33,6 +33,7 @@ from .scheduler import register_scheduler_configs
 from .training import register_training_configs
 from .callbacks import register_callbacks_configs
 from .graph import register_graph_configs
+from .sampling import register_sampling_configs
 
 
 logger = logging.getLogger(__name__)
@@ -60,6 +61,7 @@ def main(config_path: str, config_name: str = "config"):
             register_training_configs()
             register_modulus_configs()
             register_graph_configs()
+            register_sampling_configs()
 
             # Set number of intraop torch CPU threads
             torch.set_num_threads(1)  # TODO: define this as a hydra config somehow
@@ -150,6 +152,7 @@ def compose(
     register_training_configs()
     register_modulus_configs()
     register_graph_configs()
+    register_sampling_configs()
 
     cfg = hydra.compose(
         config_name=config_name,
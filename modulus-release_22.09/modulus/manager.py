@@ -1,9 +1,11 @@
 """ Modulus Managers
 """
 
+import os
 import logging
 from typing import Dict, List, Union
 from enum import Enum
+import numpy as np
 import torch
 from packaging import version
 from modulus.constants import JIT_PYTORCH_VERSION
@@ -145,3 +147,106 @@ class GraphManager(object):
         self.func_arch = func_arch
         self.func_arch_allow_partial_hessian = func_arch_allow_partial_hessian
         self.debug = debug
+
+
+class SamplingManager(object):
+    _shared_state = {}
+
+    def __new__(cls):
+        obj = super(SamplingManager, cls).__new__(cls)
+        obj.__dict__ = cls._shared_state
+
+        # Set the defaults
+        if not hasattr(obj, "_num_workers"):
+            obj._num_workers = 1
+        if not hasattr(obj, "_seed"):
+            obj._seed = None
+        if not hasattr(obj, "_seed_sequence"):
+            obj._seed_sequence = None
+        if not hasattr(obj, "_cache_dir"):
+            obj._cache_dir = None
+        if not hasattr(obj, "_cache_max_size"):
+            obj._cache_max_size = None
+        if not hasattr(obj, "_dtype"):
+            obj._dtype = np.dtype(np.float64)
+
+        return obj
+
+    @property
+    def num_workers(self):
+        return self._num_workers
+
+    @num_workers.setter
+    def num_workers(self, num_workers):
+        if num_workers < 1:
+            raise ValueError(
+                f"number of sampling workers should be positive, but found {num_workers}"
+            )
+        self._num_workers = num_workers
+
+    @property
+    def seed(self):
+        return self._seed
+
+    @seed.setter
+    def seed(self, seed):
+        self._seed = seed
+        self._seed_sequence = None
+
+    def spawn(self, n: int) -> List[np.random.SeedSequence]:
+        """Returns seed sequences of `n` workers for the next sampling call.
+        Consecutive calls give new independent streams so they are reproducible
+        for a fixed seed, number of workers and order of calls.
+        """
+        if self._seed_sequence is None:
+            # processes of distributed runs get different streams
+            from modulus.distributed import DistributedManager
+
+            self._seed_sequence = np.random.SeedSequence(
+                self._seed, spawn_key=(DistributedManager().rank,)
+            )
+        return self._seed_sequence.spawn(1)[0].spawn(n)
+
+    @property
+    def cache_dir(self):
+        return self._cache_dir
+
+    @cache_dir.setter
+    def cache_dir(self, cache_dir):
+        # absolute so the cache does not move with the working directory
+        self._cache_dir = None if cache_dir is None else os.path.abspath(cache_dir)
+
+    @property
+    def cache_max_size(self):
+        return self._cache_max_size
+
+    @cache_max_size.setter
+    def cache_max_size(self, cache_max_size):
+        self._cache_max_size = cache_max_size
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    @dtype.setter
+    def dtype(self, dtype):
+        dtype = np.dtype(dtype)
+        if dtype.kind != "f":
+            raise ValueError(
+                f"sampling data type should be floating point, but found {dtype}"
+            )
+        self._dtype = dtype
+
+    def __repr__(self):
+        return f"SamplingManager: {self._shared_state}"
+
+    def init(
+        self, num_workers, seed, cache_dir=None, cache_max_gb=None, dtype="float64"
+    ):
+        self.num_workers = num_workers
+        self.seed = seed
+        self.dtype = dtype
+        self.cache_dir = cache_dir
+        self.cache_max_size = (
+            None if cache_max_gb is None else int(cache_max_gb * 2**30)
+        )
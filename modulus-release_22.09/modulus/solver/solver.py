@@ -115,6 +115,9 @@ class Solver(Trainer):
     def record_constraints(self):
         self.domain.rec_constraints(self.network_dir)
 
+    def loading_stats(self):
+        return self.domain.loading_stats()
+
     def record_validators(self, step: int):
         return self.domain.rec_validators(
             self.network_dir, self.writer, self.save_filetypes, step
@@ -1,3 +1,4 @@
+import numpy as np
 import torch
 from sympy import Symbol, Eq, cos, sin, pi
 from modulus.node import Node
@@ -9,6 +10,9 @@ from modulus.domain.constraint import (
     IntegralBoundaryConstraint,
     VariationalDomainConstraint,
 )
+from modulus.domain import Domain
+from modulus.domain.constraint.constraint import PrefetchDataLoader
+from modulus.distributed import DistributedManager
 from modulus.loss import Loss
 from modulus.geometry.parameterization import Parameterization, Bounds
 
@@ -268,6 +272,134 @@ def test_VariationalDomainConstraint():
         assert torch.isclose(loss["u"], torch.tensor(0.0), rtol=1e-5, atol=1e-5)
 
 
+def test_device_datasets():
+    "check constraints batch fixed datasets on the device with zero loss"
+
+    manager = DistributedManager()
+    manager.device_datasets = True
+    try:
+        x, y = Symbol("x"), Symbol("y")
+        node = Node.from_sympy(cos(x) + sin(y), "u")
+        interior = PointwiseInteriorConstraint(
+            nodes=[node],
+            geometry=Rectangle((0, 0), (1, 1)),
+            outvar={"u": cos(x) + sin(y)},
+            batch_size=100,
+            batch_per_epoch=10,
+        )
+
+        # every epoch is a permutation of the dataset
+        xs = torch.cat([next(interior.dataloader)[0]["x"] for _ in range(10)])
+        assert torch.equal(
+            xs.sort(dim=0).values, interior.dataset.invar["x"].sort(dim=0).values
+        )
+
+        for _ in range(4):
+            interior.load_data_static()
+            interior.forward()
+            loss = interior.loss(step=0)
+            assert torch.isclose(loss["u"], torch.tensor(0.0), rtol=1e-5, atol=1e-5)
+    finally:
+        manager.device_datasets = False
+
+
+def test_packed_datasets():
+    "check packed fixed datasets give the same batches as dictionaries"
+
+    manager = DistributedManager()
+    x, y = Symbol("x"), Symbol("y")
+    node = Node.from_sympy(cos(x) + sin(y), "u")
+    batches = []
+    for packed in [False, True]:
+        manager.packed_datasets = packed
+        try:
+            np.random.seed(0)
+            interior = PointwiseInteriorConstraint(
+                nodes=[node],
+                geometry=Rectangle((0, 0), (1, 1)),
+                outvar={"u": cos(x) + sin(y)},
+                batch_size=100,
+                shuffle=False,
+            )
+        finally:
+            manager.packed_datasets = False
+        assert (interior.dataset.packed is not None) == packed
+        batches.append(interior.dataset[np.arange(100)])
+        interior.load_data_static()
+        interior.forward()
+        loss = interior.loss(step=0)
+        assert torch.isclose(loss["u"], torch.tensor(0.0), rtol=1e-5, atol=1e-5)
+
+    # packed batches unpack to the same dictionaries
+    for var, packed_var in zip(batches[0], batches[1]):
+        packed_var = packed_var.to_dict()
+        assert var.keys() == packed_var.keys()
+        for key in var:
+            assert np.allclose(var[key], packed_var[key].numpy())
+
+
+def test_prefetch_datasets():
+    "check continuous constraints sampled ahead in a thread give zero loss"
+
+    manager = DistributedManager()
+    manager.prefetch_depth = 2
+    try:
+        x, y = Symbol("x"), Symbol("y")
+        node = Node.from_sympy(cos(x) + sin(y), "u")
+        boundary = PointwiseBoundaryConstraint(
+            nodes=[node],
+            geometry=Rectangle((0, 0), (1, 1)),
+            outvar={"u": cos(x) + sin(y)},
+            batch_size=100,
+            fixed_dataset=False,
+        )
+    finally:
+        manager.prefetch_depth = 0
+    assert isinstance(boundary.dataloader, PrefetchDataLoader)
+
+    for _ in range(4):
+        boundary.load_data()
+        boundary.forward()
+        loss = boundary.loss(step=0)
+        assert torch.isclose(loss["u"], torch.tensor(0.0), rtol=1e-5, atol=1e-5)
+
+    # every batch is counted once and counts are reset
+    stats = boundary.dataloader.stats()
+    assert 0.25 <= stats["queue_starvation"] <= 1.0
+    assert boundary.dataloader.nr_batches == 0
+
+
+def test_concurrent_loading():
+    "check domains load all constraints in threads and time every load"
+
+    manager = DistributedManager()
+    manager.load_workers = 2
+    try:
+        x, y = Symbol("x"), Symbol("y")
+        node = Node.from_sympy(cos(x) + sin(y), "u")
+        domain = Domain()
+        for i in range(3):
+            boundary = PointwiseBoundaryConstraint(
+                nodes=[node],
+                geometry=Rectangle((0, 0), (1, 1)),
+                outvar={"u": cos(x) + sin(y)},
+                batch_size=100,
+                fixed_dataset=False,
+            )
+            domain.add_constraint(boundary, "boundary" + str(i))
+
+        for _ in range(2):
+            domain.load_data()
+            losses = domain.compute_losses(step=0)
+            assert torch.isclose(losses["u"], torch.tensor(0.0), rtol=1e-5, atol=1e-5)
+    finally:
+        manager.load_workers = 0
+
+    stats = domain.loading_stats()
+    assert sorted(stats.keys()) == ["boundary0", "boundary1", "boundary2"]
+    assert all(s["load_time"] > 0 for s in stats.values())
+
+
 if __name__ == "__main__":
 
     test_PointwiseBoundaryConstraint()
@@ -277,3 +409,11 @@ if __name__ == "__main__":
     test_IntegralBoundaryConstraint()
 
     test_VariationalDomainConstraint()
+
+    test_device_datasets()
+
+    test_packed_datasets()
+
+    test_prefetch_datasets()
+
+    test_concurrent_loading()
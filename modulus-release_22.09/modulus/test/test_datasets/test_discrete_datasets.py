@@ -0,0 +1,53 @@
+import tempfile
+from pathlib import Path
+
+import h5py
+import numpy as np
+import torch
+
+from modulus.dataset import HDF5GridDataset, NpyGridDataset
+from modulus.dataset.dataset import ChunkSampler
+from modulus.dataset.discrete import hdf5_to_npy
+
+
+def test_HDF5GridDataset():
+    "read batches of a chunked HDF5 file and its npy conversion and check they match the file data"
+
+    np.random.seed(123)
+    coeff = np.random.rand(40, 1, 8, 8).astype(np.float32)
+    sol = np.random.rand(40, 1, 8, 8).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename = Path(tmp_dir) / "data.hdf5"
+        with h5py.File(filename, "w") as f:
+            f.create_dataset("coeff", data=coeff, chunks=(4, 1, 8, 8))
+            f.create_dataset("sol", data=sol, chunks=(4, 1, 8, 8))
+        hdf5_to_npy(filename, Path(tmp_dir) / "npy", max_chunk_mb=0.001)
+
+        hdf5_dataset = HDF5GridDataset(
+            filename, invar_keys=["coeff"], outvar_keys=["sol"], chunk_cache_mb=1
+        )
+        npy_dataset = NpyGridDataset(
+            Path(tmp_dir) / "npy", invar_keys=["coeff"], outvar_keys=["sol"]
+        )
+        assert hdf5_dataset.chunk_size == 4
+
+        # dense, sparse and repeated indices are returned in request order
+        for dataset in [hdf5_dataset, npy_dataset]:
+            dataset.worker_init_fn(0)
+            for idx in [[5, 4, 7, 6], [39, 0, 20], [3, 3, 1]]:
+                invar, outvar, _ = dataset[idx]
+                assert np.allclose(invar["coeff"].numpy(), coeff[idx])
+                assert np.allclose(outvar["sol"].numpy(), sol[idx])
+            del dataset.f
+
+    # every example is sampled once and blocks of examples stay together
+    idx = list(ChunkSampler(hdf5_dataset, hdf5_dataset.chunk_size))
+    assert sorted(idx) == list(range(40))
+    blocks = torch.tensor(idx).reshape(10, 4) // 4
+    assert torch.all(blocks == blocks[:, :1])
+
+
+if __name__ == "__main__":
+
+    test_HDF5GridDataset()
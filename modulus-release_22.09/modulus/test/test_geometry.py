@@ -1,4 +1,6 @@
 import numpy as np
+import torch
+from sympy import Symbol
 from modulus.geometry import Parameterization, Parameter, Bounds
 from modulus.geometry.primitives_1d import Point1D, Line1D
 from modulus.geometry.primitives_2d import (
@@ -24,6 +26,7 @@ from modulus.geometry.primitives_3d import (
     ElliCylinder,
 )
 from modulus.geometry.tessellation import Tessellation
+from modulus.geometry.adf import ADF
 from modulus.utils.io.vtk import var_to_polyvtk
 
 
@@ -226,4 +229,585 @@ def test_primitives():
     )
 
 
+def test_cache_sdf(tmp_path):
+    # cached csg geometry
+    g = Box((0, 0, 0), (2, 2, 2)) - Sphere((1, 1, 1), 0.5)
+    cached_g = g.cache_sdf(resolution=64)
+    check_geometry(
+        cached_g,
+        boundary_area=24 + np.pi,
+        interior_area=8 - np.pi / 6.0,
+        max_sdf=1,
+    )
+
+    # compare with exact sdf
+    invar = g.bounds.sample(1000)
+    sdf = g.sdf(invar, {})["sdf"]
+    cached_sdf = cached_g.sdf(invar, {})["sdf"]
+    assert np.max(np.abs(sdf - cached_sdf)) < 0.05
+    close = np.abs(sdf) < 0.02
+    assert np.allclose(sdf[close], cached_sdf[close])
+
+    # only interpolate grid
+    cached_g = g.cache_sdf(resolution=64, exact_distance=0)
+    cached_sdf = cached_g.sdf(invar, {})["sdf"]
+    assert np.max(np.abs(sdf - cached_sdf)) < 0.05
+
+    # persist grid in memory mapped file
+    filename = str(tmp_path / "sdf_grid.npy")
+    g.cache_sdf(resolution=16, dtype=np.float16, filename=filename)
+    cached_g = g.cache_sdf(resolution=16, dtype=np.float16, filename=filename)
+    assert np.load(filename).dtype == np.float16
+    assert np.max(np.abs(sdf - cached_g.sdf(invar, {})["sdf"])) < 0.2
+
+    # stale grid of other geometry, bounds or dtype is rasterized again
+    other = Sphere((1, 1, 1), 0.8)
+    cached_other = other.cache_sdf(
+        resolution=16, bounds=g.bounds, dtype=np.float16, filename=filename
+    )
+    other_sdf = other.sdf(invar, {})["sdf"]
+    assert np.max(np.abs(other_sdf - cached_other.sdf(invar, {})["sdf"])) < 0.2
+    other.cache_sdf(resolution=16, bounds=g.bounds, filename=filename)
+    assert np.load(filename).dtype == np.float32
+    cached_other = other.cache_sdf(resolution=16, filename=filename)
+    assert np.max(np.abs(other_sdf - cached_other.sdf(invar, {})["sdf"])) < 0.2
+
+
+def test_compile_sdf():
+    # csg tree with shared and parameterized transforms
+    r, angle = Parameter("r"), Parameter("angle")
+    cylinder = Cylinder((0, 0, 0), 0.5, 2)
+    cylinders = (
+        cylinder
+        + cylinder.rotate(np.pi / 2, axis="x")
+        + cylinder.rotate(np.pi / 2, axis="y", center=(0.1, 0.2, 0.3))
+    )
+    g = (Box((-1, -1, -1), (1, 1, 1)) & Sphere((0, 0, 0), r)) - cylinders
+    g = g.rotate(angle, axis="z").scale(1.5).translate((0.1, 0.2, 0.3))
+    g = ~g.repeat(4.0, [-1, -1, -1], [1, 1, 1])
+    compiled_g = g.compile()
+
+    # compiled sdf matches closure sdf exactly
+    invar = {key: np.random.uniform(-5, 5, (1000, 1)) for key in ["x", "y", "z"]}
+    params = {
+        "r": np.random.uniform(1.1, 1.3, (1000, 1)),
+        "angle": np.random.uniform(0, np.pi, (1000, 1)),
+    }
+    for compute_sdf_derivatives in [False, True]:
+        sdf = g.sdf(invar, params, compute_sdf_derivatives)
+        compiled_sdf = compiled_g.sdf(invar, params, compute_sdf_derivatives)
+        assert sdf.keys() == compiled_sdf.keys()
+        for key in sdf.keys():
+            assert np.array_equal(sdf[key], compiled_sdf[key])
+
+    # compiled geometry samples like original
+    g = Box((0, 0, 0), (2, 2, 2)) - Sphere((1, 1, 1), 0.5)
+    check_geometry(
+        g.compile(),
+        boundary_area=24 + np.pi,
+        interior_area=8 - np.pi / 6.0,
+        max_sdf=1,
+    )
+
+
+def test_csg_bvh():
+    # many holes and many spheres culled by bounds
+    centers = [(x, y, z) for x in [0.5, 1.5] for y in [0.5, 1.5] for z in range(8)]
+    holes = Box((0, 0, 0), (2, 2, 8))
+    for c in centers:
+        holes = holes - Box(
+            (c[0] - 0.1, c[1] - 0.1, c[2] + 0.4), (c[0] + 0.1, c[1] + 0.1, c[2] + 0.6)
+        )
+    spheres = Sphere(centers[0], 0.25)
+    for c in centers[1:]:
+        spheres = spheres + Sphere(c, 0.25)
+    for g in [holes, spheres, ~spheres]:
+        # culled sdf matches evaluating all operands
+        invar = {key: np.random.uniform(-1, 9, (1000, 1)) for key in ["x", "y", "z"]}
+        sdf = g.sdf(invar, {}, compute_sdf_derivatives=True)
+        compiled_sdf = g.compile().sdf(invar, {}, compute_sdf_derivatives=True)
+        for key in sdf.keys():
+            assert np.array_equal(sdf[key], compiled_sdf[key])
+
+    check_geometry(
+        holes,
+        boundary_area=4 * 2 * 8 + 2 * 4 + 32 * 0.24,
+        interior_area=32 - 32 * 0.008,
+        max_sdf=1,
+    )
+    check_geometry(
+        spheres,
+        boundary_area=32 * 4 * np.pi * 0.25**2,
+        interior_area=32 * 4 / 3 * np.pi * 0.25**3,
+        max_sdf=0.25,
+    )
+
+
+def test_affine_fusion():
+    # chained transforms are fused into a single transform of the primitive
+    box = Box((0, 0, 0), (1, 2, 3))
+    g = box.translate((1, 0, 0)).rotate(np.pi / 2, axis="z").scale(2.0)
+    assert g._csg[0] == "affine" and g._csg[1][0] is box
+    invar = {"x": np.array([[-1.0]]), "y": np.array([[3.0]]), "z": np.array([[3.0]])}
+    assert np.allclose(g.sdf(invar, {})["sdf"], 1.0)
+    check_geometry(g, boundary_area=4 * 22, interior_area=8 * 6, max_sdf=1)
+
+    # parameterized rotations of curves keep unit normals
+    angle = Parameter("angle")
+    g = Rectangle((0, 0), (1, 2)).rotate(
+        angle, parameterization=Parameterization({angle: (0, np.pi)})
+    )
+    g = g.translate((1, 1)).scale(0.5)
+    s = g.sample_boundary(100)
+    assert np.allclose(s["normal_x"] ** 2 + s["normal_y"] ** 2, 1)
+    assert np.isclose(np.sum(s["area"]), 3.0)
+
+
+def test_curve_area_cache():
+    from modulus.geometry.geometry import area_cache_stats
+
+    # primitives use exact curve areas
+    area_cache_stats.clear()
+    g = Box((0, 0, 0), (1, 2, 3)).rotate(0.5, axis="z").scale(2.0)
+    s = g.sample_boundary(1000)
+    assert np.isclose(np.sum(s["area"]), 4 * 22)
+    assert area_cache_stats == {"exact": 6}
+
+    # chained transforms scale the exact area once
+    g = Circle((0, 0), 1).scale(2.0).translate((1, 0))
+    s = g.sample_boundary(1000)
+    assert np.isclose(np.sum(s["area"]), 4 * np.pi)
+    g = Rectangle((0, 0), (1, 1)).scale(2.0).rotate(0.3)
+    s = g.sample_boundary(1000)
+    assert np.isclose(np.sum(s["area"]), 8)
+
+    # csg curve areas are estimated once and reused
+    area_cache_stats.clear()
+    g = Box((0, 0, 0), (2, 2, 2)) - Sphere((1, 1, 1), 0.5)
+    for _ in range(3):
+        s = g.sample_boundary(1000)
+        assert np.isclose(np.sum(s["area"]), 24 + np.pi, rtol=1e-1)
+    assert area_cache_stats == {"miss": 7, "hit": 14}
+
+    # estimates are refined every second use
+    g.area_refresh_freq = 2
+    for _ in range(4):
+        g.sample_boundary(1000)
+    assert all(entry[1] == 3 for entry in g._area_cache.values())
+
+
+def test_low_acceptance_sampling():
+    # thin shell only accepts few candidates
+    g = Sphere((0, 0, 0), 1.0) - Sphere((0, 0, 0), 0.9)
+    s = g.sample_interior(10000, compute_sdf_derivatives=True)
+    assert all(value.shape == (10000, 1) for value in s.values())
+    assert np.all(s["sdf"] > 0)
+    assert np.isclose(np.sum(s["area"]), 4 / 3 * np.pi * (1 - 0.9**3), rtol=1e-1)
+    sdf = g.sdf({key: s[key] for key in ["x", "y", "z"]}, {}, True)
+    for key in sdf.keys():
+        assert np.array_equal(sdf[key], s[key])
+
+
+def test_parallel_sample():
+    from modulus.geometry.parallel import parallel_sample
+
+    # same seed and number of workers gives same points
+    g = Box((0, 0, 0), (2, 2, 2)) - Sphere((1, 1, 1), 0.5)
+    samples = [
+        parallel_sample(
+            lambda n: g.sample_interior(n),
+            10001,
+            3,
+            np.random.SeedSequence(1234).spawn(3),
+        )
+        for _ in range(2)
+    ]
+    for key, value in samples[0].items():
+        assert value.shape == (10001, 1)
+        assert np.array_equal(value, samples[1][key])
+    assert np.isclose(np.sum(samples[0]["area"]), 8 - np.pi / 6, rtol=1e-1)
+
+    # areas of workers are averaged
+    s = parallel_sample(lambda n: g.sample_boundary(n), 10000, 3)
+    assert np.isclose(np.sum(s["area"]), 24 + np.pi, rtol=1e-1)
+
+
+def test_quasirandom_engine():
+    from modulus.geometry.quasirandom import QuasiRandomEngine
+
+    # engine continues sequence across batches
+    engine = QuasiRandomEngine()
+    g = Box((0, 0, 0), (2, 2, 2)) - Sphere((1, 1, 1), 0.5)
+    s_1 = g.sample_interior(1000, quasirandom=engine)
+    s_2 = g.sample_interior(1000, quasirandom=engine)
+    assert not np.any(np.isin(s_1["x"], s_2["x"]))
+    for s in [s_1, s_2]:
+        assert np.isclose(np.sum(s["area"]), 8 - np.pi / 6, rtol=1e-1)
+
+    # first points of scrambled sequence fill every stratum once
+    x = QuasiRandomEngine().sample("x", 1024)
+    assert np.all(np.histogram(x, 1024, range=(0, 1))[0] == 1)
+
+    # curves sample their parameters from quasirandom sequence
+    s = Circle((0, 0), 1.0).sample_boundary(1024, quasirandom=True)
+    assert np.isclose(np.sum(s["area"]), 2 * np.pi)
+    theta = np.arctan2(s["y"], s["x"]) % (2 * np.pi)
+    assert np.all(np.histogram(theta, 1024, range=(0, 2 * np.pi))[0] == 1)
+
+
+def test_array_polygon():
+    # star polygon with enough edges for bounding volume hierarchy
+    theta = np.linspace(0, 2 * np.pi, 200, endpoint=False)
+    radius = np.where(np.arange(200) % 2 == 0, 1.0, 0.5)
+    points = [(r * np.cos(t), r * np.sin(t)) for r, t in zip(radius, theta)]
+    g = Polygon(points)
+    s = g.sample_boundary(1000)
+    perimeter = np.sum(np.linalg.norm(np.roll(points, -1, axis=0) - points, axis=1))
+    assert np.isclose(np.sum(s["area"]), perimeter)
+    assert np.allclose(np.hypot(s["normal_x"], s["normal_y"]), 1.0)
+    assert np.allclose(g.sdf({"x": s["x"], "y": s["y"]}, {})["sdf"], 0.0)
+
+    # sdf matches sympy sdf of parameterized vertices
+    r = Parameter("r")
+    g_sympy = Polygon(
+        [(r * x, r * y) for x, y in points[:6]],
+        parameterization=Parameterization({r: 1.0}),
+    )
+    xy = np.random.uniform(-1.5, 1.5, (1000, 2))
+    invar = {"x": xy[:, 0:1], "y": xy[:, 1:2]}
+    sdf = Polygon(points[:6]).sdf(invar, {}, compute_sdf_derivatives=True)
+    sdf_sympy = g_sympy.sdf(
+        invar, {"r": np.ones((1000, 1))}, compute_sdf_derivatives=True
+    )
+    assert np.allclose(sdf["sdf"], sdf_sympy["sdf"])
+    assert np.median(np.abs(sdf["sdf__x"] - sdf_sympy["sdf__x"])) < 1e-6
+
+
+def test_discrete_geometry():
+    from modulus.geometry.discrete_geometry import DiscreteGeometry
+
+    # spheres of discrete radii
+    radius = np.linspace(0.5, 1.0, 11)[:, None]
+    g = DiscreteGeometry(
+        [Sphere((0, 0, 0), float(r)) for r in radius],
+        Parameterization({Parameter("r"): radius}),
+    )
+
+    # boundary points lie on sphere of their radius
+    s = g.sample_boundary(10000)
+    norm = np.sqrt(s["x"] ** 2 + s["y"] ** 2 + s["z"] ** 2)
+    assert np.allclose(norm, s["r"])
+    assert np.isclose(np.sum(s["area"]), np.mean(4 * np.pi * radius**2))
+
+    # sdf of every point is evaluated on sphere of its radius
+    s = g.sample_interior(10000)
+    norm = np.sqrt(s["x"] ** 2 + s["y"] ** 2 + s["z"] ** 2)
+    assert np.allclose(s["sdf"], s["r"] - norm)
+
+    # csg variants only keep boundary left after subtraction
+    radius = np.linspace(0.5, 1.0, 3)[:, None]
+    g = DiscreteGeometry(
+        [Box((0, 0, 0), (2, 2, 2)) - Sphere((0, 0, 0), float(r)) for r in radius],
+        Parameterization({Parameter("r"): radius}),
+    )
+    s = g.sample_boundary(10000)
+    assert np.isclose(
+        np.sum(s["area"]), np.mean(24 - np.pi * radius**2 / 4), rtol=5e-2
+    )
+
+
+def test_instanced_geometry():
+    from modulus.geometry.instanced_geometry import InstancedGeometry
+
+    # rotated and scaled copies of rectangle match union of copies
+    base = Rectangle((-0.3, -0.1), (0.3, 0.1))
+    transforms = []
+    reference = None
+    for i in range(12):
+        angle, scale = 0.5 * i, 0.5 + 0.1 * i
+        transform = np.eye(3)
+        transform[:2, :2] = scale * np.array(
+            [[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]]
+        )
+        transform[:2, 2] = [1.5 * (i % 4), 1.5 * (i // 4)]
+        transforms.append(transform)
+        copy = base.scale(scale).rotate(angle).translate(list(transform[:2, 2]))
+        reference = copy if reference is None else reference + copy
+    g = InstancedGeometry(base, np.array(transforms))
+    xy = np.random.uniform(-2, 7, (2000, 2))
+    invar = {"x": xy[:, 0:1], "y": xy[:, 1:2]}
+    sdf = g.sdf(invar, {}, compute_sdf_derivatives=True)
+    assert np.allclose(sdf["sdf"], reference.sdf(invar, {})["sdf"])
+    assert np.allclose(np.hypot(sdf["sdf__x"], sdf["sdf__y"]), 1.0)
+    s = g.sample_boundary(1000)
+    assert np.isclose(np.sum(s["area"]), 1.6 * sum(0.5 + 0.1 * i for i in range(12)))
+    assert np.allclose(g.sdf({"x": s["x"], "y": s["y"]}, {})["sdf"], 0.0)
+
+    # lattice of cylinders matches repeated cylinder
+    cylinder = Cylinder((0, 0, 0), 0.1, 0.5)
+    g = InstancedGeometry.lattice(cylinder, 0.5, [0, 0, 0], [4, 4, 0])
+    repeated = cylinder.repeat(0.5, [0, 0, 0], [4, 4, 0])
+    invar = g.bounds.sample(2000)
+    assert np.allclose(g.sdf(invar, {})["sdf"], repeated.sdf(invar, {})["sdf"])
+    s = repeated.sample_boundary(1000)
+    area = sum(c.area for c in cylinder.curves)
+    assert np.isclose(np.sum(s["area"]), 25 * area)
+
+
+def test_curve_csg():
+    from modulus.geometry.bvh import curve_csg
+
+    # boundary points of curves match check with sdf of whole geometry
+    cylinder = Cylinder((0, 0, 0), 0.5, 2)
+    g = (Box((-1, -1, -1), (1, 1, 1)) & Sphere((0, 0, 0), 1.2)) - (
+        cylinder + cylinder.rotate(np.pi / 2, "x") + cylinder.rotate(np.pi / 2, "y")
+    )
+    g = (g.scale(0.5) + Box((1, -1, -1), (2, 1, 1))) & ~Sphere((2, 0, 0), 0.5)
+    for curve, steps in zip(g.curves, curve_csg(g)):
+        invar, params = curve._sample(1000, Parameterization(), False)
+        assert np.array_equal(
+            g.boundary_criteria(invar, params=params),
+            g.boundary_criteria(invar, params=params, curve_csg=steps),
+        )
+
+
+def test_torch_geometry():
+    from modulus.geometry.torch_geometry import TorchGeometry
+
+    # sdf of parameterized csg geometry matches numpy backend
+    r = Parameter("r")
+    cylinder = Cylinder((0, 0, 0), 0.4, 3)
+    g = (
+        (Box((-1, -1, -1), (1, 1, 1)) & Sphere((0, 0, 0), 1.3))
+        - cylinder.rotate(0.3, "x").scale(r, Parameterization({r: (0.8, 1.2)}))
+    ).translate((0.1, 0.2, 0))
+    tg = TorchGeometry(g, dtype=torch.float64)
+    invar = g.bounds.sample(1000, g.parameterization)
+    params = {"r": np.random.uniform(0.8, 1.2, (1000, 1))}
+    sdf = g.sdf(invar, params, compute_sdf_derivatives=True)
+    torch_sdf = tg.sdf(
+        {key: torch.tensor(value) for key, value in invar.items()},
+        {"r": torch.tensor(params["r"])},
+        compute_sdf_derivatives=True,
+    )
+    for key, value in sdf.items():
+        assert np.allclose(torch_sdf[key].numpy(), value)
+
+    # sampled points are tensors on geometry and boundary
+    g = (Box((-1, -1, -1), (1, 1, 1)) & Sphere((0, 0, 0), 1.3)) - cylinder.rotate(
+        0.3, "x"
+    )
+    tg = TorchGeometry(g, dtype=torch.float64)
+    s = tg.sample_boundary(1000)
+    assert all(isinstance(value, torch.Tensor) for value in s.values())
+    s = {key: value.numpy() for key, value in s.items()}
+    assert np.allclose(g.sdf(s, {})["sdf"], 0.0)
+    s = tg.sample_interior(1000, compute_sdf_derivatives=True)
+    s = {key: value.numpy() for key, value in s.items()}
+    assert np.all(s["sdf"] > 0)
+    sdf = g.sdf(s, {}, compute_sdf_derivatives=True)
+    assert np.allclose(sdf["sdf__x"], s["sdf__x"])
+
+    # exact areas and volume estimate of primitive
+    g = Circle((0, 0), 1)
+    s = TorchGeometry(g).sample_boundary(1000)
+    assert s["x"].dtype == torch.float32
+    assert np.isclose(float(torch.sum(s["area"])), 2 * np.pi)
+    s = TorchGeometry(g).sample_interior(10000)
+    assert np.isclose(float(torch.sum(s["area"])), np.pi, rtol=0.05)
+
+    # array polygon sdf and curve match numpy backend
+    g = Polygon([(0, 0), (1, 0), (1, 1), (0.5, 0.4), (0, 1)]) - Circle((0.3, 0.2), 0.1)
+    tg = TorchGeometry(g, dtype=torch.float64)
+    invar = g.bounds.sample(1000)
+    sdf = g.sdf(invar, {}, compute_sdf_derivatives=True)
+    torch_sdf = tg.sdf(
+        {key: torch.tensor(value) for key, value in invar.items()},
+        {},
+        compute_sdf_derivatives=True,
+    )
+    for key, value in sdf.items():
+        assert np.allclose(torch_sdf[key].numpy(), value, atol=1e-6)
+    s = tg.sample_boundary(1000)
+    s = {key: value.numpy() for key, value in s.items()}
+    assert np.allclose(g.sdf(s, {})["sdf"], 0.0)
+
+    # other sdfs are evaluated with numpy
+    g = Box((0, 0, 0), (1, 1, 1)).cache_sdf(resolution=16)
+    s = TorchGeometry(g).sample_interior(1000)
+    assert np.all(s["sdf"].numpy() > 0)
+
+
+def test_point_cache(tmp_path):
+    from modulus.geometry.point_cache import PointCache, fingerprint
+
+    # equal definitions give equal keys
+    x = Parameter("x")
+    g = Box((0, 0, 0), (2, 2, 2)) - Sphere((1, 1, 1), 0.5)
+    key = fingerprint(g, x > 1, 1000)
+    assert key == fingerprint(
+        Box((0, 0, 0), (2, 2, 2)) - Sphere((1, 1, 1), 0.5), x > 1, 1000
+    )
+    assert key != fingerprint(g, x > 1, 1001)
+    assert key != fingerprint(g.translate((0.1, 0, 0)), x > 1, 1000)
+    assert key != fingerprint(
+        Box((0, 0, 0), (2, 2, 2)) - Sphere((1, 1, 1), 0.6), x > 1, 1000
+    )
+    try:
+        fingerprint(g, lambda invar, params: invar["x"] > 1)
+        assert False, "criteria functions can not be hashed"
+    except TypeError:
+        pass
+
+    # points are sampled once and then loaded memory mapped
+    cache = PointCache(str(tmp_path), max_size=None)
+    points = cache.get(key, lambda: g.sample_interior(1000))
+    cached_points = cache.get(key, lambda: None)
+    assert isinstance(cached_points["x"], np.memmap)
+    for k, value in points.items():
+        assert np.array_equal(value, cached_points[k])
+
+    # least recently used entries are evicted first
+    cache.get("other", lambda: g.sample_boundary(1000))
+    cache.max_size = cache.size - 1
+    cache.load("other")
+    cache.evict()
+    assert cache.load(key) is None
+    assert cache.load("other") is not None
+    cache.invalidate()
+    assert cache.size == 0
+
+
+def test_float32_sampling():
+    # points are sampled and stored in float32
+    g = (Box((0, 0, 0), (2, 2, 2)) - Sphere((1, 1, 1), 0.5)).rotate(0.3)
+    check_geometry(
+        g, boundary_area=24 + np.pi, interior_area=8 - np.pi / 6.0, max_sdf=1
+    )
+    samples = {}
+    for dtype in [np.float64, np.float32]:
+        np.random.seed(0)
+        samples[dtype] = g.sample_interior(
+            10000, compute_sdf_derivatives=True, dtype=dtype
+        )
+        boundary = g.sample_boundary(10000, dtype=dtype)
+        for s in [samples[dtype], boundary]:
+            assert all(value.dtype == dtype for value in s.values())
+        assert np.isclose(np.sum(boundary["area"]), 24 + np.pi, rtol=1e-1)
+
+    # same points as float64, sdf derivatives differ only at kinks
+    for key, value in samples[np.float64].items():
+        close = np.isclose(value, samples[np.float32][key], atol=1e-4)
+        assert np.mean(close) > 0.999 if key.startswith("sdf__") else np.all(close)
+
+    # parameters keep float64 unless asked
+    r = Parameter("r")
+    p = Parameterization({r: (0, 1), Parameter("s"): np.array([[1], [2]])})
+    assert p.sample(10)["r"].dtype == np.float64
+    assert p.sample(10, dtype=np.float32)["r"].dtype == np.float32
+    assert p.sample(10, dtype=np.float32)["s"].dtype == np.int64
+
+
+def test_sample_integral_boundary():
+    # areas of every parameter value match sampling them one by one
+    r = Parameter("r")
+    g = Rectangle((0, 0), (1, 1)) - Circle(
+        (0.5, 0.5), r, parameterization=Parameterization({r: (0.1, 0.4)})
+    )
+    criteria = Symbol("x") > 0.2
+    invar, params = g.sample_integral_boundary(20, 100, criteria=criteria)
+    assert params["r"].shape == (20, 1)
+    assert all(value.shape == (2000, 1) for value in invar.values())
+    assert np.all(invar["x"] > 0.2)
+    assert np.all(invar["r"].reshape(20, 100) == params["r"])
+    areas = np.sum(invar["area"].reshape(20, 100), axis=1)
+    for i in range(3):
+        p = Parameterization({r: float(params["r"][i, 0])})
+        area = np.sum(
+            g.sample_boundary(10000, criteria=criteria, parameterization=p)["area"]
+        )
+        assert np.isclose(areas[i], area, rtol=1e-2)
+
+    # curves not depending on parameters share one area estimate
+    g = Rectangle((0, 0), (1, 1)) - Circle((0.5, 0.5), 0.25)
+    p = Parameterization({r: (0.1, 0.4)})
+    invar, params = g.sample_integral_boundary(
+        20, 100, criteria=criteria, parameterization=p
+    )
+    areas = np.sum(invar["area"].reshape(20, 100), axis=1)
+    assert np.allclose(areas, areas[0])
+    area = np.sum(g.sample_boundary(10000, criteria=criteria)["area"])
+    assert np.isclose(areas[0], area, rtol=2e-2)
+
+    # known areas of primitives are exact
+    invar, params = Box((0, 0, 0), (1, 1, 1)).sample_integral_boundary(5, 60)
+    assert params == {}
+    assert np.allclose(np.sum(invar["area"].reshape(5, 60), axis=1), 6)
+
+
+def test_adf_batched():
+    # stacked ADFs of a polygon match ADFs of every edge
+    x = torch.rand(100, 1, dtype=torch.float64) * 0.5 + 0.25
+    y = torch.rand(100, 1, dtype=torch.float64) * 0.5 + 0.25
+    angles = np.linspace(0, 2 * np.pi, 9)
+    corners = np.stack([0.5 + 0.5 * np.cos(angles), 0.5 + 0.5 * np.sin(angles)], -1)
+    omegas = ADF.line_segments_adf((x, y), corners[:-1], corners[1:])
+    for i in range(8):
+        omega = ADF.line_segment_adf((x, y), tuple(corners[i]), tuple(corners[i + 1]))
+        assert torch.allclose(omegas[i], omega)
+    circles = ADF.circles_adf((x, y), [0.3], [[0.5, 0.5]])
+    assert torch.allclose(circles[0], ADF.circle_adf((x, y), 0.3, (0.5, 0.5)))
+
+    # weights from prefix and suffix products match direct products
+    bases = omegas**2
+    numerators = torch.stack(
+        [torch.prod(torch.cat([bases[:i], bases[i + 1 :]]), dim=0) for i in range(8)]
+    )
+    for log_domain in [False, True]:
+        w = ADF.transfinite_interpolation_weights(bases, log_domain=log_domain)
+        assert torch.allclose(w, numerators / torch.sum(numerators, dim=0))
+        assert torch.allclose(w[3], ADF.transfinite_interpolation(list(bases), 3))
+    assert torch.allclose(ADF.r_equivalence(omegas), ADF.r_equivalence(list(omegas)))
+
+
+def test_density_sampling():
+    # points cluster near walls and areas keep integrals unbiased
+    np.random.seed(0)
+    g = Box((0, 0, 0), (2, 2, 2)) - Sphere((1, 1, 1), 0.5)
+    volume = 8 - np.pi / 6.0
+    density = lambda sdf: np.exp(-sdf / 0.05) + 0.1
+    s = g.sample_interior(20000, density=density, compute_sdf_derivatives=True)
+    u = g.sample_interior(20000)
+    assert np.all(s["sdf"] > 0) and "sdf__x" in s
+    assert np.mean(s["sdf"] < 0.05) > 2 * np.mean(u["sdf"] < 0.05)
+    assert np.isclose(np.sum(s["area"]), volume, rtol=1e-2)
+    assert np.isclose(
+        np.sum(s["x"] ** 2 * s["area"]), np.sum(u["x"] ** 2 * u["area"]), rtol=2e-2
+    )
+
+    # candidates focused on sdf bands of bins are tried less often than
+    # uniform candidates, which are used for parameterized geometries
+    tried = []
+    sdf = g.sdf
+
+    def counting_sdf(invar, params, compute_sdf_derivatives=False):
+        tried.append(invar["x"].shape[0])
+        return sdf(invar, params, compute_sdf_derivatives)
+
+    g.sdf = counting_sdf
+    s = g.sample_interior(20000, density=density)
+    nr_focused_tried = sum(tried)
+    tried.clear()
+    p = Parameterization({Parameter("p"): (0, 1)})
+    u = g.sample_interior(20000, density=density, parameterization=p)
+    assert nr_focused_tried < 0.75 * sum(tried)
+    assert np.isclose(np.sum(s["area"]), volume, rtol=1e-2)
+    assert np.isclose(np.sum(u["area"]), volume, rtol=1e-2)
+
+    # bins with almost no density mass still keep their volume
+    g = Circle((0, 0), 1.0)
+    s = g.sample_interior(1000, density=lambda sdf: np.exp(-sdf / 0.005))
+    assert np.isclose(np.sum(s["area"]), np.pi, rtol=2e-2)
+
+
 test_primitives()
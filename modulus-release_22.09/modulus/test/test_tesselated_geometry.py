@@ -24,3 +24,23 @@ def test_tesselated_geometry():
 
     # check if volume is right for interior
     assert np.isclose(np.sum(interior["area"]), 1.0)
+
+
+def test_tesselated_sdf():
+    # read in cube file
+    cube = Tessellation.from_stl("stls/cube.stl")
+
+    # query sdf repeatedly on cached mesh sdf
+    invar = {
+        "x": np.array([[0.5], [0.5], [1.5]]),
+        "y": np.array([[0.5], [0.9], [0.5]]),
+        "z": np.array([[0.5], [0.5], [0.5]]),
+    }
+    for _ in range(2):
+        sdf = cube.sdf(invar, {}, compute_sdf_derivatives=True)
+
+        # check sdf values, positive inside
+        assert np.allclose(sdf["sdf"], [[0.5], [0.1], [-0.5]])
+
+        # check sdf derivatives
+        assert np.allclose(sdf["sdf__y"][1], -1.0)
@@ -242,6 +242,9 @@ class Trainer(AdamMixin, AdaHessianMixin, BFGSMixin):
     def record_constraints(self):
         raise NotImplementedError("Subclass of Constraint needs to implement this")
 
+    def loading_stats(self):
+        return {}
+
     def record_validators(self):
         raise NotImplementedError("Subclass of Constraint needs to implement this")
 
@@ -584,6 +587,16 @@ class Trainer(AdamMixin, AdaHessianMixin, BFGSMixin):
                                 new_style=True,
                             )
 
+                        # add data loading scalars of constraints
+                        for name, stats in self.loading_stats().items():
+                            for key, value in stats.items():
+                                self.writer.add_scalar(
+                                    "Train/" + key + "_" + name,
+                                    value,
+                                    step,
+                                    new_style=True,
+                                )
+
                     if self.manager.distributed:
                         barrier_flag = True
 
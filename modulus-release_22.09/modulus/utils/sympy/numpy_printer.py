@@ -106,18 +106,35 @@ def np_lambdify(f, r):
                         kk = [se.Symbol(name) for name in sorted([x.name for x in kk])]
                         se_lambdify_f_i = se.lambdify(kk, [f_i], backend="llvm")
 
-                        def lambdify_f_i(**x):
-                            if len(x) == 1:
-                                v = list(x.values())[0]
-                            else:
-                                v = np.stack(
-                                    [v for v in dict(sorted(x.items())).values()],
-                                    axis=-1,
+                        # float32 inputs use a float32 function compiled on first use
+                        def loop_lambda(kk, f_i, se_lambdify_f_i):
+                            compiled = {np.dtype(np.float64): se_lambdify_f_i}
+
+                            def lambdify_f_i(**x):
+                                if len(x) == 1:
+                                    v = list(x.values())[0]
+                                else:
+                                    v = np.stack(
+                                        [v for v in dict(sorted(x.items())).values()],
+                                        axis=-1,
+                                    )
+                                dtype = np.dtype(
+                                    np.float32
+                                    if np.result_type(v) == np.float32
+                                    else np.float64
                                 )
-                            out = se_lambdify_f_i(v)
-                            if isinstance(out, list):
-                                out = np.concatenate(out, axis=-1)
-                            return out
+                                if dtype not in compiled:
+                                    compiled[dtype] = se.lambdify(
+                                        kk, [f_i], backend="llvm", dtype=dtype
+                                    )
+                                out = compiled[dtype](v)
+                                if isinstance(out, list):
+                                    out = np.concatenate(out, axis=-1)
+                                return out
+
+                            return lambdify_f_i
+
+                        lambdify_f_i = loop_lambda(kk, f_i, se_lambdify_f_i)
 
                     except:  # fall back on older SymPy compile
                         sp_lambdify_f_i = sp.lambdify(
@@ -4,6 +4,7 @@ Helper functions for converting sympy equations to pytorch
 
 from sympy import lambdify, Symbol, Derivative, Function, Basic, Add, Max, Min
 from sympy.printing.str import StrPrinter
+from sympy.printing.pycode import PythonCodePrinter
 import torch
 import numpy as np
 import functools
@@ -12,7 +13,7 @@ from typing import List, Dict
 from modulus.constants import diff_str, tf_dt
 
 
-def torch_lambdify(f, r, separable=False):
+def torch_lambdify(f, r, separable=False, modules={}):
     """
     generates a PyTorch function from a sympy equation
 
@@ -25,6 +26,12 @@ def torch_lambdify(f, r, separable=False):
     r : list, dict
       A list of the arguments for `f`. If dict then
       the keys of the dict are used.
+    separable : bool
+      If true the arguments are passed separately
+      instead of as one list.
+    modules : dict
+      Functions used instead of the ones in
+      `TORCH_SYMPY_PRINTER`.
 
     Returns
     -------
@@ -44,9 +51,13 @@ def torch_lambdify(f, r, separable=False):
     else:
         vars = [k for k in r] if separable else [[k for k in r]]
         try:  # NOTE this fixes a very odd bug in SymPy TODO add issue to SymPy
-            lambdify_f = lambdify(vars, f, [TORCH_SYMPY_PRINTER])
+            lambdify_f = lambdify(
+                vars, f, [modules, TORCH_SYMPY_PRINTER], printer=_torch_code_printer()
+            )
         except:
-            lambdify_f = lambdify(vars, f, [TORCH_SYMPY_PRINTER])
+            lambdify_f = lambdify(
+                vars, f, [modules, TORCH_SYMPY_PRINTER], printer=_torch_code_printer()
+            )
     return lambdify_f
 
 
@@ -182,12 +193,45 @@ TORCH_SYMPY_PRINTER = {
     "DiracDelta": _dirac_delta_torch,
     "logical_or": _or_torch,
     "logical_and": _and_torch,
+    "logical_not": torch.logical_not,
     "where": _where_torch,
     "pi": np.pi,
     "conjugate": torch.conj,
 }
 
 
+class TorchCodePrinter(PythonCodePrinter):
+    """
+    Prints sign and logical operations as calls of the functions in
+    `TORCH_SYMPY_PRINTER` instead of python expressions that only work
+    on scalars.
+    """
+
+    def _print_sign(self, expr):
+        return "sign({})".format(self._print(expr.args[0]))
+
+    def _print_And(self, expr):
+        return "logical_and({})".format(", ".join(self._print(a) for a in expr.args))
+
+    def _print_Or(self, expr):
+        return "logical_or({})".format(", ".join(self._print(a) for a in expr.args))
+
+    def _print_Not(self, expr):
+        return "logical_not({})".format(self._print(expr.args[0]))
+
+
+def _torch_code_printer():
+    # same settings lambdify uses for printers of dictionary namespaces
+    return TorchCodePrinter(
+        {
+            "fully_qualified_modules": False,
+            "inline": True,
+            "allow_unknown_functions": True,
+            "user_functions": {k: k for k in TORCH_SYMPY_PRINTER},
+        }
+    )
+
+
 class CustomDerivativePrinter(StrPrinter):
     def _print_Function(self, expr):
         """